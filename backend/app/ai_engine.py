@@ -1,45 +1,141 @@
 # backend/app/ai_engine.py
+import asyncio
+import copy
+import json
 import os
-from typing import Any, Dict, List
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 
-try:
-    from openai import OpenAI  # type: ignore
-except ImportError:
-    OpenAI = None  # type: ignore
+from .config import (
+    AI_MAX_CONCURRENCY,
+    AI_PROMPT_TOKEN_BUDGET,
+    LLM_CACHE_MAX_ENTRIES,
+    LLM_CACHE_PATH,
+    LLM_CACHE_TTL_SECONDS,
+)
+from . import llm_client, telemetry
+from .llm_cache import LLMCache, cache_key
+from .singleflight import SingleFlight
+from .services import risk_engine
 
+MODEL = "gpt-4o-mini"  # or gpt-5-mini etc, depending on your account
+TEMPERATURE = 0.4
+MAX_TOKENS = 400
 
-def _build_prompt(context: Dict[str, Any], assessment: Dict[str, Any]) -> str:
+SYSTEM_PROMPT = (
+    "You are a helpful Canadian insurance explainer. "
+    "You ONLY provide general education and suggest topics "
+    "to discuss with a licensed advisor."
+)
+
+# Safe fallback – used when no external call can be made
+FALLBACK_ADVICE: Dict[str, Any] = {
+    "summary": (
+        "Based on your answers, review your life, home/tenant, auto, "
+        "and travel insurance with a licensed advisor. Make sure your "
+        "coverage limits match your income, debts, and family "
+        "situation, and that your liability limits are high enough."
+    ),
+    "bullets": [
+        "Confirm your life insurance is enough to cover debts and support dependants.",
+        "Check your home or tenant policy limits for contents and liability.",
+        "Verify your auto liability limit (often $2M is recommended in Ontario).",
+        "If you travel outside Canada, review emergency medical coverage.",
+    ],
+}
+
+# Identical profiles produce identical prompts; don't pay for them twice.
+advice_cache = LLMCache(
+    max_entries=LLM_CACHE_MAX_ENTRIES,
+    ttl_seconds=LLM_CACHE_TTL_SECONDS,
+    path=LLM_CACHE_PATH or None,
+)
+
+
+# The instructions never change: together with the system prompt they are
+# a constant prefix the provider can cache across requests. Only the JSON
+# after them varies.
+PROMPT_PREFIX = (
+    "You are an insurance assistant helping a Canadian consumer "
+    "understand their insurance coverage situation. "
+    "Be clear, neutral and educational. "
+    "Do NOT give legal or tax advice, and do not recommend specific "
+    "company products. Focus on concepts and what they should discuss "
+    "with a licensed advisor.\n"
+    "\n"
+    "The JSON below holds the user's answers (profile) and a rule-based "
+    "assessment: an overall risk score and, per coverage category, a score "
+    "out of 100 and the titles of the recommendations that apply.\n"
+    "\n"
+    "Based on this, write:\n"
+    "1) A short 3–5 sentence overview of their situation.\n"
+    "2) 3–5 bullet points with concrete next steps or questions to ask "
+    "an insurance advisor.\n"
+    "Keep total length under 250 words.\n"
+    "\n"
+)
+
+# The answers the assessment is based on; anything else in the
+# questionnaire (e.g. "_partner") is not the model's business.
+_PROFILE_FIELDS = tuple(field.name for field in risk_engine.FACT_FIELDS)
+
+
+def estimate_tokens(text: str) -> int:
     """
-    Turn questionnaire answers + rule-based assessment into a prompt
-    for the AI model.
+    Rough token count: about four characters per token for English text
+    and compact JSON with the model's tokenizer.
     """
-    lines: List[str] = []
+    return (len(text) + 3) // 4
 
-    lines.append(
-        "You are an insurance assistant helping a Canadian consumer "
-        "understand their insurance coverage situation. "
-        "Be clear, neutral and educational. "
-        "Do NOT give legal or tax advice, and do not recommend specific "
-        "company products. Focus on concepts and what they should discuss "
-        "with a licensed advisor."
-    )
 
-    lines.append("\nUser profile (raw answers):")
-    for k, v in context.items():
-        lines.append(f"- {k}: {v}")
+# Canonical, so equal inputs give byte-identical prompts (and cache keys)
+_PROMPT_JSON = json.JSONEncoder(sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
 
-    lines.append("\nRule-based assessment (JSON):")
-    lines.append(str(assessment))
+# What's left of the budget for the user message
+_PROMPT_BUDGET = AI_PROMPT_TOKEN_BUDGET - estimate_tokens(SYSTEM_PROMPT)
 
-    lines.append(
-        "\nBased on this, write:\n"
-        "1) A short 3–5 sentence overview of their situation.\n"
-        "2) 3–5 bullet points with concrete next steps or questions to ask "
-        "an insurance advisor.\n"
-        "Keep total length under 250 words."
-    )
 
-    return "\n".join(lines)
+def _prompt_data(context: Dict[str, Any], assessment: Dict[str, Any], titles: bool) -> str:
+    categories: Dict[str, Any] = {}
+    for name, category in assessment["categories"].items():
+        categories[name] = {"score": category["score"]}
+        if titles and category["recommendations"]:
+            categories[name]["recommendations"] = [reco["title"] for reco in category["recommendations"]]
+    data = {
+        "profile": {key: context[key] for key in _PROFILE_FIELDS if context.get(key) is not None},
+        "overall_risk_score": assessment["overall_risk_score"],
+        "categories": categories,
+    }
+    return _PROMPT_JSON.encode(data)
+
+
+def _build_prompt(context: Dict[str, Any], assessment: Dict[str, Any]) -> str:
+    """
+    Turn questionnaire answers + rule-based assessment into a prompt
+    for the AI model: the constant PROMPT_PREFIX, then the profile and
+    assessment as compact JSON. Recommendation details are left out (the
+    model writes its own); if the prompt would still go over
+    AI_PROMPT_TOKEN_BUDGET the titles go too. The profile and scores are
+    always kept.
+    """
+    for titles in (True, False):
+        prompt = PROMPT_PREFIX + _prompt_data(context, assessment, titles)
+        if estimate_tokens(prompt) <= _PROMPT_BUDGET:
+            break
+    return prompt
+
+
+def _messages(prompt: str) -> List[Dict[str, str]]:
+    return [
+        {
+            "role": "system",
+            "content": SYSTEM_PROMPT,
+        },
+        {
+            "role": "user",
+            "content": prompt,
+        },
+    ]
 
 
 def generate_ai_advice(
@@ -49,73 +145,330 @@ def generate_ai_advice(
     """
     Call the AI model and return structured advice.
 
-    If OPENAI_API_KEY is not set or the openai library is missing,
-    we return a static fallback so the endpoint still works.
+    If OPENAI_API_KEY is not set, the openai library is missing or the
+    upstream is unavailable (see llm_client), we return a static fallback
+    so the endpoint still works.
     """
-    prompt = _build_prompt(context, assessment)
+    started = time.perf_counter()
+    source = "error"
+    try:
+        prompt = _build_prompt(context, assessment)
+
+        api_key = os.getenv("OPENAI_API_KEY")
+        if not api_key or not llm_client.available():
+            source = "fallback"
+            return copy.deepcopy(FALLBACK_ADVICE)
+
+        key = cache_key(MODEL, TEMPERATURE, SYSTEM_PROMPT, prompt)
+        cached = advice_cache.get(key)
+        if cached is not None:
+            source = "cache"
+            return cached
+
+        # Real call to OpenAI
+        client = llm_client.get_client(api_key)
+        try:
+            completion = llm_client.call(
+                lambda: client.chat.completions.create(
+                    model=MODEL,
+                    messages=_messages(prompt),
+                    max_tokens=MAX_TOKENS,
+                    temperature=TEMPERATURE,
+                )
+            )
+        except llm_client.LLMUnavailable:
+            # Not cached: the next request should try the model again
+            source = "fallback"
+            return copy.deepcopy(FALLBACK_ADVICE)
+
+        text = completion.choices[0].message.content or ""
+        advice = _parse_advice(text)
+        advice_cache.set(key, advice)
+        source = "llm"
+        return advice
+    finally:
+        telemetry.advice_seconds.labels(source).observe(time.perf_counter() - started)
+
+
+# Upstream calls in flight by cache key (see generate_ai_advice_async)
+upstream_calls = SingleFlight()
+
+# asyncio primitives belong to one event loop; keep one limiter per loop.
+_limiters: Dict[asyncio.AbstractEventLoop, asyncio.Semaphore] = {}
+
+
+def _limiter() -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    limiter = _limiters.get(loop)
+    if limiter is None:
+        for stale in [l for l in _limiters if l.is_closed()]:
+            del _limiters[stale]
+        limiter = _limiters[loop] = asyncio.Semaphore(AI_MAX_CONCURRENCY)
+    return limiter
+
+
+async def generate_ai_advice_async(
+    context: Dict[str, Any],
+    assessment: Dict[str, Any],
+) -> Dict[str, Any]:
+    """
+    Non-blocking generate_ai_advice for the event loop: same prompt, cache
+    and fallback, with at most AI_MAX_CONCURRENCY upstream calls in flight.
+    Raises llm_client.LLMUnavailable instead of falling back when the
+    upstream fails, so the caller can record the failure.
+    """
+    started = time.perf_counter()
+    source = "error"
+    try:
+        prompt = _build_prompt(context, assessment)
+
+        api_key = os.getenv("OPENAI_API_KEY")
+        if not api_key or not llm_client.available():
+            source = "fallback"
+            return copy.deepcopy(FALLBACK_ADVICE)
+
+        key = cache_key(MODEL, TEMPERATURE, SYSTEM_PROMPT, prompt)
+        cached: Optional[Dict[str, Any]] = await asyncio.to_thread(advice_cache.get, key)
+        if cached is not None:
+            source = "cache"
+            return cached
+
+        async def fetch() -> Dict[str, Any]:
+            client = llm_client.get_async_client(api_key)
+            async with _limiter():
+                completion = await llm_client.call_async(
+                    lambda: client.chat.completions.create(
+                        model=MODEL,
+                        messages=_messages(prompt),
+                        max_tokens=MAX_TOKENS,
+                        temperature=TEMPERATURE,
+                    )
+                )
+
+            text = completion.choices[0].message.content or ""
+            advice = _parse_advice(text)
+            await asyncio.to_thread(advice_cache.set, key, advice)
+            return advice
+
+        # Identical prompts requested at the same time (same answers, or a
+        # job racing a retry) share one upstream call
+        advice, ran = await upstream_calls.do(key, fetch)
+        source = "llm" if ran else "coalesced"
+        return advice if ran else copy.deepcopy(advice)
+    finally:
+        telemetry.advice_seconds.labels(source).observe(time.perf_counter() - started)
+
+
+# (event, payload): ("summary", line), ("bullet", text) or ("done", advice)
+AdviceEvent = Tuple[str, Any]
+
+
+class AdviceParser:
+    """
+    Incremental summary/bullets split of the model's answer.
+
+    Feed it text as it arrives; each line is classified as soon as its
+    newline is seen. Lines before the first "-" or "•" line belong to the
+    summary, everything from there on is a bullet. `result()` gives the
+    same dict as parsing the whole text at once.
+    """
+
+    def __init__(self) -> None:
+        self._chunks: List[str] = []
+        self._partial = ""
+        self._in_bullets = False
+        self.summary_lines: List[str] = []
+        self.bullet_lines: List[str] = []
+
+    def _line(self, raw: str) -> List[AdviceEvent]:
+        line = raw.strip()
+        if not line:
+            return []
+        if line.startswith("-") or line.startswith("•"):
+            self._in_bullets = True
+        if self._in_bullets:
+            bullet = line.lstrip("-• ").strip()
+            self.bullet_lines.append(bullet)
+            return [("bullet", bullet)]
+        self.summary_lines.append(line)
+        return [("summary", line)]
+
+    def feed(self, chunk: str) -> List[AdviceEvent]:
+        self._chunks.append(chunk)
+        *complete, self._partial = (self._partial + chunk).split("\n")
+        return [event for raw in complete for event in self._line(raw)]
+
+    def close(self) -> List[AdviceEvent]:
+        raw, self._partial = self._partial, ""
+        return self._line(raw)
+
+    def result(self) -> Dict[str, Any]:
+        summary = " ".join(self.summary_lines).strip()
+        if not summary:
+            summary = "".join(self._chunks).strip()
 
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key or OpenAI is None:
-        # Safe fallback – no external call
         return {
-            "summary": (
-                "Based on your answers, review your life, home/tenant, auto, "
-                "and travel insurance with a licensed advisor. Make sure your "
-                "coverage limits match your income, debts, and family "
-                "situation, and that your liability limits are high enough."
-            ),
-            "bullets": [
-                "Confirm your life insurance is enough to cover debts and support dependants.",
-                "Check your home or tenant policy limits for contents and liability.",
-                "Verify your auto liability limit (often $2M is recommended in Ontario).",
-                "If you travel outside Canada, review emergency medical coverage.",
-            ],
+            "summary": summary,
+            "bullets": list(self.bullet_lines),
         }
 
-    # Real call to OpenAI
-    client = OpenAI(api_key=api_key)
-
-    completion = client.chat.completions.create(
-        model="gpt-4o-mini",  # or gpt-5-mini etc, depending on your account
-        messages=[
-            {
-                "role": "system",
-                "content": (
-                    "You are a helpful Canadian insurance explainer. "
-                    "You ONLY provide general education and suggest topics "
-                    "to discuss with a licensed advisor."
-                ),
-            },
-            {
-                "role": "user",
-                "content": prompt,
-            },
-        ],
-        max_tokens=400,
-        temperature=0.4,
-    )
-
-    text = completion.choices[0].message.content or ""
-    # Simple splitting: first paragraph vs bullets
-    parts = [p.strip() for p in text.split("\n") if p.strip()]
-
-    summary_lines: List[str] = []
-    bullet_lines: List[str] = []
-
-    in_bullets = False
-    for line in parts:
-        if line.startswith("-") or line.startswith("•"):
-            in_bullets = True
-        if in_bullets:
-            bullet_lines.append(line.lstrip("-• ").strip())
+
+def _parse_advice(text: str) -> Dict[str, Any]:
+    parser = AdviceParser()
+    parser.feed(text)
+    parser.close()
+    return parser.result()
+
+
+def _replay(advice: Dict[str, Any]) -> List[AdviceEvent]:
+    events: List[AdviceEvent] = []
+    if advice.get("summary"):
+        events.append(("summary", advice["summary"]))
+    events.extend(("bullet", bullet) for bullet in advice.get("bullets", []))
+    events.append(("done", advice))
+    return events
+
+
+class _Broadcast:
+    """
+    The events of one streamed completion, for every stream reading it.
+    The upstream read appends to `events` at its own pace; each reader
+    follows from the start at the pace of its client.
+    """
+
+    def __init__(self) -> None:
+        self.events: List[AdviceEvent] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.reader: Optional["asyncio.Future[None]"] = None
+        self._changed = asyncio.Event()
+
+    def publish(self, event: AdviceEvent) -> None:
+        self.events.append(event)
+        self._wake()
+
+    def finish(self, error: Optional[BaseException] = None) -> None:
+        self.done, self.error = True, error
+        self._wake()
+
+    def _wake(self) -> None:
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def follow(self) -> AsyncIterator[AdviceEvent]:
+        sent = 0
+        while True:
+            while sent < len(self.events):
+                yield self.events[sent]
+                sent += 1
+            if self.done:
+                if self.error is not None:
+                    raise self.error
+                return
+            await self._changed.wait()
+
+
+# Streamed completions being read, by event loop and cache key
+_streams: Dict[Tuple[asyncio.AbstractEventLoop, str], _Broadcast] = {}
+
+
+async def _read_stream(
+    slot: Tuple[asyncio.AbstractEventLoop, str],
+    prompt: str,
+    api_key: str,
+    flight: _Broadcast,
+) -> None:
+    # Runs apart from the streams that follow it, so a slow client holds
+    # neither the upstream connection nor a limiter slot
+    key = slot[1]
+
+    async def fetch() -> Dict[str, Any]:
+        parser = AdviceParser()
+        client = llm_client.get_async_client(api_key)
+        async with _limiter():
+            deltas = llm_client.stream_deltas(
+                lambda: client.chat.completions.create(
+                    model=MODEL,
+                    messages=_messages(prompt),
+                    max_tokens=MAX_TOKENS,
+                    temperature=TEMPERATURE,
+                    stream=True,
+                    stream_options={"include_usage": True},
+                )
+            )
+            async for delta in deltas:
+                for event in parser.feed(delta):
+                    flight.publish(event)
+        for event in parser.close():
+            flight.publish(event)
+
+        advice = parser.result()
+        await asyncio.to_thread(advice_cache.set, key, advice)
+        return advice
+
+    try:
+        # Shares the call with a background job for the same prompt, in
+        # either direction
+        advice, ran = await upstream_calls.do(key, fetch)
+        if ran:
+            flight.publish(("done", advice))
         else:
-            summary_lines.append(line)
+            for event in _replay(copy.deepcopy(advice)):
+                flight.publish(event)
+        flight.finish()
+    except BaseException as exc:
+        flight.finish(exc)
+        if not isinstance(exc, Exception):
+            raise
+    finally:
+        del _streams[slot]
 
-    summary = " ".join(summary_lines).strip()
-    if not summary:
-        summary = text.strip()
 
-    return {
-        "summary": summary,
-        "bullets": bullet_lines,
-    }
+async def stream_ai_advice(
+    context: Dict[str, Any],
+    assessment: Dict[str, Any],
+) -> AsyncIterator[AdviceEvent]:
+    """
+    Streaming generate_ai_advice_async: yields summary and bullet events
+    as soon as each line of the completion is finished, then ("done",
+    advice) with the full parsed result. Cached and fallback advice are
+    replayed as events straight away. Raises llm_client.LLMUnavailable
+    like generate_ai_advice_async.
+
+    Streams of the same prompt share one upstream read, as do a stream
+    and a background job (see upstream_calls). The read goes on without
+    waiting for the clients, and finishes and caches the advice if they
+    all go away.
+    """
+    started = time.perf_counter()
+    source = "error"
+    try:
+        prompt = _build_prompt(context, assessment)
+
+        api_key = os.getenv("OPENAI_API_KEY")
+        if not api_key or not llm_client.available():
+            source = "fallback"
+            for event in _replay(copy.deepcopy(FALLBACK_ADVICE)):
+                yield event
+            return
+
+        key = cache_key(MODEL, TEMPERATURE, SYSTEM_PROMPT, prompt)
+        cached: Optional[Dict[str, Any]] = await asyncio.to_thread(advice_cache.get, key)
+        if cached is not None:
+            source = "cache"
+            for event in _replay(cached):
+                yield event
+            return
+
+        slot = (asyncio.get_running_loop(), key)
+        flight = _streams.get(slot)
+        leader = flight is None
+        if flight is None:
+            flight = _streams[slot] = _Broadcast()
+            flight.reader = asyncio.ensure_future(_read_stream(slot, prompt, api_key, flight))
+        async for event in flight.follow():
+            yield event
+        source = "llm" if leader else "coalesced"
+    finally:
+        # Includes the time the consumer took between events
+        telemetry.advice_seconds.labels(source).observe(time.perf_counter() - started)
@@ -0,0 +1,89 @@
+# backend/app/auth_cache.py
+import json
+import time
+from typing import Any, NamedTuple
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, object_session
+
+from .caches import TTLCache, shared
+from .config import AUTH_CACHE_MAX_ENTRIES, AUTH_CACHE_TTL_SECONDS
+from .models.user import User
+
+
+class Principal(NamedTuple):
+    """
+    The columns of an authenticated User that requests rely on.
+    """
+
+    id: str
+    email: str
+    is_active: bool
+
+    def as_user(self) -> User:
+        # A fresh transient object per request: never shared between
+        # sessions, so a commit elsewhere can't expire it under us.
+        return User(id=self.id, email=self.email, is_active=self.is_active)
+
+
+# Verified JWT claims by raw token, kept until the token's own expiry.
+# Checking a signature again gives the same answer in every process, so
+# this one is never shared.
+tokens = TTLCache(AUTH_CACHE_MAX_ENTRIES)
+
+# Principals by user id, kept for AUTH_CACHE_TTL_SECONDS at most. Shared
+# when SHARED_CACHE_PATH is set, so deactivating a user takes effect in
+# every worker at once.
+principals = shared(
+    "auth_principals",
+    AUTH_CACHE_MAX_ENTRIES,
+    decode=lambda raw: Principal(*json.loads(raw)),
+)
+
+
+def remember_principal(user: User) -> Principal:
+    principal = Principal(id=user.id, email=user.email, is_active=bool(user.is_active))
+    principals.set(user.id, principal, time.time() + AUTH_CACHE_TTL_SECONDS)
+    return principal
+
+
+def invalidate_user(user_id: str) -> None:
+    principals.pop(user_id)
+
+
+# Session.info key: ids of users whose principals to drop on commit
+_EVICT = "auth_cache.evict"
+
+
+def _invalidate_on_commit(target: User) -> None:
+    # Not at flush: a request served between the flush and the commit
+    # would read the old row and cache it again for the whole TTL
+    session = object_session(target)
+    if session is None:
+        invalidate_user(target.id)
+    else:
+        session.info.setdefault(_EVICT, set()).add(target.id)
+
+
+@event.listens_for(User, "after_update")
+def _user_updated(mapper: Any, connection: Any, target: User) -> None:
+    # Deactivation or a password change must take effect on the next request
+    state = inspect(target)
+    if any(state.attrs[name].history.has_changes() for name in ("is_active", "hashed_password", "email")):
+        _invalidate_on_commit(target)
+
+
+@event.listens_for(User, "after_delete")
+def _user_deleted(mapper: Any, connection: Any, target: User) -> None:
+    _invalidate_on_commit(target)
+
+
+@event.listens_for(Session, "after_commit")
+def _committed(session: Session) -> None:
+    for user_id in session.info.pop(_EVICT, ()):
+        invalidate_user(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _rolled_back(session: Session) -> None:
+    session.info.pop(_EVICT, None)
@@ -0,0 +1,135 @@
+"""
+Import profiles from, or export questionnaires and assessments to, NDJSON,
+Parquet or Arrow IPC files, in constant memory.
+
+    python -m app.bulk import profiles.ndjson --user partner@example.com [--score]
+    python -m app.bulk export questionnaires questionnaires.parquet [--user EMAIL]
+    python -m app.bulk export assessments - > assessments.ndjson
+
+The format follows the file extension (.ndjson / .jsonl, .parquet,
+.arrow / .arrows) unless --format is given; "-" is stdin / stdout, as
+NDJSON by default. Imported questionnaires belong to --user; exports cover
+every user unless --user is given. See app/services/bulk.py for the
+record format.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from contextlib import nullcontext
+from typing import IO, ContextManager, Optional
+
+from sqlalchemy import select
+
+from .config import BULK_BATCH_SIZE
+from .db import AsyncSessionLocal, async_engine
+from .migrations import require_current_async
+from .models.user import User
+from .services import bulk
+
+_EXTENSIONS = {".ndjson": "ndjson", ".jsonl": "ndjson", ".parquet": "parquet", ".arrow": "arrow", ".arrows": "arrow"}
+
+
+def _open(path: str, mode: str) -> ContextManager[IO[bytes]]:
+    if path == "-":
+        return nullcontext(sys.stdin.buffer if "r" in mode else sys.stdout.buffer)
+    return open(path, mode)
+
+
+async def _user_id(email: str) -> str:
+    async with AsyncSessionLocal() as db:
+        user_id = await db.scalar(select(User.id).where(User.email == email))
+    if user_id is None:
+        raise SystemExit(f"No user with email {email}")
+    return user_id
+
+
+async def import_file(path: str, fmt: str, email: str, score: bool, batch_size: int) -> int:
+    await require_current_async(async_engine)
+    user_id = await _user_id(email)
+    imported = 0
+    start = time.perf_counter()
+    async with AsyncSessionLocal() as db:
+        with _open(path, "rb") as source:
+            if fmt == "ndjson":
+                batches = bulk.ndjson_records(source, batch_size)
+            else:
+                batches = bulk.columnar_records(source, fmt, batch_size)
+            try:
+                for records in batches:
+                    imported += await bulk.import_batch(db, user_id, records, score=score)
+                    rate = imported / (time.perf_counter() - start)
+                    print(f"{imported:,} profiles, {rate:,.0f} profiles/sec", file=sys.stderr)
+            except ValueError as exc:
+                raise SystemExit(f"{exc} ({imported:,} imported before it)")
+    elapsed = time.perf_counter() - start
+    print(f"Done: {imported:,} questionnaires in {elapsed:.1f}s", file=sys.stderr)
+    return imported
+
+
+async def export_file(what: str, path: str, fmt: str, email: Optional[str], batch_size: int) -> None:
+    await require_current_async(async_engine)
+    user_id = await _user_id(email) if email else None
+    export = bulk.export_questionnaires if what == "questionnaires" else bulk.export_assessments
+    size = 0
+    start = time.perf_counter()
+    with _open(path, "wb") as sink:
+        async for chunk in export(fmt, user_id, batch_size):
+            sink.write(chunk)
+            size += len(chunk)
+    print(f"Done: {size:,} bytes of {what} in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+
+
+def _format(parser: argparse.ArgumentParser, path: str, given: Optional[str]) -> str:
+    if given:
+        return given
+    if path == "-":
+        return "ndjson"
+    fmt = _EXTENSIONS.get(os.path.splitext(path)[1].lower())
+    if fmt is None:
+        parser.error(f"can't tell the format of {path}; pass --format")
+    return fmt
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Bulk import/export of questionnaires and assessments.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    importing = commands.add_parser("import", help="create a questionnaire from every profile in a file")
+    importing.add_argument("path", help='file to read, or "-" for stdin')
+    importing.add_argument("--user", required=True, help="email of the user who gets the questionnaires")
+    importing.add_argument("--score", action="store_true", help="also score and complete them")
+
+    exporting = commands.add_parser("export", help="write questionnaires or assessments to a file")
+    exporting.add_argument("what", choices=("questionnaires", "assessments"))
+    exporting.add_argument("path", help='file to write, or "-" for stdout')
+    exporting.add_argument("--user", help="only this user's (email)")
+
+    for command in (importing, exporting):
+        command.add_argument("--format", choices=tuple(bulk.MEDIA_TYPES))
+        command.add_argument("--batch-size", type=int, default=BULK_BATCH_SIZE)
+    args = parser.parse_args()
+
+    fmt = _format(parser, args.path, args.format)
+    if fmt in bulk.COLUMNAR and not bulk.columnar_available():
+        parser.error("Parquet and Arrow files need pyarrow (pip install pyarrow)")
+    if args.command == "import" and fmt == "parquet" and args.path == "-":
+        parser.error("Parquet can't be read from stdin; pass a file")
+
+    if args.command == "import":
+        coroutine = import_file(args.path, fmt, args.user, args.score, args.batch_size)
+    else:
+        coroutine = export_file(args.what, args.path, fmt, args.user, args.batch_size)
+
+    async def run() -> None:
+        try:
+            await coroutine
+        finally:
+            await async_engine.dispose()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+# backend/app/caches.py
+"""
+Caches that the worker processes of one deployment can share.
+
+TTLCache lives in this process only. SQLiteCache has the same interface
+over a table in a SQLite file, so every worker on the host that opens
+the same file sees the same entries, and the same invalidations.
+shared() picks one of the two based on SHARED_CACHE_PATH.
+"""
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple, Union
+
+from .config import SHARED_CACHE_PATH
+
+
+class TTLCache:
+    """
+    Small thread-safe LRU where every entry carries its own expiry time.
+    """
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.time():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: Hashable, value: Any, expires_at: float) -> None:
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def pop(self, key: Hashable) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+class SQLiteCache:
+    """
+    TTLCache's interface over a table in a SQLite file. Values are stored
+    as text: `encode` turns them into it (JSON by default) and `decode`
+    back. Expired rows are deleted on writes; there is no size cap.
+
+    The file is opened in WAL mode so readers in other processes don't
+    wait for a writer, and writers wait up to `busy_timeout` seconds for
+    each other.
+    """
+
+    def __init__(
+            self,
+            path: str,
+            table: str,
+            encode: Callable[[Any], str] = json.dumps,
+            decode: Callable[[str], Any] = json.loads,
+            busy_timeout: float = 5.0,
+    ) -> None:
+        self.path = path
+        self.table = table
+        self.encode = encode
+        self.decode = decode
+        self.busy_timeout = busy_timeout
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self.hits = 0
+        self.misses = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            db = sqlite3.connect(self.path, timeout=self.busy_timeout, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.table} "
+                "(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            db.execute(f"CREATE INDEX IF NOT EXISTS ix_{self.table}_expires_at ON {self.table} (expires_at)")
+            db.commit()
+            self._db = db
+        return self._db
+
+    def get_raw(self, key: Hashable) -> Optional[Tuple[str, float]]:
+        """
+        (encoded value, expires_at) without decoding, or None.
+        """
+        with self._lock:
+            row = self._connect().execute(
+                f"SELECT value, expires_at FROM {self.table} WHERE key = ? AND expires_at > ?",
+                (str(key), time.time()),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return row[0], row[1]
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        row = self.get_raw(key)
+        return self.decode(row[0]) if row is not None else None
+
+    def set_raw(self, key: Hashable, encoded: str, expires_at: float) -> None:
+        with self._lock:
+            db = self._connect()
+            db.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, expires_at) VALUES (?, ?, ?)",
+                (str(key), encoded, expires_at),
+            )
+            db.execute(f"DELETE FROM {self.table} WHERE expires_at <= ?", (time.time(),))
+            db.commit()
+
+    def set(self, key: Hashable, value: Any, expires_at: float) -> None:
+        self.set_raw(key, self.encode(value), expires_at)
+
+    def pop(self, key: Hashable) -> None:
+        with self._lock:
+            db = self._connect()
+            db.execute(f"DELETE FROM {self.table} WHERE key = ?", (str(key),))
+            db.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            db = self._connect()
+            db.execute(f"DELETE FROM {self.table}")
+            db.commit()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            entries = self._connect().execute(
+                f"SELECT COUNT(*) FROM {self.table} WHERE expires_at > ?", (time.time(),)
+            ).fetchone()[0]
+            return {"entries": entries, "hits": self.hits, "misses": self.misses}
+
+
+def shared(
+        table: str,
+        max_entries: int,
+        encode: Callable[[Any], str] = json.dumps,
+        decode: Callable[[str], Any] = json.loads,
+) -> Union[TTLCache, SQLiteCache]:
+    """
+    A cache every worker shares (table `table` in SHARED_CACHE_PATH), or
+    with no path configured, one for this process only (a TTLCache of
+    `max_entries`; `encode`/`decode` are not used).
+    """
+    if SHARED_CACHE_PATH:
+        return SQLiteCache(SHARED_CACHE_PATH, table, encode=encode, decode=decode)
+    return TTLCache(max_entries)
@@ -3,6 +3,9 @@ from datetime import timedelta
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./app.db")
 
+# Debug extras: X-Query-Count response headers (see query_counter.py)
+DEBUG = os.getenv("DEBUG", "0") == "1"
+
 JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY", "change-me-in-prod")  # set env var in real use
 JWT_ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60  # 1 hour
@@ -10,3 +13,78 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 60  # 1 hour
 
 def get_access_token_expires() -> timedelta:
     return timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+
+# LLM response cache (see llm_cache.py); set LLM_CACHE_PATH="" to keep it in memory only
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "./llm_cache.db")
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "1024"))
+LLM_CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))  # 1 week
+
+# Background AI advice jobs
+AI_MAX_CONCURRENCY = int(os.getenv("AI_MAX_CONCURRENCY", "8"))  # upstream calls in flight per process
+AI_PENDING_TIMEOUT_SECONDS = int(os.getenv("AI_PENDING_TIMEOUT_SECONDS", "120"))  # then re-queue
+AI_PROMPT_TOKEN_BUDGET = int(os.getenv("AI_PROMPT_TOKEN_BUDGET", "600"))  # estimated input tokens per request
+
+# Idempotency-Key on POST /questionnaires/{id}/complete (see services/idempotency.py)
+IDEMPOTENCY_KEY_TTL_SECONDS = int(os.getenv("IDEMPOTENCY_KEY_TTL_SECONDS", str(24 * 3600)))
+IDEMPOTENCY_LOCK_SECONDS = int(os.getenv("IDEMPOTENCY_LOCK_SECONDS", "60"))  # then a retry takes over
+
+# Upstream LLM client (see llm_client.py)
+LLM_CONNECT_TIMEOUT_SECONDS = float(os.getenv("LLM_CONNECT_TIMEOUT_SECONDS", "3"))
+LLM_READ_TIMEOUT_SECONDS = float(os.getenv("LLM_READ_TIMEOUT_SECONDS", "20"))
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "20"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "5"))  # consecutive, then fall back
+LLM_BREAKER_COOLDOWN_SECONDS = float(os.getenv("LLM_BREAKER_COOLDOWN_SECONDS", "30"))
+LLM_LATENCY_BUDGET_SECONDS = float(os.getenv("LLM_LATENCY_BUDGET_SECONDS", "10"))  # slower counts as a failure
+
+# Caches shared by all worker processes on a host (see caches.py): a SQLite
+# file they all open, e.g. ./shared_cache.db. "" keeps every cache inside
+# its own process, which is fine with a single worker.
+SHARED_CACHE_PATH = os.getenv("SHARED_CACHE_PATH", "")
+
+# Authenticated principal cache (see auth_cache.py)
+AUTH_CACHE_TTL_SECONDS = int(os.getenv("AUTH_CACHE_TTL_SECONDS", "60"))
+AUTH_CACHE_MAX_ENTRIES = int(os.getenv("AUTH_CACHE_MAX_ENTRIES", "10000"))
+
+# Live scores while a questionnaire is filled in (see services/scores.py)
+SCORE_CACHE_TTL_SECONDS = int(os.getenv("SCORE_CACHE_TTL_SECONDS", "1800"))
+SCORE_CACHE_MAX_ENTRIES = int(os.getenv("SCORE_CACHE_MAX_ENTRIES", "10000"))
+
+# Bulk import/export (see services/bulk.py): profiles inserted per transaction, rows per streamed chunk
+BULK_BATCH_SIZE = int(os.getenv("BULK_BATCH_SIZE", "5000"))
+
+# GET /analytics/coverage (see services/coverage.py): emails of the users
+# allowed to read it, comma-separated; nobody when empty
+ANALYTICS_EMAILS = frozenset(e.strip().lower() for e in os.getenv("ANALYTICS_EMAILS", "").split(",") if e.strip())
+
+# Password hashing pool (see password_pool.py); -1 workers = min(4, CPUs), 0 = hash inline
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))  # raise it and old hashes are upgraded on login
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "-1"))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "16"))  # then 429
+PASSWORD_HASH_TIMEOUT_SECONDS = float(os.getenv("PASSWORD_HASH_TIMEOUT_SECONDS", "10"))
+
+# Database connection pool (both the async API engine and the sync CLI engine).
+# SQLite takes one writer at a time, and extra connections only wait on its
+# file lock (then fail with "database is locked"), so it gets a single one.
+# That one connection caps throughput: on SQLite the async API is no faster
+# than the old sync one, and slower at ~1000 concurrent clients (WAL and more
+# connections did not help either). The async gain needs PostgreSQL; see
+# README.md.
+_SQLITE = DATABASE_URL.startswith("sqlite")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "1" if _SQLITE else "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "0" if _SQLITE else "10"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "0") == "1"  # test connections on checkout
+DB_POOL_RECYCLE_SECONDS = int(os.getenv("DB_POOL_RECYCLE_SECONDS", "-1"))  # -1 = never
+
+# Create or upgrade the schema (app/migrations.py) when the app starts. Off:
+# run `python -m app.migrations` once per deploy, before starting the
+# workers, which would otherwise all try to migrate at once. Setting it to
+# 1 is fine for a single process, e.g. local development.
+DB_MIGRATE_ON_STARTUP = os.getenv("DB_MIGRATE_ON_STARTUP", "0") == "1"
+
+# Prometheus-style metrics at GET /metrics and upstream model health at
+# GET /health/llm (see telemetry.py); off unless enabled. With METRICS_TOKEN
+# set, both need an "Authorization: Bearer <token>" header; without it they
+# are open to anyone who can reach the app.
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "0") == "1"
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
@@ -0,0 +1,50 @@
+"""
+Rebuild or check the coverage analytics rollups behind GET /analytics/coverage.
+
+    python -m app.coverage check
+    python -m app.coverage rebuild
+
+`check` recomputes the rollups for the current rules from the stored
+assessments and lists every row that differs from the stored ones,
+exiting non-zero if any do. `rebuild` replaces the rollups with such a
+recompute, in one transaction; run it with the API stopped, or check
+again afterwards, since assessments stored meanwhile may be missed.
+See app/services/coverage.py.
+"""
+import argparse
+import sys
+import time
+
+from .db import engine
+from .migrations import require_current
+from .services import coverage
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Rebuild or check the coverage analytics rollups.")
+    parser.add_argument("command", choices=("check", "rebuild"))
+    parser.add_argument("--limit", type=int, default=20, help="differences to print (check)")
+    args = parser.parse_args()
+
+    require_current(engine)
+    start = time.perf_counter()
+    if args.command == "rebuild":
+        with engine.begin() as conn:
+            members = coverage.rebuild(conn)
+        print(f"Rebuilt from {members:,} questionnaires in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+        return
+
+    with engine.connect() as conn:
+        differences = coverage.check(conn)
+    elapsed = time.perf_counter() - start
+    for line in differences[:args.limit]:
+        print(line)
+    if differences:
+        print(f"{len(differences):,} rollup rows differ from a recompute ({elapsed:.1f}s); "
+              "run `python -m app.coverage rebuild`", file=sys.stderr)
+        sys.exit(1)
+    print(f"Rollups match a recompute ({elapsed:.1f}s)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
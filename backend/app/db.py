@@ -1,27 +1,104 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 
-from .config import DATABASE_URL
+from .config import (
+    DATABASE_URL,
+    DB_MAX_OVERFLOW,
+    DB_POOL_PRE_PING,
+    DB_POOL_RECYCLE_SECONDS,
+    DB_POOL_SIZE,
+)
 
 # Extra argument is needed for SQLite only
 connect_args = {}
 if DATABASE_URL.startswith("sqlite"):
     connect_args = {"check_same_thread": False}
 
+pool_args = {
+    "pool_size": DB_POOL_SIZE,
+    "max_overflow": DB_MAX_OVERFLOW,
+    "pool_pre_ping": DB_POOL_PRE_PING,
+    "pool_recycle": DB_POOL_RECYCLE_SECONDS,
+}
+
+# Sync engine: CLI scripts (app.reassess) and benchmarks
 engine = create_engine(
     DATABASE_URL,
     connect_args=connect_args,
+    **pool_args,
 )
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+
+def async_url(url: str) -> str:
+    """
+    The same database through its asyncio driver: aiosqlite for SQLite,
+    asyncpg for PostgreSQL. URLs that already name a driver are kept.
+    """
+    parsed = make_url(url)
+    if parsed.drivername == "sqlite":
+        parsed = parsed.set(drivername="sqlite+aiosqlite")
+    elif parsed.drivername in ("postgresql", "postgres"):
+        parsed = parsed.set(drivername="postgresql+asyncpg")
+    return parsed.render_as_string(hide_password=False)
+
+
+# Async engine: the API
+async_engine = create_async_engine(async_url(DATABASE_URL), **pool_args)
+
+# Objects stay usable after commit; with AsyncSession an expired attribute
+# can't be lazily reloaded anyway.
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
 
-# Dependency for FastAPI paths (we'll use this later)
-def get_db():
-    db = SessionLocal()
-    try:
+# Dependency for FastAPI paths
+async def get_db():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
+
+
+async def upsert(db: AsyncSession, model, rows, conflict_columns, update_columns) -> None:
+    """
+    Insert `rows` (list of dicts keyed by mapped attribute name) into
+    `model`'s table, updating `update_columns` where a row with the same
+    `conflict_columns` (which must be covered by a unique constraint)
+    already exists.
+
+    One INSERT ... ON CONFLICT DO UPDATE on SQLite and PostgreSQL; other
+    dialects get a bulk DELETE + INSERT inside the caller's transaction.
+    """
+    if not rows:
+        return
+
+    # Attribute names -> table column keys (they differ for renamed columns)
+    columns = inspect(model).columns
+    table = model.__table__
+    rows = [{columns[name].key: value for name, value in row.items()} for row in rows]
+    conflict = [columns[name].key for name in conflict_columns]
+    updates = [columns[name].key for name in update_columns]
+
+    dialect = db.bind.dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+
+        stmt = insert(table).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=conflict,
+            set_={key: stmt.excluded[key] for key in updates},
+        )
+        await db.execute(stmt)
+        return
+
+    from sqlalchemy import delete, insert, tuple_
+
+    keys = [tuple(row[key] for key in conflict) for row in rows]
+    await db.execute(delete(table).where(tuple_(*(table.c[key] for key in conflict)).in_(keys)))
+    await db.execute(insert(table), rows)
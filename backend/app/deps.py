@@ -1,25 +1,62 @@
 from __future__ import annotations
 
+import hmac
 from typing import Annotated
 
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, Header, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from jose import JWTError, jwt
-from sqlalchemy.orm import Session
+from jose import JWTError
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from .config import JWT_SECRET_KEY, JWT_ALGORITHM
+from .config import JWT_SECRET_KEY, JWT_ALGORITHM, METRICS_TOKEN
 from .db import get_db
-from . import models
+from . import auth_cache, models
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
 
-def get_current_user(
+def _verified_subject(token: str) -> str | None:
+    """
+    Verify the JWT and return its subject, memoized until the token expires.
+    """
+    cached = auth_cache.tokens.get(token)
+    if cached is not None:
+        return cached
+
+    # jose.jwt pulls in the crypto backends; only needed on a cache miss
+    from jose import jwt
+
+    payload = jwt.decode(token, JWT_SECRET_KEY, algorithms=[JWT_ALGORITHM])
+    user_id: str | None = payload.get("sub")
+    exp = payload.get("exp")
+    if user_id is not None and exp is not None:
+        auth_cache.tokens.set(token, user_id, float(exp))
+    return user_id
+
+
+def require_metrics_token(authorization: Annotated[str | None, Header()] = None) -> None:
+    """
+    Guard for the monitoring endpoints: with METRICS_TOKEN set, they need
+    it as a bearer token, or raise 401.
+    """
+    expected = f"Bearer {METRICS_TOKEN}".encode()
+    if METRICS_TOKEN and not hmac.compare_digest((authorization or "").encode(), expected):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+
+async def get_current_user(
     token: Annotated[str, Depends(oauth2_scheme)],
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ) -> models.user.User:
     """
-    Decode JWT, load user from DB, or raise 401.
+    Decode JWT, load user (from the principal cache or the DB), or raise 401.
+
+    The returned User is a detached snapshot (id, email, is_active); query
+    the DB if you need anything else.
     """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -28,15 +65,20 @@ def get_current_user(
     )
 
     try:
-        payload = jwt.decode(token, JWT_SECRET_KEY, algorithms=[JWT_ALGORITHM])
-        user_id: str | None = payload.get("sub")
+        user_id = _verified_subject(token)
         if user_id is None:
             raise credentials_exception
     except JWTError:
         raise credentials_exception
 
-    user = db.query(models.user.User).filter(models.user.User.id == user_id).first()
-    if user is None:
+    principal = auth_cache.principals.get(user_id)
+    if principal is None:
+        user = await db.get(models.user.User, user_id)
+        if user is None:
+            raise credentials_exception
+        principal = auth_cache.remember_principal(user)
+
+    if not principal.is_active:
         raise credentials_exception
 
-    return user
+    return principal.as_user()
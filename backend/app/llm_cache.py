@@ -0,0 +1,96 @@
+# backend/app/llm_cache.py
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from .caches import SQLiteCache
+
+
+def cache_key(model: str, temperature: float, *messages: str) -> str:
+    """
+    Content address of an LLM request: identical prompts to the same
+    model and temperature map to the same key.
+    """
+    canonical = json.dumps([model, temperature, *messages], separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """
+    Two-tier cache for LLM results.
+
+    An in-memory LRU (capped at `max_entries`) sits in front of an optional
+    SQLite file that survives restarts and is shared by every worker that
+    opens it. Entries expire after `ttl_seconds` in both tiers. Values must
+    be JSON-serializable; every hit returns a fresh copy.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float, path: Optional[str] = None) -> None:
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.path = path
+
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._disk = SQLiteCache(path, "llm_cache") if path else None
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _remember(self, key: str, expires_at: float, value: str) -> None:
+        self._memory[key] = (expires_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.evictions += 1
+
+    def get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    return json.loads(entry[1])
+                del self._memory[key]
+
+            if self._disk is not None:
+                row = self._disk.get_raw(key)
+                if row is not None:
+                    self._remember(key, row[1], row[0])
+                    self.hits += 1
+                    self.disk_hits += 1
+                    return json.loads(row[0])
+
+            self.misses += 1
+            return None
+
+    def set(self, key: str, value: Any) -> None:
+        encoded = json.dumps(value)
+        expires_at = time.time() + self.ttl_seconds
+        with self._lock:
+            self._remember(key, expires_at, encoded)
+            if self._disk is not None:
+                self._disk.set_raw(key, encoded, expires_at)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            if self._disk is not None:
+                self._disk.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._memory),
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
@@ -0,0 +1,386 @@
+# backend/app/llm_client.py
+import asyncio
+import importlib.util
+import random
+import threading
+import time
+from functools import lru_cache
+from typing import Any, AsyncIterator, Callable, Dict, Optional, Tuple, TypeVar
+
+from .config import (
+    LLM_BREAKER_COOLDOWN_SECONDS,
+    LLM_BREAKER_FAILURES,
+    LLM_CONNECT_TIMEOUT_SECONDS,
+    LLM_LATENCY_BUDGET_SECONDS,
+    LLM_MAX_CONNECTIONS,
+    LLM_MAX_RETRIES,
+    LLM_READ_TIMEOUT_SECONDS,
+)
+from . import telemetry
+
+T = TypeVar("T")
+
+
+class LLMUnavailable(Exception):
+    """
+    The upstream model can't be used right now: the circuit is open, or
+    the call failed after its retries. Callers fall back to static advice.
+    """
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+
+    closed    -> calls go through; `failure_threshold` failures in a row
+                 (a call slower than `latency_budget` counts as one) opens it.
+    open      -> calls are refused for `cooldown_seconds`.
+    half_open -> one trial call is let through; success closes the
+                 circuit, failure opens it again.
+    """
+
+    def __init__(self, failure_threshold: int, cooldown_seconds: float, latency_budget: float) -> None:
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self.latency_budget = latency_budget
+
+        self._lock = threading.Lock()
+        self._state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+
+        self.trips = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == "open" and time.monotonic() - self._opened_at >= self.cooldown_seconds:
+                return "half_open"
+            return self._state
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._state == "closed":
+                return True
+            if self._state == "open":
+                if time.monotonic() - self._opened_at < self.cooldown_seconds:
+                    return False
+                self._state = "half_open"
+            if self._trial_in_flight:
+                return False
+            self._trial_in_flight = True
+            return True
+
+    def record_success(self, latency: float) -> None:
+        if latency > self.latency_budget:
+            self.record_failure()
+            return
+        with self._lock:
+            self._state = "closed"
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def release(self) -> None:
+        """
+        Give up a half-open trial that ended without an outcome (it was
+        cancelled), so the next call can be the trial instead.
+        """
+        with self._lock:
+            if self._state == "half_open":
+                self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._state == "half_open" or self._failures >= self.failure_threshold:
+                if self._state != "open":
+                    self.trips += 1
+                self._state = "open"
+                self._opened_at = time.monotonic()
+
+
+class LLMMetrics:
+    """
+    Process-wide counters for upstream model calls.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.failures = 0
+        self.retries = 0
+        self.short_circuited = 0
+        self.latency_count = 0
+        self.latency_sum = 0.0
+        self.latency_max = 0.0
+        self.latency_last = 0.0
+
+    def observe(self, latency: float) -> None:
+        with self._lock:
+            self.calls += 1
+            self.latency_count += 1
+            self.latency_sum += latency
+            self.latency_max = max(self.latency_max, latency)
+            self.latency_last = latency
+        telemetry.llm_request_seconds.observe(latency)
+
+    def count(self, name: str) -> None:
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "failures": self.failures,
+                "retries": self.retries,
+                "short_circuited": self.short_circuited,
+                "latency_seconds_avg": self.latency_sum / self.latency_count if self.latency_count else 0.0,
+                "latency_seconds_max": self.latency_max,
+                "latency_seconds_last": self.latency_last,
+            }
+
+
+breaker = CircuitBreaker(
+    failure_threshold=LLM_BREAKER_FAILURES,
+    cooldown_seconds=LLM_BREAKER_COOLDOWN_SECONDS,
+    latency_budget=LLM_LATENCY_BUDGET_SECONDS,
+)
+metrics = LLMMetrics()
+
+
+# openai (and httpx under it) takes longer to import than the rest of the
+# app together, so it is only loaded by the first client or call.
+
+@lru_cache(maxsize=None)
+def available() -> bool:
+    return importlib.util.find_spec("openai") is not None
+
+
+@lru_cache(maxsize=None)
+def _errors() -> Tuple[Tuple[type, ...], Tuple[type, ...]]:
+    """
+    (retryable, upstream) exception types; both empty without openai.
+    """
+    if not available():
+        return (), ()
+    import openai
+
+    # Retryable: the request may well succeed a moment later.
+    retryable = (
+        openai.APIConnectionError,  # includes APITimeoutError
+        openai.RateLimitError,
+        openai.InternalServerError,
+    )
+    return retryable, (openai.APIError,)
+
+
+def stats() -> Dict[str, Any]:
+    return {"breaker_state": breaker.state, "breaker_trips": breaker.trips, **metrics.snapshot()}
+
+
+# --- Clients ---
+#
+# One client per API key for the whole process, so HTTP connections are
+# pooled and reused. The SDK's own retries are off; retries happen here,
+# where the breaker can see them.
+
+def _timeout() -> Any:
+    import httpx
+
+    return httpx.Timeout(LLM_READ_TIMEOUT_SECONDS, connect=LLM_CONNECT_TIMEOUT_SECONDS)
+
+
+def _limits() -> Any:
+    import httpx
+
+    return httpx.Limits(max_connections=LLM_MAX_CONNECTIONS, max_keepalive_connections=LLM_MAX_CONNECTIONS)
+
+
+_clients: Dict[str, Any] = {}
+_async_clients: Dict[Tuple[str, asyncio.AbstractEventLoop], Any] = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(api_key: str) -> Any:
+    import httpx
+    from openai import OpenAI
+
+    with _clients_lock:
+        client = _clients.get(api_key)
+        if client is None:
+            client = _clients[api_key] = OpenAI(
+                api_key=api_key,
+                max_retries=0,
+                timeout=_timeout(),
+                http_client=httpx.Client(timeout=_timeout(), limits=_limits()),
+            )
+        return client
+
+
+def get_async_client(api_key: str) -> Any:
+    import httpx
+    from openai import AsyncOpenAI
+
+    # Async connections belong to the event loop that opened them.
+    loop = asyncio.get_running_loop()
+    with _clients_lock:
+        for stale in [k for k in _async_clients if k[1].is_closed()]:
+            del _async_clients[stale]
+        client = _async_clients.get((api_key, loop))
+        if client is None:
+            client = _async_clients[(api_key, loop)] = AsyncOpenAI(
+                api_key=api_key,
+                max_retries=0,
+                timeout=_timeout(),
+                http_client=httpx.AsyncClient(timeout=_timeout(), limits=_limits()),
+            )
+        return client
+
+
+def _backoff(attempt: int) -> float:
+    # Full jitter: spread retries out so a recovering upstream isn't hit in lockstep
+    return random.uniform(0, min(4.0, 0.25 * 2 ** attempt))
+
+
+def _admit() -> None:
+    if not breaker.allow():
+        metrics.count("short_circuited")
+        raise LLMUnavailable("circuit open")
+
+
+def _failed(exc: BaseException) -> LLMUnavailable:
+    metrics.count("failures")
+    breaker.record_failure()
+    return LLMUnavailable(str(exc) or type(exc).__name__)
+
+
+def _abandoned(exc: BaseException) -> None:
+    # An admitted call ended without a result or an upstream error. Any
+    # other exception (a malformed response, a bug) still failed the call;
+    # cancellation (client gone, a timeout around the call) says nothing
+    # about the upstream, but must not keep a half-open trial forever.
+    if isinstance(exc, Exception):
+        metrics.count("failures")
+        breaker.record_failure()
+    else:
+        breaker.release()
+
+
+def call(fn: Callable[[], T]) -> T:
+    """
+    Run one upstream request with jittered retries, behind the breaker.
+    """
+    _admit()
+    retryable, upstream = _errors()
+    start = time.perf_counter()
+    try:
+        for attempt in range(LLM_MAX_RETRIES + 1):
+            try:
+                result = fn()
+                break
+            except retryable as exc:
+                if attempt < LLM_MAX_RETRIES:
+                    metrics.count("retries")
+                    time.sleep(_backoff(attempt))
+                    continue
+                raise _failed(exc) from exc
+            except upstream as exc:
+                raise _failed(exc) from exc
+    except LLMUnavailable:
+        raise
+    except BaseException as exc:
+        _abandoned(exc)
+        raise
+    latency = time.perf_counter() - start
+    metrics.observe(latency)
+    breaker.record_success(latency)
+    telemetry.record_usage(getattr(result, "usage", None))
+    return result
+
+
+async def call_async(fn: Callable[[], Any]) -> Any:
+    """
+    call() for coroutines: `fn` returns an awaitable.
+    """
+    _admit()
+    retryable, upstream = _errors()
+    start = time.perf_counter()
+    try:
+        for attempt in range(LLM_MAX_RETRIES + 1):
+            try:
+                result = await fn()
+                break
+            except retryable as exc:
+                if attempt < LLM_MAX_RETRIES:
+                    metrics.count("retries")
+                    await asyncio.sleep(_backoff(attempt))
+                    continue
+                raise _failed(exc) from exc
+            except upstream as exc:
+                raise _failed(exc) from exc
+    except LLMUnavailable:
+        raise
+    except BaseException as exc:
+        _abandoned(exc)
+        raise
+    latency = time.perf_counter() - start
+    metrics.observe(latency)
+    breaker.record_success(latency)
+    telemetry.record_usage(getattr(result, "usage", None))
+    return result
+
+
+async def stream_deltas(open_stream: Callable[[], Any]) -> AsyncIterator[str]:
+    """
+    Yield the text deltas of a streamed completion. Opening the stream is
+    retried like call_async; latency is time to the first delta, and a
+    failure part-way through counts against the breaker.
+    """
+    _admit()
+    retryable, upstream = _errors()
+    start = time.perf_counter()
+    stream: Optional[Any] = None
+    first = True
+    try:
+        for attempt in range(LLM_MAX_RETRIES + 1):
+            try:
+                stream = await open_stream()
+                break
+            except retryable as exc:
+                if attempt < LLM_MAX_RETRIES:
+                    metrics.count("retries")
+                    await asyncio.sleep(_backoff(attempt))
+                    continue
+                raise _failed(exc) from exc
+            except upstream as exc:
+                raise _failed(exc) from exc
+
+        async for chunk in stream:
+            # With stream_options include_usage, the last chunk has no choices, only usage
+            telemetry.record_usage(getattr(chunk, "usage", None))
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if not delta:
+                continue
+            if first:
+                first = False
+                latency = time.perf_counter() - start
+                metrics.observe(latency)
+                breaker.record_success(latency)
+            yield delta
+    except LLMUnavailable:
+        raise
+    except upstream as exc:
+        raise _failed(exc) from exc
+    except BaseException as exc:
+        # Including GeneratorExit: the consumer stopped reading
+        _abandoned(exc)
+        raise
+
+    if first:
+        # Completed without any text; still a healthy call
+        latency = time.perf_counter() - start
+        metrics.observe(latency)
+        breaker.record_success(latency)
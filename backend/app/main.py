@@ -1,17 +1,27 @@
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 
-from .db import Base, engine
-from .models import user, questionnaire
-from .routers import auth, questionnaire as questionnaire_router
+from . import auth_cache, llm_client, password_pool, query_counter, telemetry
+from .ai_engine import advice_cache, upstream_calls
+from .config import DB_MIGRATE_ON_STARTUP, DEBUG, METRICS_ENABLED
+from .db import async_engine
+from .deps import require_metrics_token
+from .migrations import upgrade_async
+from .models import user, questionnaire, assessment, idempotency, coverage
+from .routers import analytics, auth, bulk, questionnaire as questionnaire_router, report
+from .services import scores
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    Base.metadata.create_all(bind=engine)
+    if DB_MIGRATE_ON_STARTUP:
+        await upgrade_async(async_engine)
     yield
+    password_pool.pool.shutdown()
+    await async_engine.dispose()
 
 
 app = FastAPI(lifespan=lifespan)
@@ -30,8 +40,34 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+if DEBUG:
+    query_counter.install(async_engine.sync_engine)
+    app.add_middleware(query_counter.QueryCountMiddleware)
+
+if METRICS_ENABLED:
+    telemetry.install(async_engine.sync_engine)
+    telemetry.register_stats(
+        "llm", llm_client.stats, counters=("breaker_trips", "calls", "failures", "retries", "short_circuited")
+    )
+    telemetry.register_stats("llm_cache", advice_cache.stats, counters=("hits", "disk_hits", "misses", "evictions"))
+    telemetry.register_stats("auth_token_cache", auth_cache.tokens.stats, counters=("hits", "misses"))
+    telemetry.register_stats("auth_principal_cache", auth_cache.principals.stats, counters=("hits", "misses"))
+    telemetry.register_stats("score_cache", scores.cache.stats, counters=("hits", "misses"))
+    telemetry.register_stats(
+        "complete_singleflight", questionnaire_router.completions.stats, counters=("leaders", "coalesced")
+    )
+    telemetry.register_stats("llm_singleflight", upstream_calls.stats, counters=("leaders", "coalesced"))
+    telemetry.register_stats(
+        "password_pool", password_pool.pool.stats, counters=("completed", "failed", "timed_out", "rejected")
+    )
+    # Added last, so it is the outermost middleware and times everything else
+    app.add_middleware(telemetry.MetricsMiddleware)
+
 app.include_router(auth.router)
 app.include_router(questionnaire_router.router)
+app.include_router(report.router)
+app.include_router(bulk.router)
+app.include_router(analytics.router)
 
 
 @app.get("/")
@@ -42,3 +78,19 @@ def root():
 @app.get("/health")
 def health_check():
     return {"status": "ok"}
+
+
+if METRICS_ENABLED:
+    @app.get("/health/llm", dependencies=[Depends(require_metrics_token)])
+    def llm_health():
+        """
+        Upstream model health: circuit breaker state, call latency and cache counters.
+        """
+        return {**llm_client.stats(), "cache": advice_cache.stats()}
+
+    @app.get("/metrics", include_in_schema=False, dependencies=[Depends(require_metrics_token)])
+    def metrics():
+        """
+        Prometheus text exposition of telemetry's metrics.
+        """
+        return PlainTextResponse(telemetry.render(), media_type="text/plain; version=0.0.4")
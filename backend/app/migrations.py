@@ -0,0 +1,266 @@
+# backend/app/migrations.py
+"""
+Idempotent schema upgrades for databases created by older versions.
+
+Base.metadata.create_all only creates missing tables; changes to tables
+that already exist are applied here. Every step checks first, so running
+upgrade() on an up-to-date database is a no-op. Steps that can't check
+cheaply (they would scan a whole table) run only until they have
+completed once. Every completed step is recorded in the schema_steps
+table, which is how the command-line tools tell that a database is
+behind (require_current) without changing it.
+
+Run it once per deploy, before starting the app's workers:
+
+    python -m app.migrations
+
+With DB_MIGRATE_ON_STARTUP=1 the app runs it on startup instead, which
+suits a single process (local development, tests, benches).
+"""
+import argparse
+import functools
+import json
+from typing import Any, Callable, Dict, List
+
+from sqlalchemy import Column, String, Table, exists, insert, inspect, select, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from .db import Base, engine
+from .models import assessment, coverage, idempotency, user  # noqa: F401  (create_all needs every table)
+from .models.assessment import Assessment
+from .models.coverage import CoverageMember
+from .models.questionnaire import QuestionnaireAnswer, QuestionnaireFacts
+from .services.coverage import rebuild as rebuild_coverage
+from .services.risk_engine import project_facts
+
+BACKFILL_CHUNK = 1000
+
+# Steps that have run to completion (see _once)
+schema_steps = Table("schema_steps", Base.metadata, Column("name", String, primary_key=True))
+
+
+def _once(step: Callable[[Connection], None]) -> Callable[[Connection], None]:
+    """
+    Run `step` until it has completed once (see _upgrade), then skip it.
+    For steps whose only check is the work itself; on a new database it
+    runs against empty tables.
+    """
+    @functools.wraps(step)
+    def run(conn: Connection) -> None:
+        name = step.__name__
+        if conn.execute(select(schema_steps.c.name).where(schema_steps.c.name == name)).first() is None:
+            step(conn)
+
+    return run
+
+
+def _applied(conn: Connection) -> set:
+    if not inspect(conn).has_table(schema_steps.name):
+        return set()
+    return set(conn.execute(select(schema_steps.c.name)).scalars())
+
+
+def _index_names(conn: Connection, table: str) -> set:
+    return {ix["name"] for ix in inspect(conn).get_indexes(table)}
+
+
+def _answers_unique_key(conn: Connection) -> None:
+    if "uq_questionnaire_answers_key" in _index_names(conn, "questionnaire_answers"):
+        return
+    # Older code could race into duplicate rows; keep one per key. ids are
+    # random uuids, so keep the row stored last instead: readers put the
+    # rows in a dict in table order, so that is the answer they showed.
+    row = "rowid" if conn.dialect.name == "sqlite" else "ctid"
+    conn.execute(
+        text(
+            f"DELETE FROM questionnaire_answers WHERE {row} IN ("
+            f" SELECT r FROM (SELECT {row} AS r, ROW_NUMBER() OVER ("
+            f"  PARTITION BY questionnaire_id, question_key ORDER BY {row} DESC) AS n"
+            "  FROM questionnaire_answers) AS ranked"
+            " WHERE n > 1)"
+        )
+    )
+    conn.execute(
+        text(
+            "CREATE UNIQUE INDEX uq_questionnaire_answers_key "
+            "ON questionnaire_answers (questionnaire_id, question_key)"
+        )
+    )
+
+
+@_once
+def _answers_native_json(conn: Connection) -> None:
+    # Answers used to be JSON text in a String column, and readers fell
+    # back to the raw text when it didn't parse. Store those as JSON
+    # strings so the native JSON column can read every row.
+    dialect = conn.dialect.name
+    if dialect == "sqlite":
+        # Declared types don't matter to SQLite; just repair the values.
+        conn.execute(
+            text(
+                "UPDATE questionnaire_answers SET answer_json = json_quote(answer_json) "
+                "WHERE json_valid(answer_json) = 0"
+            )
+        )
+        return
+
+    column = next(c for c in inspect(conn).get_columns("questionnaire_answers") if c["name"] == "answer_json")
+    if column["type"].__class__.__name__ in ("JSON", "JSONB"):
+        return
+    for row_id, raw in conn.execute(text("SELECT id, answer_json FROM questionnaire_answers")).all():
+        try:
+            json.loads(raw)
+        except json.JSONDecodeError:
+            conn.execute(
+                text("UPDATE questionnaire_answers SET answer_json = :value WHERE id = :id"),
+                {"value": json.dumps(raw), "id": row_id},
+            )
+    if dialect == "postgresql":
+        conn.execute(
+            text(
+                "ALTER TABLE questionnaire_answers "
+                "ALTER COLUMN answer_json TYPE JSONB USING answer_json::jsonb"
+            )
+        )
+
+
+@_once
+def _facts_backfill(conn: Connection) -> None:
+    # Typed projection rows for questionnaires answered before it existed;
+    # every write keeps them in sync from then on
+    Answer, Facts = QuestionnaireAnswer, QuestionnaireFacts
+    missing = (
+        select(Answer.questionnaire_id)
+        .where(~exists().where(Facts.questionnaire_id == Answer.questionnaire_id))
+        .distinct()
+        .order_by(Answer.questionnaire_id)
+        .limit(BACKFILL_CHUNK)
+    )
+    while True:
+        ids = conn.execute(missing).scalars().all()
+        if not ids:
+            return
+        contexts: Dict[str, Dict[str, Any]] = {qid: {} for qid in ids}
+        rows = conn.execute(
+            select(Answer.questionnaire_id, Answer.question_key, Answer.answer).where(
+                Answer.questionnaire_id.in_(ids)
+            )
+        )
+        for qid, key, value in rows:
+            contexts[qid][key] = value
+        values: List[Dict[str, Any]] = [
+            {"questionnaire_id": qid, **project_facts(context)} for qid, context in contexts.items()
+        ]
+        conn.execute(insert(Facts), values)
+
+
+def _questionnaires_user_index(conn: Connection) -> None:
+    if "ix_questionnaires_user_updated" in _index_names(conn, "questionnaires"):
+        return
+    # The list endpoint pages on updated_at; it has always had a default,
+    # but make sure no row falls out of the ordering.
+    conn.execute(text("UPDATE questionnaires SET updated_at = created_at WHERE updated_at IS NULL"))
+    conn.execute(
+        text(
+            "CREATE INDEX ix_questionnaires_user_updated "
+            "ON questionnaires (user_id, updated_at, id)"
+        )
+    )
+
+
+def _questionnaires_export_index(conn: Connection) -> None:
+    if "ix_questionnaires_user_id" not in _index_names(conn, "questionnaires"):
+        conn.execute(text("CREATE INDEX ix_questionnaires_user_id ON questionnaires (user_id, id)"))
+
+
+def _answer_versions(conn: Connection) -> None:
+    # Existing rows start at version 0; the first save moves them on.
+    for table in ("questionnaires", "questionnaire_answers"):
+        if "version" in {c["name"] for c in inspect(conn).get_columns(table)}:
+            continue
+        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN version INTEGER NOT NULL DEFAULT 0"))
+
+
+def _coverage_backfill(conn: Connection) -> None:
+    # Rollups for assessments stored before they existed; from then on
+    # they are kept up to date as assessments change
+    if conn.execute(select(CoverageMember.questionnaire_id).limit(1)).first() is not None:
+        return
+    if conn.execute(select(Assessment.id).limit(1)).first() is not None:
+        rebuild_coverage(conn)
+
+
+STEPS = (
+    _answers_unique_key,
+    _answers_native_json,
+    _facts_backfill,
+    _questionnaires_user_index,
+    _answer_versions,
+    _coverage_backfill,
+    _questionnaires_export_index,
+)
+
+
+def _upgrade(conn: Connection) -> None:
+    Base.metadata.create_all(bind=conn)
+    applied = _applied(conn)
+    for step in STEPS:
+        step(conn)
+        if step.__name__ not in applied:
+            conn.execute(insert(schema_steps).values(name=step.__name__))
+
+
+def upgrade(engine: Engine) -> None:
+    with engine.begin() as conn:
+        _upgrade(conn)
+
+
+async def upgrade_async(engine: AsyncEngine) -> None:
+    async with engine.begin() as conn:
+        await conn.run_sync(_upgrade)
+
+
+def pending(conn: Connection) -> List[str]:
+    """
+    The steps this database has not recorded as completed, in order. A
+    database upgraded before steps were recorded lists them all until
+    `python -m app.migrations` runs once more.
+    """
+    applied = _applied(conn)
+    return [step.__name__ for step in STEPS if step.__name__ not in applied]
+
+
+def _require_current(conn: Connection) -> None:
+    steps = pending(conn)
+    if steps:
+        raise SystemExit(
+            f"The database schema is behind ({', '.join(steps)} not applied); "
+            "run `python -m app.migrations` first"
+        )
+
+
+def require_current(engine: Engine) -> None:
+    """
+    Exit with a message if the schema is behind. For the command-line
+    tools, which read and write a live database but leave upgrading it to
+    the deploy step.
+    """
+    with engine.connect() as conn:
+        _require_current(conn)
+
+
+async def require_current_async(engine: AsyncEngine) -> None:
+    async with engine.connect() as conn:
+        await conn.run_sync(_require_current)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Create or upgrade the database schema.")
+    parser.parse_args()
+    upgrade(engine)
+    print(f"schema up to date ({engine.url.render_as_string(hide_password=True)})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+from datetime import datetime
+import uuid
+
+from sqlalchemy import Column, String, DateTime, ForeignKey, UniqueConstraint
+from sqlalchemy.orm import relationship
+
+from ..db import Base
+
+
+class Assessment(Base):
+    """
+    A scored questionnaire: the risk engine result (and optionally the AI
+    advice) for one exact set of answers under one version of the rules.
+    """
+
+    __tablename__ = "assessments"
+    __table_args__ = (
+        UniqueConstraint("questionnaire_id", "answers_hash", "rules_version"),
+    )
+
+    id = Column(String, primary_key=True, index=True, default=lambda: str(uuid.uuid4()))
+    questionnaire_id = Column(String, ForeignKey("questionnaires.id"), nullable=False, index=True)
+    answers_hash = Column(String, nullable=False)   # sha256 of the canonical answers JSON
+    rules_version = Column(String, nullable=False)  # risk_engine.RULES_VERSION
+    context_json = Column(String, nullable=False)   # the answers that were scored
+    assessment_json = Column(String, nullable=False)
+    ai_advice_json = Column(String, nullable=True)  # NULL until advice is generated
+    ai_status = Column(String, nullable=True)       # None (not requested) / pending / ready / failed
+    ai_requested_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    questionnaire = relationship("Questionnaire")
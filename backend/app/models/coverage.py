@@ -0,0 +1,42 @@
+from sqlalchemy import Column, ForeignKey, Integer, String
+
+from ..db import Base
+
+
+class CoverageMember(Base):
+    """
+    What one questionnaire contributes to the coverage rollups: the
+    dimension buckets and scores of its stored assessment. A row exists
+    while the questionnaire has an assessment (see services/coverage.py).
+    """
+
+    __tablename__ = "coverage_members"
+
+    questionnaire_id = Column(String, ForeignKey("questionnaires.id"), primary_key=True)
+    rules_version = Column(String, nullable=False)
+    province = Column(String, nullable=False)
+    age_band = Column(String, nullable=False)
+    dependants = Column(String, nullable=False)
+    overall_score = Column(Integer, nullable=False)
+    life_score = Column(Integer, nullable=False)
+    auto_score = Column(Integer, nullable=False)
+    home_score = Column(Integer, nullable=False)
+    travel_score = Column(Integer, nullable=False)
+
+
+class CoverageRollup(Base):
+    """
+    Number of members and sum of their scores, per rules version,
+    dimension bucket (e.g. province "BC"), score (overall or a category)
+    and histogram bin. Only ever changed by increments.
+    """
+
+    __tablename__ = "coverage_rollups"
+
+    rules_version = Column(String, primary_key=True)
+    dimension = Column(String, primary_key=True)  # all / province / age_band / dependants
+    bucket = Column(String, primary_key=True)
+    score = Column(String, primary_key=True)      # overall / life / auto / home / travel
+    bin = Column(Integer, primary_key=True)       # score // BIN_WIDTH, capped
+    members = Column(Integer, nullable=False)
+    score_total = Column(Integer, nullable=False)
@@ -0,0 +1,20 @@
+from datetime import datetime
+
+from sqlalchemy import Column, String, DateTime, ForeignKey
+
+from ..db import Base
+
+
+class IdempotencyKey(Base):
+    """
+    A client's Idempotency-Key for a request with side effects, and the
+    response to replay when the request is retried with the same key.
+    """
+
+    __tablename__ = "idempotency_keys"
+
+    user_id = Column(String, ForeignKey("users.id"), primary_key=True)
+    key = Column(String, primary_key=True)
+    request = Column(String, nullable=False)         # e.g. "POST /questionnaires/<id>/complete"
+    response_json = Column(String, nullable=True)    # NULL while the first request is in progress
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow, index=True)
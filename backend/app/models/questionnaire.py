@@ -1,32 +1,82 @@
 from datetime import datetime
 import uuid
 
-from sqlalchemy import Column, String, DateTime, ForeignKey
-from sqlalchemy.orm import relationship
+from sqlalchemy import JSON, Boolean, Column, DateTime, Float, ForeignKey, Index, Integer, String
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import backref, relationship
 
 from ..db import Base
 
 
 class Questionnaire(Base):
     __tablename__ = "questionnaires"
+    __table_args__ = (
+        # GET /questionnaires: a user's questionnaires, most recently updated first
+        Index("ix_questionnaires_user_updated", "user_id", "updated_at", "id"),
+        # Bulk exports: a user's questionnaires in id order, a batch at a time
+        Index("ix_questionnaires_user_id", "user_id", "id"),
+    )
 
     id = Column(String, primary_key=True, index=True, default=lambda: str(uuid.uuid4()))
     user_id = Column(String, ForeignKey("users.id"), nullable=False)
     status = Column(String, default="in_progress")  # in_progress / completed
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Bumped by every UPDATE of the row (answer saves touch updated_at), and
+    # the UPDATE only applies if nobody else bumped it first: a concurrent
+    # write fails with StaleDataError instead of being overwritten.
+    version = Column(Integer, nullable=False, server_default="0")
+
+    __mapper_args__ = {"version_id_col": version}
 
     # Relationships
-    user = relationship("User", backref="questionnaires")
+    # write_only: never loads the whole list; use user.questionnaires.select()
+    user = relationship("User", backref=backref("questionnaires", lazy="write_only"))
     answers = relationship("QuestionnaireAnswer", back_populates="questionnaire")
+    facts = relationship("QuestionnaireFacts", uselist=False, back_populates="questionnaire")
 
 
 class QuestionnaireAnswer(Base):
     __tablename__ = "questionnaire_answers"
+    __table_args__ = (
+        # One row per question; the target of the answers upsert
+        Index("uq_questionnaire_answers_key", "questionnaire_id", "question_key", unique=True),
+    )
 
     id = Column(String, primary_key=True, index=True, default=lambda: str(uuid.uuid4()))
     questionnaire_id = Column(String, ForeignKey("questionnaires.id"), nullable=False)
     question_key = Column(String, nullable=False)  # e.g. "age", "income"
-    answer_json = Column(String, nullable=False)   # later you can switch to JSON
+    # Native JSON (JSONB on PostgreSQL); the column keeps its original name
+    answer = Column("answer_json", JSON().with_variant(JSONB(), "postgresql"), nullable=False)
+    # Questionnaire.version of the save that last changed this answer
+    version = Column(Integer, nullable=False, server_default="0")
 
     questionnaire = relationship("Questionnaire", back_populates="answers")
+
+
+class QuestionnaireFacts(Base):
+    """
+    One typed row per questionnaire with the answers the risk engine
+    scores, normalized the way risk_engine.extract_facts does it (a
+    missing answer is 0 / False / "ON"). NULL means the stored answer
+    can't be read as that type. Kept in sync by the answers endpoint, so
+    reporting and batch scoring can read this instead of the key/value rows.
+    """
+
+    __tablename__ = "questionnaire_facts"
+
+    questionnaire_id = Column(String, ForeignKey("questionnaires.id"), primary_key=True)
+    age = Column(Integer, nullable=True, index=True)
+    income = Column(Float, nullable=True, index=True)
+    dependants = Column(Integer, nullable=True)
+    province = Column(String, nullable=True, index=True)
+    has_vehicle = Column(Boolean, nullable=True)
+    liability_limit = Column(Float, nullable=True)
+    owns_home = Column(Boolean, nullable=True)
+    rents = Column(Boolean, nullable=True)
+    has_mortgage = Column(Boolean, nullable=True)
+    travels_outside_canada = Column(Boolean, nullable=True)
+    has_existing_life = Column(Boolean, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    questionnaire = relationship("Questionnaire", back_populates="facts")
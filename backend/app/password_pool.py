@@ -0,0 +1,125 @@
+# backend/app/password_pool.py
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional, TypeVar
+
+from .config import PASSWORD_HASH_MAX_PENDING, PASSWORD_HASH_TIMEOUT_SECONDS, PASSWORD_HASH_WORKERS
+
+T = TypeVar("T")
+
+
+class PoolSaturated(Exception):
+    """
+    Too many password hashes already queued; the caller should answer 429.
+    """
+
+
+class PasswordPool:
+    """
+    Runs bcrypt work in a small process pool, off the request threads.
+
+    At most `max_pending` jobs are admitted (running or queued); past that
+    run() refuses at once instead of letting queueing delay grow. A job
+    stays admitted until it actually ends, even when run() stopped waiting
+    for it. With `workers=0` jobs run in threads instead (same admission
+    limit), which is handy for local runs and scripts.
+    """
+
+    def __init__(self, workers: int, max_pending: int, timeout: float) -> None:
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+
+        self._lock = threading.Lock()
+        self._executor: Optional[Executor] = None
+        self._pending = 0
+
+        self.completed = 0
+        self.failed = 0
+        self.timed_out = 0
+        self.rejected = 0
+
+    def _get_executor(self) -> Executor:
+        with self._lock:
+            if self._executor is None and self.workers <= 0:
+                self._executor = ThreadPoolExecutor(thread_name_prefix="password-hash")
+            elif self._executor is None:
+                # spawn, not fork: the server process has threads (and DB
+                # connections) that a forked child must not inherit.
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._executor
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def _job_done(self, job: Optional[Future]) -> None:
+        with self._lock:
+            self._pending -= 1
+
+    async def run(self, fn: Callable[..., T], *args: Any) -> T:
+        """
+        Run `fn(*args)` in the pool and await the result, or raise
+        PoolSaturated without waiting when the pool is full.
+        """
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.rejected += 1
+                raise PoolSaturated(f"{self._pending} password hashes pending")
+            self._pending += 1
+        job: Optional[Future] = None
+        try:
+            job = self._get_executor().submit(fn, *args)
+            # A job that has started keeps its worker after a timeout or
+            # cancellation here, so it only leaves _pending when it ends
+            job.add_done_callback(self._job_done)
+            result = await asyncio.wait_for(asyncio.wrap_future(job), self.timeout)
+        except asyncio.TimeoutError:
+            # Admitted but stuck behind slower jobs; same answer as a full queue
+            self._count("timed_out")
+            raise PoolSaturated(f"no result within {self.timeout}s") from None
+        except BrokenProcessPool:
+            # A worker died; start a fresh pool on the next call
+            self._count("failed")
+            self.shutdown()
+            raise
+        except Exception:
+            self._count("failed")
+            raise
+        finally:
+            if job is None:
+                self._job_done(None)
+        self._count("completed")
+        return result
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "pending": self._pending,
+                "completed": self.completed,
+                "failed": self.failed,
+                "timed_out": self.timed_out,
+                "rejected": self.rejected,
+            }
+
+
+pool = PasswordPool(
+    workers=PASSWORD_HASH_WORKERS if PASSWORD_HASH_WORKERS >= 0 else min(4, os.cpu_count() or 1),
+    max_pending=PASSWORD_HASH_MAX_PENDING,
+    timeout=PASSWORD_HASH_TIMEOUT_SECONDS,
+)
@@ -0,0 +1,109 @@
+# backend/app/query_counter.py
+"""
+Count SQL statements per request.
+
+Endpoints declare how many statements they may run with @query_budget(n)
+(counted with a cold principal cache). With DEBUG=1, QueryCountMiddleware
+adds the count to every response as X-Query-Count, plus X-Query-Budget
+for budgeted endpoints, and logs a warning when a request goes over.
+The tests check every budgeted response they get (tests/conftest.py), and
+bench/query_budget_check.py runs every endpoint and fails on any overrun.
+"""
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Iterator, List, Optional, TypeVar
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+# A one-element list, so code running in a copied context (SQLAlchemy's
+# greenlets, threadpool calls) still adds to the request's count.
+_count: ContextVar[Optional[List[int]]] = ContextVar("query_count", default=None)
+
+
+class Counter:
+    def __init__(self, cell: List[int]) -> None:
+        self._cell = cell
+
+    @property
+    def count(self) -> int:
+        return self._cell[0]
+
+
+@contextmanager
+def counting() -> Iterator[Counter]:
+    """
+    Count the statements run by this task (and anything it awaits).
+    """
+    cell = [0]
+    token = _count.set(cell)
+    try:
+        yield Counter(cell)
+    finally:
+        _count.reset(token)
+
+
+def _before_cursor_execute(*_: Any) -> None:
+    cell = _count.get()
+    if cell is not None:
+        cell[0] += 1
+
+
+def install(engine: Engine) -> None:
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+
+
+def query_budget(limit: int) -> Callable[[F], F]:
+    """
+    Declare the most statements one call of this endpoint may run.
+    """
+    def decorate(fn: F) -> F:
+        fn.__query_budget__ = limit  # type: ignore[attr-defined]
+        return fn
+
+    return decorate
+
+
+def budget_of(endpoint: Any) -> Optional[int]:
+    return getattr(endpoint, "__query_budget__", None)
+
+
+class QueryCountMiddleware:
+    """
+    ASGI middleware: count statements per HTTP request and report them in
+    the response headers. Meant for DEBUG; it adds a little per-request work.
+    """
+
+    def __init__(self, app: Any) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Any, receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with counting() as counter:
+            async def send_with_count(message: Any) -> None:
+                if message["type"] == "http.response.start":
+                    headers = list(message.get("headers", []))
+                    headers.append((b"x-query-count", str(counter.count).encode()))
+                    # The router has filled in scope["route"] by now
+                    route = scope.get("route")
+                    limit = budget_of(getattr(route, "endpoint", None))
+                    if limit is not None:
+                        headers.append((b"x-query-budget", str(limit).encode()))
+                        if counter.count > limit:
+                            logger.warning(
+                                "%s %s ran %d SQL statements (budget %d)",
+                                scope["method"], scope["path"], counter.count, limit,
+                            )
+                    message = {**message, "headers": headers}
+                await send(message)
+
+            await self.app(scope, receive, send_with_count)
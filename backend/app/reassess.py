@@ -0,0 +1,236 @@
+"""
+Re-score every completed questionnaire with the current risk rules.
+
+    python -m app.reassess [--workers N] [--chunk-size 1000] [--with-ai]
+
+Questionnaire IDs are read in keyset-paginated chunks, scored across a
+process pool and written back to the assessments table with one bulk
+insert per chunk, with their coverage rollup contributions (see
+services/coverage.py). Answers that already have an assessment under the
+current RULES_VERSION are skipped. Progress is checkpointed after every
+chunk so an interrupted run picks up where it stopped.
+
+The AI explainer is never called unless --with-ai is given.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import Any, Deque, Dict, Iterator, List, Optional, Set, Tuple
+
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from .ai_engine import generate_ai_advice
+from .db import SessionLocal, engine
+from .migrations import require_current
+from .models import user  # noqa: F401  (registers User for the relationships)
+from .models.assessment import Assessment
+from .models.questionnaire import Questionnaire, QuestionnaireAnswer
+from .services import coverage, risk_engine
+from .services.reports import answers_hash, context_from_answers
+
+DEFAULT_CHECKPOINT = ".reassess-checkpoint.json"
+
+
+def _completed_id_chunks(db: Session, after: str, chunk_size: int) -> Iterator[List[str]]:
+    while True:
+        ids = (
+            db.execute(
+                select(Questionnaire.id)
+                .where(Questionnaire.status == "completed", Questionnaire.id > after)
+                .order_by(Questionnaire.id)
+                .limit(chunk_size)
+            )
+            .scalars()
+            .all()
+        )
+        if not ids:
+            return
+        yield ids
+        after = ids[-1]
+
+
+def _load_contexts(db: Session, ids: List[str]) -> List[Tuple[str, Dict[str, Any]]]:
+    grouped: Dict[str, List[Any]] = {qid: [] for qid in ids}
+    rows = db.execute(
+        select(
+            QuestionnaireAnswer.questionnaire_id,
+            QuestionnaireAnswer.question_key,
+            QuestionnaireAnswer.answer,
+        ).where(QuestionnaireAnswer.questionnaire_id.in_(ids))
+    )
+    for row in rows:
+        grouped[row.questionnaire_id].append(row)
+    return [(qid, context_from_answers(answers)) for qid, answers in grouped.items()]
+
+
+def _score_chunk(items: List[Tuple[str, Dict[str, Any]]], with_ai: bool) -> List[Dict[str, Any]]:
+    """
+    Runs in a worker process: score one chunk and return assessment rows,
+    each with its coverage member row under "coverage".
+    """
+    results: List[Dict[str, Any]] = []
+    for questionnaire_id, context in items:
+        assessment = risk_engine.evaluate(context)
+        ai_advice = generate_ai_advice(context=context, assessment=assessment) if with_ai else None
+        results.append(
+            {
+                "coverage": coverage.member(questionnaire_id, risk_engine.project_facts(context), assessment),
+                "questionnaire_id": questionnaire_id,
+                "answers_hash": answers_hash(context),
+                "rules_version": risk_engine.RULES_VERSION,
+                "context_json": json.dumps(context),
+                "assessment_json": json.dumps(assessment),
+                "ai_advice_json": json.dumps(ai_advice) if ai_advice is not None else None,
+                "ai_status": "ready" if ai_advice is not None else None,
+            }
+        )
+    return results
+
+
+def _existing(db: Session, ids: List[str]) -> Set[Tuple[str, str]]:
+    return set(
+        db.execute(
+            select(Assessment.questionnaire_id, Assessment.answers_hash).where(
+                Assessment.questionnaire_id.in_(ids),
+                Assessment.rules_version == risk_engine.RULES_VERSION,
+            )
+        ).all()
+    )
+
+
+def _write_results(db: Session, results: List[Dict[str, Any]]) -> int:
+    members = {r["questionnaire_id"]: r.pop("coverage") for r in results}
+    ids = list(members)
+    existing = _existing(db, ids)
+    while True:
+        new_rows = [r for r in results if (r["questionnaire_id"], r["answers_hash"]) not in existing]
+        try:
+            if new_rows:
+                db.execute(insert(Assessment), new_rows)
+                coverage.replace(db.connection(), [members[r["questionnaire_id"]] for r in new_rows])
+            db.commit()
+            return len(new_rows)
+        except IntegrityError:
+            # /complete stored some of these answers since we looked (with
+            # their rollup contributions); skip those and write the rest
+            db.rollback()
+            stored = _existing(db, ids)
+            if stored <= existing:
+                raise
+            existing = stored
+
+
+def _read_checkpoint(path: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(path) as f:
+            checkpoint = json.load(f)
+    except FileNotFoundError:
+        return None
+    if checkpoint.get("rules_version") != risk_engine.RULES_VERSION:
+        # Rules changed since that run; its progress no longer counts.
+        return None
+    return checkpoint
+
+
+def _write_checkpoint(path: str, last_id: str, processed: int) -> None:
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(
+            {"rules_version": risk_engine.RULES_VERSION, "last_id": last_id, "processed": processed},
+            f,
+        )
+    os.replace(tmp, path)
+
+
+def reassess(
+    workers: int,
+    chunk_size: int,
+    checkpoint_path: str,
+    with_ai: bool = False,
+    restart: bool = False,
+) -> int:
+    checkpoint = None if restart else _read_checkpoint(checkpoint_path)
+    after = checkpoint["last_id"] if checkpoint else ""
+    processed = checkpoint["processed"] if checkpoint else 0
+    if checkpoint:
+        print(f"Resuming after {after} ({processed:,} already processed)", file=sys.stderr)
+
+    written = 0
+    scored = 0
+    start = time.perf_counter()
+
+    def drain(pending: Deque[Tuple[str, "Future[List[Dict[str, Any]]]"]]) -> None:
+        nonlocal processed, written, scored
+        # Oldest first, so the checkpoint only ever moves past finished chunks
+        last_id, future = pending.popleft()
+        results = future.result()
+        written += _write_results(db, results)
+        scored += len(results)
+        processed += len(results)
+        _write_checkpoint(checkpoint_path, last_id, processed)
+        rate = scored / (time.perf_counter() - start)
+        print(f"{processed:,} questionnaires, {rate:,.0f} rows/sec", file=sys.stderr)
+
+    require_current(engine)
+    db = SessionLocal()
+    try:
+        # Spawned, not forked: a forked worker would inherit this process's
+        # pooled connections and open SQLite handles
+        with ProcessPoolExecutor(max_workers=workers, mp_context=get_context("spawn")) as pool:
+            pending: Deque[Tuple[str, "Future[List[Dict[str, Any]]]"]] = deque()
+            for ids in _completed_id_chunks(db, after, chunk_size):
+                items = _load_contexts(db, ids)
+                pending.append((ids[-1], pool.submit(_score_chunk, items, with_ai)))
+                if len(pending) >= workers * 2:
+                    drain(pending)
+            while pending:
+                drain(pending)
+    finally:
+        db.close()
+
+    # A finished run starts from scratch next time; new completions can land
+    # anywhere in the (random UUID) key order.
+    if os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+
+    elapsed = time.perf_counter() - start
+    rate = scored / elapsed if elapsed else 0.0
+    print(
+        f"Done: {scored:,} scored, {written:,} new assessments in {elapsed:.1f}s "
+        f"({rate:,.0f} rows/sec)",
+        file=sys.stderr,
+    )
+    return written
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Re-score all completed questionnaires.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT)
+    parser.add_argument("--restart", action="store_true", help="ignore any saved checkpoint")
+    parser.add_argument(
+        "--with-ai",
+        action="store_true",
+        help="also regenerate AI advice (one LLM call per questionnaire)",
+    )
+    args = parser.parse_args()
+
+    reassess(
+        workers=args.workers,
+        chunk_size=args.chunk_size,
+        checkpoint_path=args.checkpoint,
+        with_ai=args.with_ai,
+        restart=args.restart,
+    )
+
+
+if __name__ == "__main__":
+    main()
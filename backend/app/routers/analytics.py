@@ -0,0 +1,35 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..config import ANALYTICS_EMAILS
+from ..db import get_db
+from .. import models
+from ..deps import get_current_user
+from ..query_counter import query_budget
+from ..schemas import CoverageReport
+from ..services import coverage
+
+router = APIRouter(prefix="/analytics", tags=["analytics"])
+
+_DIMENSION_PATTERN = f"^({'|'.join(coverage.DIMENSIONS)})$"
+
+
+@router.get("/coverage", response_model=CoverageReport)
+@query_budget(2)
+async def get_coverage(
+        dimension: Optional[str] = Query(None, pattern=_DIMENSION_PATTERN),
+        db: AsyncSession = Depends(get_db),
+        current_user: models.user.User = Depends(get_current_user),
+):
+    """
+    Distribution of the overall and category scores of every assessed
+    questionnaire (under the current rules), overall and by province, age
+    band and dependants, or by `dimension` only. Read from rollups kept
+    up to date as assessments change, so it costs the same whatever the
+    number of questionnaires. Only for users listed in ANALYTICS_EMAILS.
+    """
+    if current_user.email.lower() not in ANALYTICS_EMAILS:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not allowed to read analytics")
+    return await coverage.coverage_report(db, dimension)
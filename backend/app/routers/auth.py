@@ -1,44 +1,93 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from ..db import get_db
 from .. import models
+from ..password_pool import PoolSaturated
+from ..query_counter import query_budget
 from ..schemas import UserCreate, UserOut, Token
-from ..security import get_password_hash, verify_password, create_access_token
+from ..security import get_password_hash, verify_and_update_password, create_access_token
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
 
+def _too_busy() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail="Too many sign-in attempts right now, please retry shortly",
+        headers={"Retry-After": "1"},
+    )
+
+
+def _email_taken() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail="Email already registered",
+    )
+
+
 @router.post("/register", response_model=UserOut)
-def register_user(user_in: UserCreate, db: Session = Depends(get_db)):
+@query_budget(2)
+async def register_user(user_in: UserCreate, db: AsyncSession = Depends(get_db)):
     # check if user exists
-    existing = db.query(models.user.User).filter(models.user.User.email == user_in.email).first()
+    existing = await db.scalar(select(models.user.User).where(models.user.User.email == user_in.email))
     if existing:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Email already registered",
-        )
+        raise _email_taken()
+
+    # Hand the connection back to the pool while bcrypt runs; hashing can
+    # queue behind a burst of logins and would otherwise starve other requests.
+    await db.close()
+    try:
+        hashed_password = await get_password_hash(user_in.password)
+    except PoolSaturated:
+        raise _too_busy()
 
     user = models.user.User(
         email=user_in.email,
-        hashed_password=get_password_hash(user_in.password),
+        hashed_password=hashed_password,
     )
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    try:
+        await db.commit()
+    except IntegrityError:
+        # Registered by a concurrent request while this one was hashing
+        await db.rollback()
+        raise _email_taken()
     return user
 
 
 @router.post("/login", response_model=Token)
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+@query_budget(3)
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_db)):
     # OAuth2PasswordRequestForm has fields: username, password
-    user = db.query(models.user.User).filter(models.user.User.email == form_data.username).first()
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    user = await db.scalar(select(models.user.User).where(models.user.User.email == form_data.username))
+    if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
         )
+    user_id, hashed_password = user.id, user.hashed_password
+
+    # As in register_user: don't hold a DB connection while bcrypt runs
+    await db.close()
+    try:
+        verified, new_hash = await verify_and_update_password(form_data.password, hashed_password)
+    except PoolSaturated:
+        raise _too_busy()
+    if not verified:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Incorrect email or password",
+        )
+
+    if new_hash is not None:
+        # Stored hash uses outdated settings; upgrade it while we have the password
+        user = await db.get(models.user.User, user_id)
+        user.hashed_password = new_hash
+        await db.commit()
 
-    access_token = create_access_token(data={"sub": user.id})
+    access_token = create_access_token(data={"sub": user_id})
     return Token(access_token=access_token)
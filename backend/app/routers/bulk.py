@@ -0,0 +1,131 @@
+import tempfile
+from typing import AsyncIterator, List
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..config import BULK_BATCH_SIZE
+from ..db import get_db
+from .. import models
+from ..deps import get_current_user
+from ..query_counter import query_budget
+from ..schemas import BulkImportResult
+from ..services import bulk
+
+router = APIRouter(prefix="/bulk", tags=["bulk"])
+
+_FORMATS = {media_type: fmt for fmt, media_type in bulk.MEDIA_TYPES.items()}
+_EXTENSIONS = {"ndjson": "ndjson", "parquet": "parquet", "arrow": "arrows"}
+_FORMAT_PATTERN = "^(ndjson|parquet|arrow)$"
+# Columnar uploads are spooled before reading (a Parquet file's index is at
+# its end); past this size the spool moves to a temporary file.
+_SPOOL_MAX_MEMORY = 8 * 1024 * 1024
+
+
+def _require_format_support(fmt: str) -> None:
+    if fmt in bulk.COLUMNAR and not bulk.columnar_available():
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Parquet and Arrow need pyarrow on the server; send NDJSON",
+        )
+
+
+async def _record_batches(request: Request, fmt: str) -> AsyncIterator[List[bulk.Record]]:
+    if fmt == "ndjson":
+        reader = bulk.NDJSONReader()
+        pending: List[bulk.Record] = []
+        async for chunk in request.stream():
+            pending.extend(reader.feed(chunk))
+            while len(pending) >= BULK_BATCH_SIZE:
+                yield pending[:BULK_BATCH_SIZE]
+                del pending[:BULK_BATCH_SIZE]
+        pending.extend(reader.close())
+        if pending:
+            yield pending
+        return
+
+    with tempfile.SpooledTemporaryFile(_SPOOL_MAX_MEMORY) as spool:
+        async for chunk in request.stream():
+            spool.write(chunk)
+        spool.seek(0)
+        for records in bulk.columnar_records(spool, fmt):
+            yield records
+
+
+@router.post("/questionnaires", response_model=BulkImportResult)
+@query_budget(7)
+async def import_questionnaires(
+        request: Request,
+        score: bool = False,
+        db: AsyncSession = Depends(get_db),
+        current_user: models.user.User = Depends(get_current_user),
+):
+    """
+    Create a questionnaire for the logged-in user from every record in the
+    body: NDJSON (application/x-ndjson, the default), Parquet or an Arrow
+    IPC stream; see services/bulk.py for the records. With `score`, each is
+    also scored and completed. Records are read and committed
+    BULK_BATCH_SIZE at a time (the query budget is for one batch). A bad
+    record fails the request with 422; the batches before it stay imported.
+    """
+    media_type = request.headers.get("content-type", bulk.MEDIA_TYPES["ndjson"]).split(";")[0].strip()
+    fmt = _FORMATS.get(media_type)
+    if fmt is None:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail=f"Send one of: {', '.join(bulk.MEDIA_TYPES.values())}",
+        )
+    _require_format_support(fmt)
+
+    imported = 0
+    try:
+        async for records in _record_batches(request, fmt):
+            imported += await bulk.import_batch(db, current_user.id, records, score=score)
+    except ValueError as exc:  # including pyarrow's ArrowInvalid
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"{exc} ({imported} imported before it)",
+        )
+    return BulkImportResult(imported=imported, status="completed" if score else "in_progress")
+
+
+def _download(chunks: AsyncIterator[bytes], name: str, fmt: str) -> StreamingResponse:
+    return StreamingResponse(
+        chunks,
+        media_type=bulk.MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{name}.{_EXTENSIONS[fmt]}"'},
+    )
+
+
+@router.get("/questionnaires")
+@query_budget(2)
+async def export_questionnaires(
+        fmt: str = Query("ndjson", alias="format", pattern=_FORMAT_PATTERN),
+        db: AsyncSession = Depends(get_db),
+        current_user: models.user.User = Depends(get_current_user),
+):
+    """
+    Stream the logged-in user's questionnaires with their answers as
+    NDJSON, Parquet or Arrow; the export query runs as the body streams.
+    """
+    _require_format_support(fmt)
+    # The export reads each batch on a connection of its own
+    await db.close()
+    return _download(bulk.export_questionnaires(fmt, current_user.id), "questionnaires", fmt)
+
+
+@router.get("/assessments")
+@query_budget(2)
+async def export_assessments(
+        fmt: str = Query("ndjson", alias="format", pattern=_FORMAT_PATTERN),
+        db: AsyncSession = Depends(get_db),
+        current_user: models.user.User = Depends(get_current_user),
+):
+    """
+    Stream every stored assessment of the logged-in user's questionnaires
+    as NDJSON, Parquet or Arrow; the export query runs as the body streams.
+    """
+    _require_format_support(fmt)
+    await db.close()
+    return _download(bulk.export_assessments(fmt, current_user.id), "assessments", fmt)
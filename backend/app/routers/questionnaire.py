@@ -1,26 +1,118 @@
+import base64
+import binascii
 import json
-from typing import Dict, Any
+import uuid
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, BackgroundTasks, Depends, Header, HTTPException, Query, Response, status
+from sqlalchemy import select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+from sqlalchemy.orm.exc import StaleDataError
 
-from ..db import get_db
+from ..db import get_db, upsert
 from .. import models
 from ..schemas import (
     QuestionnaireOut,
+    QuestionnaireAnswersPatched,
     QuestionnaireAnswersUpdate,
+    QuestionnairePage,
+    QuestionnaireScore,
+    QuestionnaireSummary,
     QuestionnaireWithAnswers,
 )
 from ..deps import get_current_user
-from ..services import risk_engine
-from ..ai_engine import generate_ai_advice
+from ..query_counter import query_budget
+from ..singleflight import SingleFlight
+from ..telemetry import risk_evaluate_seconds
+from ..services import advice_jobs, idempotency, reports, risk_engine, scores
 
 router = APIRouter(prefix="/questionnaires", tags=["questionnaires"])
 
+# In-flight /complete runs by (user, questionnaire, stream_advice). A call
+# that arrives while one is running overlaps it in time, so its result is
+# one the call could have got anyway. Across workers, the row lock and the
+# stored assessment's "pending" status keep advice from being requested twice.
+completions = SingleFlight()
+
+
+async def _load_with_answers(
+        db: AsyncSession,
+        questionnaire_id: str,
+        user_id: str,
+        for_update: bool = False,
+) -> Optional[models.questionnaire.Questionnaire]:
+    """
+    The user's questionnaire with its answers, in one joined query. With
+    `for_update`, concurrent writers to it wait until this transaction ends
+    (SQLite has one writer anyway and ignores it).
+    """
+    Questionnaire = models.questionnaire.Questionnaire
+    stmt = (
+        select(Questionnaire)
+        .options(joinedload(Questionnaire.answers))
+        .where(Questionnaire.id == questionnaire_id, Questionnaire.user_id == user_id)
+    )
+    if for_update:
+        stmt = stmt.with_for_update(of=Questionnaire)
+    result = await db.execute(stmt)
+    return result.unique().scalar_one_or_none()
+
+
+def encode_cursor(updated_at: datetime, questionnaire_id: str) -> str:
+    raw = json.dumps([updated_at.isoformat(), questionnaire_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def _decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    try:
+        updated_at, questionnaire_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return datetime.fromisoformat(updated_at), str(questionnaire_id)
+    except (binascii.Error, UnicodeError, ValueError, TypeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+
+@router.get("/", response_model=QuestionnairePage)
+@query_budget(2)
+async def list_questionnaires(
+        status_filter: Optional[str] = Query(None, alias="status"),
+        cursor: Optional[str] = None,
+        limit: int = Query(20, ge=1, le=100),
+        db: AsyncSession = Depends(get_db),
+        current_user: models.user.User = Depends(get_current_user),
+):
+    """
+    The logged-in user's questionnaires, most recently updated first,
+    without answers. Keyset-paginated: pass `next_cursor` back as `cursor`
+    to get the next page, so a deep page costs the same as the first.
+    """
+    Questionnaire = models.questionnaire.Questionnaire
+    stmt = (
+        select(Questionnaire.id, Questionnaire.status, Questionnaire.created_at, Questionnaire.updated_at)
+        .where(Questionnaire.user_id == current_user.id)
+        .order_by(Questionnaire.updated_at.desc(), Questionnaire.id.desc())
+        .limit(limit + 1)
+    )
+    if status_filter is not None:
+        stmt = stmt.where(Questionnaire.status == status_filter)
+    if cursor is not None:
+        # Row-value comparison, so the index on (user_id, updated_at, id) is a range scan
+        stmt = stmt.where(tuple_(Questionnaire.updated_at, Questionnaire.id) < tuple_(*_decode_cursor(cursor)))
+
+    rows = (await db.execute(stmt)).all()
+    items = [QuestionnaireSummary.model_validate(row) for row in rows[:limit]]
+    next_cursor = None
+    if len(rows) > limit:
+        last = rows[limit - 1]
+        next_cursor = encode_cursor(last.updated_at, last.id)
+    return QuestionnairePage(items=items, next_cursor=next_cursor)
+
 
 @router.post("/", response_model=QuestionnaireOut)
-def create_questionnaire(
-        db: Session = Depends(get_db),
+@query_budget(2)
+async def create_questionnaire(
+        db: AsyncSession = Depends(get_db),
         current_user: models.user.User = Depends(get_current_user),
 ):
     """
@@ -31,117 +123,301 @@ def create_questionnaire(
         status="in_progress",
     )
     db.add(q)
-    db.commit()
-    db.refresh(q)
+    await db.commit()
     return q
 
 
+def _etag(version: int) -> str:
+    return f'"{version}"'
+
+
+def _if_match_version(if_match: Optional[str]) -> int:
+    if if_match is None:
+        raise HTTPException(
+            status_code=status.HTTP_428_PRECONDITION_REQUIRED,
+            detail="If-Match with the questionnaire version is required",
+        )
+    tag = if_match.strip()
+    if tag.startswith("W/"):
+        tag = tag[2:]
+    try:
+        return int(tag.strip('"'))
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="If-Match must be a questionnaire version")
+
+
+def _differs(old: Any, new: Any) -> bool:
+    # Compared as JSON, so e.g. true and 1 still count as different answers;
+    # object keys are sorted, since JSONB does not keep their order
+    return json.dumps(old, sort_keys=True) != json.dumps(new, sort_keys=True)
+
+
+def _conflict(version: int, changes: Dict[str, Any]) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail={
+            "message": "Answers were changed elsewhere; merge `changes` and retry with the new version",
+            "version": version,
+            "changes": changes,
+        },
+        headers={"ETag": _etag(version)},
+    )
+
+
+async def _save_answers(
+        db: AsyncSession,
+        q: models.questionnaire.Questionnaire,
+        existing: Dict[str, Any],
+        changed: Dict[str, Any],
+) -> Dict[str, Any]:
+    """
+    Write the changed answers as a new version of the questionnaire and
+    commit; returns the full set of answers. `q` should have been loaded
+    for update.
+    """
+    # The versioned UPDATE goes first, so a lost race writes nothing else
+    q.updated_at = datetime.utcnow()
+    try:
+        await db.flush()
+    except StaleDataError:
+        # Only possible if something wrote to it without taking the row lock
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Questionnaire was saved concurrently; reload it and retry",
+        )
+
+    answers_dict: Dict[str, Any] = {**existing, **changed}
+    # All changed keys in one statement
+    await upsert(
+        db,
+        models.questionnaire.QuestionnaireAnswer,
+        [
+            {
+                "id": str(uuid.uuid4()),
+                "questionnaire_id": q.id,
+                "question_key": key,
+                "answer": value,
+                "version": q.version,
+            }
+            for key, value in changed.items()
+        ],
+        conflict_columns=("questionnaire_id", "question_key"),
+        update_columns=("answer", "version"),
+    )
+    await reports.save_facts(db, q.id, answers_dict)
+    if q.status == "completed":
+        # Stored reports describe the old answers (only /complete creates them)
+        await reports.invalidate(db, q.id)
+    await db.commit()
+    return answers_dict
+
+
 @router.put("/{questionnaire_id}/answers", response_model=QuestionnaireWithAnswers)
-def update_questionnaire_answers(
+@query_budget(8)  # 6, plus 2 to take a completed questionnaire out of the coverage rollups
+async def update_questionnaire_answers(
         questionnaire_id: str,
         payload: QuestionnaireAnswersUpdate,
-        db: Session = Depends(get_db),
+        response: Response,
+        db: AsyncSession = Depends(get_db),
         current_user: models.user.User = Depends(get_current_user),
 ):
     """
-    Upsert answers for this questionnaire.
+    Upsert answers for this questionnaire. Last write wins; autosaving
+    clients should PATCH instead.
     """
-    q = (
-        db.query(models.questionnaire.Questionnaire)
-        .filter(
-            models.questionnaire.Questionnaire.id == questionnaire_id,
-            models.questionnaire.Questionnaire.user_id == current_user.id,
-        )
-        .first()
-    )
+    q = await _load_with_answers(db, questionnaire_id, current_user.id, for_update=True)
     if not q:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Questionnaire not found")
 
-    # Load existing answers into a dict
-    existing: Dict[str, models.questionnaire.QuestionnaireAnswer] = {
-        ans.question_key: ans for ans in q.answers
+    existing: Dict[str, Any] = {ans.question_key: ans.answer for ans in q.answers}
+    changed: Dict[str, Any] = {
+        key: value
+        for key, value in payload.answers.items()
+        if key not in existing or _differs(existing[key], value)
     }
 
-    for key, value in payload.answers.items():
-        value_str = json.dumps(value)  # store as JSON string for now
-
-        if key in existing:
-            existing[key].answer_json = value_str
-        else:
-            ans = models.questionnaire.QuestionnaireAnswer(
-                questionnaire_id=q.id,
-                question_key=key,
-                answer_json=value_str,
-            )
-            db.add(ans)
-
-    db.commit()
-    db.refresh(q)
-
-    # Build answers dict to return
-    answers_dict: Dict[str, Any] = {}
-    for ans in q.answers:
-        try:
-            answers_dict[ans.question_key] = json.loads(ans.answer_json)
-        except json.JSONDecodeError:
-            answers_dict[ans.question_key] = ans.answer_json
+    answers_dict = await _save_answers(db, q, existing, changed) if changed else existing
 
+    response.headers["ETag"] = _etag(q.version)
     return QuestionnaireWithAnswers(
         id=q.id,
         status=q.status,
+        version=q.version,
         answers=answers_dict,
     )
 
 
-@router.get("/{questionnaire_id}", response_model=QuestionnaireWithAnswers)
-def get_questionnaire(
+@router.patch("/{questionnaire_id}/answers", response_model=QuestionnaireAnswersPatched)
+@query_budget(8)  # as PUT
+async def patch_questionnaire_answers(
         questionnaire_id: str,
-        db: Session = Depends(get_db),
+        payload: QuestionnaireAnswersUpdate,
+        response: Response,
+        if_match: Optional[str] = Header(None),
+        db: AsyncSession = Depends(get_db),
         current_user: models.user.User = Depends(get_current_user),
 ):
-    q = (
-        db.query(models.questionnaire.Questionnaire)
-        .filter(
-            models.questionnaire.Questionnaire.id == questionnaire_id,
-            models.questionnaire.Questionnaire.user_id == current_user.id,
-        )
-        .first()
+    """
+    Autosave: send only the answers that changed, with If-Match set to the
+    version the client last saw (from GET, PUT or the previous PATCH).
+
+    Returns the new version and any answers saved elsewhere since the
+    client's version. If one of those is also in this patch, with a
+    different value, nothing is written: 409 with the current version and
+    those `changes`, so the client can merge and retry.
+    """
+    base = _if_match_version(if_match)
+    q = await _load_with_answers(db, questionnaire_id, current_user.id, for_update=True)
+    if not q:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Questionnaire not found")
+
+    existing: Dict[str, Any] = {ans.question_key: ans.answer for ans in q.answers}
+    if base > q.version:
+        # Not a version this questionnaire has had; resend everything
+        raise _conflict(q.version, existing)
+
+    newer: Dict[str, Any] = {ans.question_key: ans.answer for ans in q.answers if ans.version > base}
+    if any(key in newer and _differs(newer[key], value) for key, value in payload.answers.items()):
+        raise _conflict(q.version, newer)
+
+    changed: Dict[str, Any] = {
+        key: value
+        for key, value in payload.answers.items()
+        if key not in existing or _differs(existing[key], value)
+    }
+    if changed:
+        await _save_answers(db, q, existing, changed)
+
+    response.headers["ETag"] = _etag(q.version)
+    return QuestionnaireAnswersPatched(
+        version=q.version,
+        changes={key: value for key, value in newer.items() if key not in payload.answers},
     )
+
+
+@router.get("/{questionnaire_id}", response_model=QuestionnaireWithAnswers)
+@query_budget(2)
+async def get_questionnaire(
+        questionnaire_id: str,
+        response: Response,
+        db: AsyncSession = Depends(get_db),
+        current_user: models.user.User = Depends(get_current_user),
+):
+    q = await _load_with_answers(db, questionnaire_id, current_user.id)
     if not q:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Questionnaire not found")
 
-    answers_dict: Dict[str, Any] = {}
-    for ans in q.answers:
-        try:
-            answers_dict[ans.question_key] = json.loads(ans.answer_json)
-        except json.JSONDecodeError:
-            answers_dict[ans.question_key] = ans.answer_json
+    answers_dict: Dict[str, Any] = {ans.question_key: ans.answer for ans in q.answers}
 
+    response.headers["ETag"] = _etag(q.version)
     return QuestionnaireWithAnswers(
         id=q.id,
         status=q.status,
+        version=q.version,
         answers=answers_dict,
     )
 
 
+@router.get("/{questionnaire_id}/score", response_model=QuestionnaireScore)
+@query_budget(3)  # 2, plus 1 more in the rare case the cached version is ahead of the row
+async def get_score(
+        questionnaire_id: str,
+        response: Response,
+        db: AsyncSession = Depends(get_db),
+        current_user: models.user.User = Depends(get_current_user),
+):
+    """
+    Risk scores for the answers saved so far, cheap enough to call after
+    every autosave: no recommendations, no AI, nothing stored. Only the
+    answers changed since the last call are read, and only the categories
+    they feed are re-scored.
+    """
+    try:
+        scored = await scores.current_scores(db, questionnaire_id, current_user.id)
+    except (TypeError, ValueError) as exc:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Answers cannot be scored yet: {exc}",
+        )
+    if scored is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Questionnaire not found")
+
+    response.headers["ETag"] = _etag(scored.version)
+    return QuestionnaireScore(version=scored.version, **risk_engine.scores(scored.state))
+
+
 @router.post("/{questionnaire_id}/complete")
-def complete_questionnaire(
+@query_budget(14)  # 11 (3 of them for the coverage rollups), plus 2 to claim an Idempotency-Key and 1 to store the response
+async def complete_questionnaire(
         questionnaire_id: str,
-        db: Session = Depends(get_db),
+        background_tasks: BackgroundTasks,
+        response: Response,
+        stream_advice: bool = False,
+        idempotency_key: Optional[str] = Header(None, max_length=255),
+        db: AsyncSession = Depends(get_db),
         current_user: models.user.User = Depends(get_current_user),
 ):
     """
-    Mark questionnaire as completed, run risk engine, and return a report
-    including an AI-generated explanation.
+    Mark questionnaire as completed, run risk engine, and return the report
+    right away. The AI-generated explanation is produced by a background
+    job; poll GET /reports/{id}/advice until `ai_status` is "ready".
+    With `stream_advice=true` no job is queued and the client collects the
+    advice from GET /reports/{id}/advice/stream instead.
+
+    Send an Idempotency-Key header to make retries safe: a retry with the
+    same key gets the first response back (with Idempotent-Replayed: true)
+    and queues nothing, or a 409 while the first one is still running.
+    Concurrent calls (with or without keys) share one run and its report.
     """
-    q = (
-        db.query(models.questionnaire.Questionnaire)
-        .filter(
-            models.questionnaire.Questionnaire.id == questionnaire_id,
-            models.questionnaire.Questionnaire.user_id == current_user.id,
+    claim = None
+    if idempotency_key is not None:
+        request = f"POST /questionnaires/{questionnaire_id}/complete?stream_advice={stream_advice}"
+        claim, fresh = await idempotency.claim(db, current_user.id, idempotency_key, request)
+        if not fresh:
+            if claim.request != request:
+                raise HTTPException(
+                    status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                    detail="Idempotency-Key was already used for a different request",
+                )
+            if claim.response_json is None:
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail="A request with this Idempotency-Key is still in progress",
+                    headers={"Retry-After": "1"},
+                )
+            response.headers["Idempotent-Replayed"] = "true"
+            return json.loads(claim.response_json)
+
+    try:
+        # Double submits and several open tabs: concurrent calls share one run
+        (report, job), ran = await completions.do(
+            (current_user.id, questionnaire_id, stream_advice),
+            lambda: _complete(db, questionnaire_id, current_user.id, stream_advice, claim),
         )
-        .first()
-    )
+        if not ran and claim is not None:
+            idempotency.finish(claim, report)
+            await db.commit()
+    except Exception:
+        if claim is not None:
+            await idempotency.release(db, claim)
+        raise
+
+    if ran and job is not None:
+        # Runs after the response is sent (will fallback if OPENAI_API_KEY not set)
+        background_tasks.add_task(advice_jobs.run_advice_job, *job)
+    return report
+
+
+async def _complete(
+        db: AsyncSession,
+        questionnaire_id: str,
+        user_id: str,
+        stream_advice: bool,
+        claim: Optional[models.idempotency.IdempotencyKey],
+) -> Tuple[Dict[str, Any], Optional[Tuple[str, Dict[str, Any], Dict[str, Any]]]]:
+    # (report, advice job arguments or None); commits
+    q = await _load_with_answers(db, questionnaire_id, user_id, for_update=True)
     if not q:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -149,24 +425,27 @@ def complete_questionnaire(
         )
 
     # Build context from answers
-    context: Dict[str, Any] = {}
-    for ans in q.answers:
-        try:
-            value = json.loads(ans.answer_json)
-        except json.JSONDecodeError:
-            value = ans.answer_json
-        context[ans.question_key] = value
+    context = reports.context_from_answers(q.answers)
+    digest = reports.answers_hash(context)
 
-    # Run rule-based risk engine
-    assessment = risk_engine.evaluate(context)
+    # Same answers, same rules: reuse the stored assessment
+    stored = await reports.find_assessment(db, q.id, digest)
+    if stored is not None:
+        assessment = json.loads(stored.assessment_json)
+    else:
+        # Run rule-based risk engine
+        with risk_evaluate_seconds.time():
+            assessment = risk_engine.evaluate(context)
+        stored = await reports.save_assessment(db, q.id, digest, context, assessment)
 
-    # Call AI explainer (will fallback if OPENAI_API_KEY not set)
-    ai_advice = generate_ai_advice(context=context, assessment=assessment)
+    # A streaming client generates the advice itself; "pending" would have
+    # pollers wait for a job that was never queued
+    queue_advice = not stream_advice and reports.needs_advice(stored)
+    if queue_advice:
+        reports.mark_advice_pending(stored)
 
     # Mark as completed
     q.status = "completed"
-    db.commit()
-    db.refresh(q)
 
     # Payload returned to frontend
     report = {
@@ -174,7 +453,12 @@ def complete_questionnaire(
         "status": q.status,
         "context": context,
         "assessment": assessment,
-        "ai_advice": ai_advice,
+        "ai_advice": json.loads(stored.ai_advice_json) if stored.ai_advice_json is not None else None,
+        "ai_status": stored.ai_status,
     }
+    if claim is not None:
+        idempotency.finish(claim, report)
+    await db.commit()
 
-    return report
\ No newline at end of file
+    job = (stored.id, context, assessment) if queue_advice else None
+    return report, job
@@ -0,0 +1,133 @@
+import json
+from typing import Any, AsyncIterator, Dict
+
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from fastapi.responses import JSONResponse, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..db import get_db
+from .. import models
+from ..deps import get_current_user
+from ..query_counter import query_budget
+from ..services import advice_jobs, reports
+
+router = APIRouter(prefix="/reports", tags=["reports"])
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+@router.get("/{questionnaire_id}")
+@query_budget(2)
+async def get_report(
+        questionnaire_id: str,
+        request: Request,
+        db: AsyncSession = Depends(get_db),
+        current_user: models.user.User = Depends(get_current_user),
+):
+    """
+    Serve the stored report for a completed questionnaire without
+    re-scoring or calling the AI model. Supports If-None-Match.
+    """
+    found = await reports.latest_assessment(db, questionnaire_id, current_user.id)
+    if found is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Questionnaire not found")
+
+    q_status, stored = found
+    if stored is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No report yet; complete the questionnaire first",
+        )
+
+    etag = reports.report_etag(stored, q_status)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    return JSONResponse(reports.build_report(stored, q_status), headers=headers)
+
+
+@router.get("/{questionnaire_id}/advice")
+@query_budget(2)
+async def get_report_advice(
+        questionnaire_id: str,
+        db: AsyncSession = Depends(get_db),
+        current_user: models.user.User = Depends(get_current_user),
+):
+    """
+    Poll for the AI explanation queued by /complete.
+    """
+    found = await reports.latest_assessment(db, questionnaire_id, current_user.id)
+    if found is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Questionnaire not found")
+
+    _, stored = found
+    if stored is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No report yet; complete the questionnaire first",
+        )
+
+    return {
+        "questionnaire_id": questionnaire_id,
+        "ai_status": stored.ai_status,
+        "ai_advice": json.loads(stored.ai_advice_json) if stored.ai_advice_json is not None else None,
+    }
+
+
+def _sse(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@router.get("/{questionnaire_id}/advice/stream")
+@query_budget(2)
+async def stream_report_advice(
+        questionnaire_id: str,
+        db: AsyncSession = Depends(get_db),
+        current_user: models.user.User = Depends(get_current_user),
+):
+    """
+    Server-sent events with the AI explanation: `summary` and `bullet`
+    events as soon as each line is generated, then `done` with the full
+    advice. Ready advice is replayed immediately. Pair with
+    POST /questionnaires/{id}/complete?stream_advice=true so the advice
+    isn't also generated by the background job; a stream opened while
+    the job is running shares its upstream call.
+    """
+    found = await reports.latest_assessment(db, questionnaire_id, current_user.id)
+    if found is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Questionnaire not found")
+
+    _, stored = found
+    if stored is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No report yet; complete the questionnaire first",
+        )
+
+    assessment_id = stored.id
+    context: Dict[str, Any] = json.loads(stored.context_json)
+    assessment: Dict[str, Any] = json.loads(stored.assessment_json)
+    ready = json.loads(stored.ai_advice_json) if stored.ai_status == "ready" else None
+
+    # Don't hold a DB connection for the length of the stream; the job
+    # stores the advice through its own session.
+    await db.close()
+
+    async def events() -> AsyncIterator[str]:
+        if ready is not None:
+            yield _sse("done", ready)
+            return
+        async for event, payload in advice_jobs.stream_advice_job(assessment_id, context, assessment):
+            yield _sse(event, payload if event in ("done", "error") else {"text": payload})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
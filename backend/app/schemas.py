@@ -1,4 +1,5 @@
-from typing import Any, Dict
+from datetime import datetime
+from typing import Any, Dict, List, Optional
 
 from pydantic import BaseModel, EmailStr
 
@@ -33,15 +34,70 @@ class QuestionnaireOut(BaseModel):
         from_attributes = True
 
 
+class QuestionnaireSummary(BaseModel):
+    id: str
+    status: str
+    created_at: datetime
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class QuestionnairePage(BaseModel):
+    items: List[QuestionnaireSummary]
+    next_cursor: Optional[str] = None  # pass back as ?cursor= for the next page; None on the last page
+
+
 class QuestionnaireAnswersUpdate(BaseModel):
     answers: Dict[str, Any]
     # e.g. { "age": 32, "income": 90000, "province": "ON" }
 
 
+class QuestionnaireAnswersPatched(BaseModel):
+    version: int
+    # Answers saved by someone else since the If-Match version
+    changes: Dict[str, Any]
+
+
+class QuestionnaireScore(BaseModel):
+    version: int
+    overall_risk_score: int
+    categories: Dict[str, int]
+
+
 class QuestionnaireWithAnswers(BaseModel):
     id: str
     status: str
+    version: int  # send back as If-Match when PATCHing answers
     answers: Dict[str, Any]
 
     class Config:
         from_attributes = True
+
+
+# --- bulk import / export --- #
+
+class BulkImportResult(BaseModel):
+    imported: int  # questionnaires created
+    status: str    # theirs: "completed" (scored) or "in_progress"
+
+
+# --- analytics --- #
+
+class ScoreDistribution(BaseModel):
+    mean: float
+    histogram: List[int]  # questionnaires per bin_width-wide score range, from 0
+
+
+class CoverageBucket(BaseModel):
+    bucket: str  # e.g. "BC", "25-34", "3+"
+    questionnaires: int
+    scores: Dict[str, ScoreDistribution]  # "overall" and each category
+
+
+class CoverageReport(BaseModel):
+    rules_version: str
+    bin_width: int
+    overall: CoverageBucket
+    dimensions: Dict[str, List[CoverageBucket]]  # province / age_band / dependants
@@ -1,23 +1,55 @@
 from datetime import datetime, timedelta
-from typing import Optional
+from functools import lru_cache
+from typing import Any, Optional, Tuple
 
-from jose import jwt
-from passlib.context import CryptContext
+from .config import BCRYPT_ROUNDS, JWT_SECRET_KEY, JWT_ALGORITHM, get_access_token_expires
+from .password_pool import pool
 
-from .config import JWT_SECRET_KEY, JWT_ALGORITHM, get_access_token_expires
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# passlib, bcrypt and jose's crypto backends are imported on first use, not
+# at startup (nor in every password pool worker at spawn).
 
+@lru_cache(maxsize=None)
+def _pwd_context() -> Any:
+    from passlib.context import CryptContext
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    return CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
 
 
-def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+# bcrypt is deliberately slow, so the work itself runs in the password pool
+# (these two are what the worker processes execute).
+
+def _hash(password: str) -> str:
+    return _pwd_context().hash(password)
+
+
+def _verify_and_update(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    return _pwd_context().verify_and_update(plain_password, hashed_password)
+
+
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return (await verify_and_update_password(plain_password, hashed_password))[0]
+
+
+async def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Verify a password; on success also return a fresh hash when the stored
+    one uses outdated settings (e.g. fewer bcrypt rounds), else None.
+    Raises PoolSaturated when the password pool is full.
+    """
+    return await pool.run(_verify_and_update, plain_password, hashed_password)
+
+
+async def get_password_hash(password: str) -> str:
+    """
+    Raises PoolSaturated when the password pool is full.
+    """
+    return await pool.run(_hash, password)
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
+    from jose import jwt
+
     to_encode = data.copy()
     if expires_delta is None:
         expires_delta = get_access_token_expires()
@@ -0,0 +1,61 @@
+import json
+import logging
+from typing import Any, AsyncIterator, Dict
+
+from ..ai_engine import FALLBACK_ADVICE, AdviceEvent, generate_ai_advice_async, stream_ai_advice
+from ..db import AsyncSessionLocal
+from ..models.assessment import Assessment
+
+logger = logging.getLogger(__name__)
+
+
+async def store_advice(assessment_id: str, advice: Dict[str, Any], status: str) -> None:
+    async with AsyncSessionLocal() as db:
+        row = await db.get(Assessment, assessment_id)
+        if row is None:
+            # Answers changed while the job ran; nothing to attach it to
+            return
+        row.ai_advice_json = json.dumps(advice)
+        row.ai_status = status
+        await db.commit()
+
+
+async def run_advice_job(
+    assessment_id: str,
+    context: Dict[str, Any],
+    assessment: Dict[str, Any],
+) -> None:
+    """
+    Background job queued by /complete: generate the AI explanation on the
+    event loop and attach it to the stored assessment. On failure the
+    static fallback is stored with status "failed", so clients stop
+    waiting and the next /complete retries.
+    """
+    try:
+        advice = await generate_ai_advice_async(context=context, assessment=assessment)
+        status = "ready"
+    except Exception:
+        logger.exception("AI advice generation failed for assessment %s", assessment_id)
+        advice, status = FALLBACK_ADVICE, "failed"
+
+    await store_advice(assessment_id, advice, status)
+
+
+async def stream_advice_job(
+    assessment_id: str,
+    context: Dict[str, Any],
+    assessment: Dict[str, Any],
+) -> AsyncIterator[AdviceEvent]:
+    """
+    Streaming counterpart of run_advice_job: pass events through as the
+    model produces them and store the final advice when it is done.
+    """
+    try:
+        async for event, payload in stream_ai_advice(context=context, assessment=assessment):
+            if event == "done":
+                await store_advice(assessment_id, payload, "ready")
+            yield event, payload
+    except Exception:
+        logger.exception("AI advice streaming failed for assessment %s", assessment_id)
+        await store_advice(assessment_id, FALLBACK_ADVICE, "failed")
+        yield "error", FALLBACK_ADVICE
@@ -0,0 +1,506 @@
+"""
+Bulk import and export of questionnaires and their assessments as NDJSON
+(one JSON object per line), Parquet or Arrow IPC streams. Parquet and
+Arrow need pyarrow; NDJSON works without it. Rows move BULK_BATCH_SIZE at
+a time, so memory use doesn't grow with the size of the file.
+
+An import record is one profile:
+
+    {"answers": {"age": 38, "province": "ON", "has_vehicle": true}}
+
+Columnar files have one column per question key instead (a null cell is
+an unanswered question), or an `answers_json` column, as exported, which
+then takes precedence. Anything else in a record (id, status, ... from an
+export) is ignored: each record becomes a new questionnaire of the user
+importing it. Records are numbered by line (NDJSON) or row (columnar) in
+error messages.
+"""
+import importlib.util
+import json
+import uuid
+from datetime import datetime
+from functools import lru_cache
+from typing import IO, Any, AsyncIterator, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy import Column, String, Table, func, insert, select, type_coerce
+from sqlalchemy.engine import Dialect, Row
+from sqlalchemy.sql import Select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..config import BULK_BATCH_SIZE
+from ..db import async_engine
+from ..models.assessment import Assessment
+from ..models.questionnaire import Questionnaire, QuestionnaireAnswer, QuestionnaireFacts
+from . import coverage, risk_engine
+from .reports import answers_hash
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+COLUMNAR = ("parquet", "arrow")
+
+# (record number, decoded record)
+Record = Tuple[int, Any]
+
+# What SQLAlchemy's JSON type stores (json.dumps), without json.dumps'
+# per-call overhead; most answers are scalars, spelled out directly.
+_encode_answer = json.JSONEncoder().encode
+_ENCODE_SCALAR = {
+    str: json.encoder.encode_basestring_ascii,
+    bool: lambda value: "true" if value else "false",
+    int: int.__repr__,
+    type(None): lambda value: "null",
+}
+
+
+def _answer_json(value: Any) -> str:
+    return _ENCODE_SCALAR.get(type(value), _encode_answer)(value)
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+_encode_export = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"), default=_json_default).encode
+
+
+# pyarrow is imported by the first Parquet or Arrow file, not at startup.
+
+@lru_cache(maxsize=None)
+def columnar_available() -> bool:
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+@lru_cache(maxsize=None)
+def _pyarrow() -> Tuple[Any, Any]:
+    """
+    (pyarrow, pyarrow.parquet); raises RuntimeError without pyarrow.
+    """
+    if not columnar_available():
+        raise RuntimeError("Parquet and Arrow files require pyarrow")
+    import pyarrow as pa  # type: ignore
+    import pyarrow.ipc  # type: ignore  # noqa: F401  (pa.ipc)
+    import pyarrow.parquet as pq  # type: ignore
+
+    return pa, pq
+
+
+# --- Reading ---
+
+class NDJSONReader:
+    """
+    Incremental NDJSON parser: feed() it the input in chunks of any size
+    and get back the records completed so far. Blank lines are skipped.
+    """
+
+    def __init__(self) -> None:
+        self._tail = b""
+        self._line = 0
+
+    def feed(self, chunk: bytes) -> List[Record]:
+        lines = (self._tail + chunk).split(b"\n")
+        self._tail = lines.pop()
+        return self._parse(lines)
+
+    def close(self) -> List[Record]:
+        lines, self._tail = [self._tail], b""
+        return self._parse(lines)
+
+    def _parse(self, lines: List[bytes]) -> List[Record]:
+        records = []
+        for raw in lines:
+            self._line += 1
+            if raw.strip():
+                try:
+                    records.append((self._line, json.loads(raw)))
+                except ValueError as exc:
+                    raise ValueError(f"record {self._line}: not valid JSON ({exc})") from None
+        return records
+
+
+def ndjson_records(source: IO[bytes], batch_size: int = BULK_BATCH_SIZE) -> Iterator[List[Record]]:
+    """
+    Import records from an NDJSON file, at most batch_size at a time.
+    """
+    reader = NDJSONReader()
+    pending: List[Record] = []
+    for chunk in iter(lambda: source.read(1 << 16), b""):
+        pending.extend(reader.feed(chunk))
+        while len(pending) >= batch_size:
+            yield pending[:batch_size]
+            del pending[:batch_size]
+    pending.extend(reader.close())
+    if pending:
+        yield pending
+
+
+# Written by export_questionnaires; not answers
+_RESERVED_COLUMNS = frozenset(("id", "user_id", "status", "version", "created_at", "updated_at"))
+
+
+def _json_column(column: Any) -> Any:
+    # Dates, times and decimals have no JSON form: import them as strings
+    pa, _ = _pyarrow()
+    kind = column.type
+    if pa.types.is_temporal(kind) or pa.types.is_decimal(kind):
+        return column.cast(pa.string())
+    return column
+
+
+def columnar_records(source: IO[bytes], fmt: str, batch_size: int = BULK_BATCH_SIZE) -> Iterator[List[Record]]:
+    """
+    Import records from a Parquet file (which must be seekable: its index
+    is at the end) or an Arrow IPC stream, at most batch_size at a time.
+    """
+    pa, pq = _pyarrow()
+    batches = pq.ParquetFile(source).iter_batches(batch_size=batch_size) if fmt == "parquet" else pa.ipc.open_stream(source)
+    number = 0
+    for whole in batches:
+        for offset in range(0, whole.num_rows, batch_size):
+            batch = whole.slice(offset, batch_size)
+            if "answers_json" in batch.schema.names:
+                cells = batch.column("answers_json").to_pylist()
+                profiles = [{"answers": json.loads(cell) if cell is not None else None} for cell in cells]
+            else:
+                keys = [name for name in batch.schema.names if name not in _RESERVED_COLUMNS]
+                columns = [_json_column(batch.column(key)).to_pylist() for key in keys]
+                profiles = [
+                    {"answers": {key: value for key, value in zip(keys, row) if value is not None}}
+                    for row in zip(*columns)
+                ] if keys else [{"answers": {}} for _ in range(batch.num_rows)]
+            yield list(enumerate(profiles, number + 1))
+            number += batch.num_rows
+
+
+def _answers(number: int, record: Any) -> Dict[str, Any]:
+    answers = record.get("answers") if isinstance(record, dict) else None
+    if not isinstance(answers, dict):
+        raise ValueError(f'record {number}: expected an object with an "answers" object')
+    return answers
+
+
+# --- Import ---
+
+def _new_ids(n: int) -> List[str]:
+    # The same ids as the models' column defaults
+    return [str(uuid.uuid4()) for _ in range(n)]
+
+
+def _driver_value(dialect: Dialect, column: Column, value: Any) -> Any:
+    process = column.type.dialect_impl(dialect).bind_processor(dialect)
+    return process(value) if process is not None else value
+
+
+async def _insert_many(db: AsyncSession, table: Table, columns: Sequence[str], rows: List[Tuple[Any, ...]]) -> None:
+    """
+    One executemany() of `rows` (tuples in `columns` order, values already
+    in the driver's form) straight through the DBAPI cursor: Core's
+    per-row parameter processing costs more than SQLite's insert itself.
+    """
+    if not rows:
+        return
+    conn = await db.connection()
+    compiled = insert(table).compile(dialect=conn.dialect, column_keys=list(columns))
+    if compiled.positional:
+        order = [columns.index(name) for name in compiled.positiontup]
+        if order != list(range(len(columns))):
+            rows = [tuple(row[i] for i in order) for row in rows]
+    else:
+        rows = [dict(zip(columns, row)) for row in rows]
+    await conn.exec_driver_sql(str(compiled), rows)
+
+
+_QUESTIONNAIRE_COLUMNS = ("id", "user_id", "status", "created_at", "updated_at", "version")
+_ANSWER_COLUMNS = ("id", "questionnaire_id", "question_key", "answer_json", "version")
+_FACT_COLUMNS = ("questionnaire_id", *(field.name for field in risk_engine.FACT_FIELDS), "updated_at")
+_ASSESSMENT_COLUMNS = (
+    "id", "questionnaire_id", "answers_hash", "rules_version", "context_json", "assessment_json", "created_at",
+)
+
+
+async def import_batch(db: AsyncSession, user_id: str, records: Sequence[Record], score: bool = False) -> int:
+    """
+    Create one questionnaire per record, with its answers and facts, owned
+    by `user_id`, and commit. With `score`, also store each one's
+    assessment (counted in the coverage rollups) and mark it completed,
+    like POST /complete without advice.
+    Raises ValueError naming the first bad record, before writing any of
+    this batch. Returns the number of questionnaires created.
+    """
+    profiles = [_answers(number, record) for number, record in records]
+    assessments = []
+    if score:
+        for (number, _), answers in zip(records, profiles):
+            try:
+                assessments.append(risk_engine.evaluate(answers))
+            except (TypeError, ValueError) as exc:
+                raise ValueError(f"record {number}: answers cannot be scored ({exc})") from None
+
+    dialect = db.bind.dialect
+    now = _driver_value(dialect, Questionnaire.__table__.c.created_at, datetime.utcnow())
+    status = "completed" if score else "in_progress"
+    questionnaire_ids = _new_ids(len(profiles))
+    answer_ids = iter(_new_ids(sum(map(len, profiles))))
+
+    questionnaires = [(qid, user_id, status, now, now, 1) for qid in questionnaire_ids]
+    answers = [
+        (next(answer_ids), qid, key, _answer_json(value), 1)
+        for qid, profile in zip(questionnaire_ids, profiles)
+        for key, value in profile.items()
+    ]
+    facts = [risk_engine.project_facts(profile) for profile in profiles]
+    await _insert_many(db, Questionnaire.__table__, _QUESTIONNAIRE_COLUMNS, questionnaires)
+    await _insert_many(db, QuestionnaireAnswer.__table__, _ANSWER_COLUMNS, answers)
+    await _insert_many(
+        db,
+        QuestionnaireFacts.__table__,
+        _FACT_COLUMNS,
+        [(qid, *row.values(), now) for qid, row in zip(questionnaire_ids, facts)],
+    )
+    if score:
+        rows = [
+            (aid, qid, answers_hash(profile), risk_engine.RULES_VERSION, _encode_answer(profile),
+             _encode_answer(assessment), now)
+            for aid, qid, profile, assessment in zip(
+                _new_ids(len(profiles)), questionnaire_ids, profiles, assessments
+            )
+        ]
+        await _insert_many(db, Assessment.__table__, _ASSESSMENT_COLUMNS, rows)
+        members = [
+            coverage.member(qid, row, assessment)
+            for qid, row, assessment in zip(questionnaire_ids, facts, assessments)
+        ]
+        conn = await db.connection()
+        await conn.run_sync(coverage.add, members)
+    await db.commit()
+    return len(profiles)
+
+
+# --- Export ---
+
+class _ColumnarWriter:
+    """
+    Parquet / Arrow IPC stream writer that keeps its output in memory and
+    hands it back after every write, for a streaming response. It is its
+    own (write-only) file for pyarrow.
+    """
+
+    closed = False
+
+    def __init__(self, fmt: str, schema: Any) -> None:
+        pa, pq = _pyarrow()
+        self.schema = schema
+        self._chunks: List[bytes] = []
+        self._writer = pq.ParquetWriter(self, schema) if fmt == "parquet" else pa.ipc.new_stream(self, schema)
+
+    def write(self, data: Any) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def _take(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+    def write_columns(self, columns: Dict[str, List[Any]]) -> bytes:
+        pa, _ = _pyarrow()
+        self._writer.write_table(pa.Table.from_pydict(columns, schema=self.schema))
+        return self._take()
+
+    def close(self) -> bytes:
+        self._writer.close()
+        return self._take()
+
+
+def _arrow_type(kind: str) -> Any:
+    pa, _ = _pyarrow()
+    return {"int": pa.int64(), "float": pa.float64(), "bool": pa.bool_(), "raw": pa.string()}[kind]
+
+
+def _ndjson_line(fields: Dict[str, Any], raw: Dict[str, Optional[str]]) -> str:
+    """
+    One NDJSON line: `fields`, plus `raw` values that are JSON text already
+    (as stored) spliced in without a decode/encode round trip.
+    """
+    tail = "".join([f',"{key}":{"null" if value is None else value}' for key, value in raw.items()])
+    return f"{_encode_export(fields)[:-1]}{tail}}}\n"
+
+
+def _answers_object(dialect: str) -> Any:
+    """
+    The questionnaire's answers as one JSON object, built by the database
+    (correlated subquery), as text.
+    """
+    if dialect == "postgresql":
+        aggregate = func.jsonb_object_agg(QuestionnaireAnswer.question_key, QuestionnaireAnswer.answer)
+    else:
+        aggregate = func.json_group_object(
+            QuestionnaireAnswer.question_key, func.json(QuestionnaireAnswer.__table__.c.answer_json)
+        )
+    subquery = (
+        select(aggregate)
+        .where(QuestionnaireAnswer.questionnaire_id == Questionnaire.id)
+        .scalar_subquery()
+    )
+    return type_coerce(subquery, String).label("answers_json")
+
+
+async def _batches(stmt: Select, user_id: Optional[str], batch_size: int) -> AsyncIterator[List[Row]]:
+    """
+    The rows of `stmt`, which reads from questionnaires, for batch_size
+    questionnaires (of `user_id`'s, if given) at a time in id order. Each
+    batch is read on a connection of its own that goes back to the pool
+    before the batch is handed on, and the next resumes after the last id
+    seen: a slow consumer never holds one.
+    """
+    ids = select(Questionnaire.id).order_by(Questionnaire.id).limit(batch_size)
+    if user_id is not None:
+        ids = ids.where(Questionnaire.user_id == user_id)
+        stmt = stmt.where(Questionnaire.user_id == user_id)
+    last = None
+    while True:
+        page = (ids if last is None else ids.where(Questionnaire.id > last)).subquery()
+        async with async_engine.connect() as conn:
+            # Where the batch ends, without fetching its ids
+            found, end = (await conn.execute(select(func.count(), func.max(page.c.id)))).one()
+            if not found:
+                return
+            batch = stmt.where(Questionnaire.id <= end)
+            if last is not None:
+                batch = batch.where(Questionnaire.id > last)
+            rows = (await conn.execute(batch)).all()
+        if rows:
+            yield rows
+        if found < batch_size:
+            return
+        last = end
+
+
+async def export_questionnaires(
+        fmt: str,
+        user_id: Optional[str] = None,
+        batch_size: int = BULK_BATCH_SIZE,
+) -> AsyncIterator[bytes]:
+    """
+    Every questionnaire (or every one of `user_id`'s) with its answers;
+    columnar formats add the typed facts as columns. Read batch_size rows
+    at a time, in id order (see _batches).
+    """
+    fact_names = [field.name for field in risk_engine.FACT_FIELDS]
+    stmt = (
+        select(
+            Questionnaire.id,
+            Questionnaire.user_id,
+            Questionnaire.status,
+            Questionnaire.version,
+            Questionnaire.updated_at,
+            _answers_object(async_engine.dialect.name),
+            *(getattr(QuestionnaireFacts, name) for name in fact_names),
+        )
+        .outerjoin(QuestionnaireFacts, QuestionnaireFacts.questionnaire_id == Questionnaire.id)
+        .order_by(Questionnaire.id)
+    )
+
+    writer = None
+    if fmt in COLUMNAR:
+        pa, _ = _pyarrow()
+        fields = [("id", pa.string()), ("user_id", pa.string()), ("status", pa.string()), ("version", pa.int64()),
+                  ("updated_at", pa.timestamp("us")), ("answers_json", pa.string())]
+        fields += [(field.name, _arrow_type(field.kind)) for field in risk_engine.FACT_FIELDS]
+        writer = _ColumnarWriter(fmt, pa.schema(fields))
+
+    async for rows in _batches(stmt, user_id, batch_size):
+        if writer is not None:
+            # The selected columns are the schema's, in order
+            columns = dict(zip(writer.schema.names, map(list, zip(*rows))))
+            yield writer.write_columns(columns)
+            continue
+        lines = [
+            _ndjson_line(
+                {
+                    "id": row.id,
+                    "user_id": row.user_id,
+                    "status": row.status,
+                    "version": row.version,
+                    "updated_at": row.updated_at,
+                },
+                {"answers": row.answers_json or "{}"},
+            )
+            for row in rows
+        ]
+        yield "".join(lines).encode("utf-8")
+    if writer is not None:
+        yield writer.close()
+
+
+async def export_assessments(
+        fmt: str,
+        user_id: Optional[str] = None,
+        batch_size: int = BULK_BATCH_SIZE,
+) -> AsyncIterator[bytes]:
+    """
+    Every stored assessment (or every one of `user_id`'s questionnaires),
+    oldest first per questionnaire. NDJSON records carry the assessment and
+    advice as stored; columnar formats add the overall and category
+    scores as columns. Read like export_questionnaires, the assessments of
+    batch_size questionnaires at a time.
+    """
+    stmt = (
+        select(
+            Assessment.questionnaire_id,
+            Assessment.answers_hash,
+            Assessment.rules_version,
+            Assessment.created_at,
+            Assessment.ai_status,
+            Assessment.assessment_json,
+            Assessment.ai_advice_json,
+        )
+        .join(Questionnaire, Questionnaire.id == Assessment.questionnaire_id)
+        .order_by(Assessment.questionnaire_id, Assessment.created_at)
+    )
+
+    writer = None
+    if fmt in COLUMNAR:
+        pa, _ = _pyarrow()
+        fields = [("questionnaire_id", pa.string()), ("answers_hash", pa.string()), ("rules_version", pa.string()),
+                  ("created_at", pa.timestamp("us")), ("ai_status", pa.string()), ("overall_risk_score", pa.int64())]
+        fields += [(f"{name}_score", pa.int64()) for name in risk_engine.CATEGORIES]
+        fields += [("assessment_json", pa.string()), ("ai_advice_json", pa.string())]
+        writer = _ColumnarWriter(fmt, pa.schema(fields))
+
+    async for rows in _batches(stmt, user_id, batch_size):
+        if writer is not None:
+            columns: Dict[str, List[Any]] = {name: [] for name in writer.schema.names}
+            for row in rows:
+                for name in ("questionnaire_id", "answers_hash", "rules_version", "created_at", "ai_status",
+                             "assessment_json", "ai_advice_json"):
+                    columns[name].append(getattr(row, name))
+                assessment = json.loads(row.assessment_json)
+                columns["overall_risk_score"].append(assessment["overall_risk_score"])
+                for name in risk_engine.CATEGORIES:
+                    columns[f"{name}_score"].append(assessment["categories"][name]["score"])
+            yield writer.write_columns(columns)
+            continue
+        lines = [
+            _ndjson_line(
+                {
+                    "questionnaire_id": row.questionnaire_id,
+                    "answers_hash": row.answers_hash,
+                    "rules_version": row.rules_version,
+                    "created_at": row.created_at,
+                    "ai_status": row.ai_status,
+                },
+                {"assessment": row.assessment_json, "ai_advice": row.ai_advice_json},
+            )
+            for row in rows
+        ]
+        yield "".join(lines).encode("utf-8")
+    if writer is not None:
+        yield writer.close()
@@ -0,0 +1,329 @@
+"""
+Coverage analytics: how the overall and category scores of assessed
+questionnaires are distributed, by province, age band and dependants,
+served from rollups instead of a scan of every assessment.
+
+Each questionnaire with an assessment under the current rules is a
+member (a CoverageMember row with its buckets and scores). CoverageRollup
+holds, per rules version, dimension bucket, score and histogram bin, the
+number of members and the sum of their scores there, so the size, mean
+and histogram of any bucket come from at most BINS rows per score.
+
+The rollups are only ever incremented, in the transaction that changes
+an assessment: replace() moves questionnaires' contributions to their
+new assessments (reports.save_assessment, app/reassess.py), add() counts
+new ones (bulk import) and forget() takes one out when its assessments
+are dropped (reports.invalidate). rebuild() recomputes everything from
+the assessments and check() compares the rollups with such a recompute;
+see `python -m app.coverage`.
+
+The sync functions take a Connection; from an AsyncSession, call them
+through `(await db.connection()).run_sync(...)`.
+"""
+import json
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models.assessment import Assessment
+from ..models.coverage import CoverageMember, CoverageRollup
+from . import risk_engine
+
+SCORES: Tuple[str, ...] = ("overall", *risk_engine.CATEGORIES)
+DIMENSIONS: Tuple[str, ...] = ("province", "age_band", "dependants")
+BIN_WIDTH = 10
+BINS = risk_engine.SCORE_CAP // BIN_WIDTH  # the last bin also takes SCORE_CAP
+
+# Every bucket of each dimension, in display order
+BUCKETS: Dict[str, Tuple[str, ...]] = {
+    "province": ("AB", "BC", "MB", "NB", "NL", "NS", "NT", "NU", "ON", "PE", "QC", "SK", "YT", "other"),
+    "age_band": ("<25", "25-34", "35-44", "45-54", "55-64", "65+", "unknown"),
+    "dependants": ("0", "1", "2", "3+", "unknown"),
+}
+_AGE_BANDS = ((25, "<25"), (35, "25-34"), (45, "35-44"), (55, "45-54"), (65, "55-64"))
+_PROVINCES = frozenset(BUCKETS["province"][:-1])
+
+REBUILD_CHUNK = 1000
+# Rows per multi-VALUES increment, well inside the bind parameter limits
+_INCREMENT_CHUNK = 1000
+
+_MEMBER = CoverageMember.__table__
+_ROLLUP = CoverageRollup.__table__
+_ROLLUP_KEY = ("rules_version", "dimension", "bucket", "score", "bin")
+
+assert tuple(_MEMBER.c.keys())[-len(SCORES):] == tuple(f"{name}_score" for name in SCORES)
+
+# Rollup key -> [members, score_total] to add
+Deltas = Dict[Tuple[Any, ...], List[int]]
+
+
+def _age_band(age: Optional[int]) -> str:
+    if not age or age < 0:  # 0: not answered
+        return "unknown"
+    for limit, band in _AGE_BANDS:
+        if age < limit:
+            return band
+    return "65+"
+
+
+def _dependants(dependants: Optional[int]) -> str:
+    if dependants is None or dependants < 0:
+        return "unknown"
+    return str(dependants) if dependants < 3 else "3+"
+
+
+def member(questionnaire_id: str, facts: Dict[str, Any], assessment: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    The CoverageMember row for an assessment (risk_engine.evaluate) of
+    answers with these facts (risk_engine.project_facts).
+    """
+    categories = assessment["categories"]
+    return {
+        "questionnaire_id": questionnaire_id,
+        "rules_version": risk_engine.RULES_VERSION,
+        "province": facts["province"] if facts["province"] in _PROVINCES else "other",
+        "age_band": _age_band(facts["age"]),
+        "dependants": _dependants(facts["dependants"]),
+        "overall_score": assessment["overall_risk_score"],
+        **{f"{name}_score": categories[name]["score"] for name in risk_engine.CATEGORIES},
+    }
+
+
+_SCORE_COLUMNS = tuple((name, f"{name}_score") for name in SCORES)
+# Histogram bin of every possible score
+_BIN_OF = tuple(min(score // BIN_WIDTH, BINS - 1) for score in range(risk_engine.SCORE_CAP + 1))
+
+
+def _add(deltas: Deltas, row: Any, sign: int) -> None:
+    version = row["rules_version"]
+    scores = [(name, row[column]) for name, column in _SCORE_COLUMNS]
+    for dimension, bucket in (("all", "all"), *((name, row[name]) for name in DIMENSIONS)):
+        for name, score in scores:
+            key = (version, dimension, bucket, name, _BIN_OF[score])
+            delta = deltas.get(key)
+            if delta is None:
+                deltas[key] = [sign, sign * score]
+            else:
+                delta[0] += sign
+                delta[1] += sign * score
+
+
+def _insert(conn: Connection) -> Any:
+    dialect = conn.dialect.name
+    if dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    elif dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        raise RuntimeError(f"Coverage rollups need SQLite or PostgreSQL, not {dialect}")
+    return insert
+
+
+def _increment(conn: Connection, deltas: Deltas) -> None:
+    # Sorted, so concurrent transactions lock the rows in the same order
+    rows = [
+        {**dict(zip(_ROLLUP_KEY, key)), "members": members, "score_total": total}
+        for key, (members, total) in sorted(deltas.items())
+        if members or total
+    ]
+    for start in range(0, len(rows), _INCREMENT_CHUNK):
+        stmt = _insert(conn)(_ROLLUP).values(rows[start:start + _INCREMENT_CHUNK])
+        conn.execute(
+            stmt.on_conflict_do_update(
+                index_elements=_ROLLUP_KEY,
+                set_={
+                    "members": _ROLLUP.c.members + stmt.excluded.members,
+                    "score_total": _ROLLUP.c.score_total + stmt.excluded.score_total,
+                },
+            )
+        )
+
+
+def add(conn: Connection, members: Sequence[Dict[str, Any]]) -> None:
+    """
+    Count questionnaires that have no member row yet (just created). Does not commit.
+    """
+    if not members:
+        return
+    deltas: Deltas = {}
+    for row in members:
+        _add(deltas, row, 1)
+    conn.execute(insert(_MEMBER), list(members))
+    _increment(conn, deltas)
+
+
+def replace(conn: Connection, members: Sequence[Dict[str, Any]]) -> None:
+    """
+    Make these member rows the questionnaires' contributions, in place of
+    any they had. Does not commit.
+    """
+    ids = [row["questionnaire_id"] for row in members]
+    old = {
+        row["questionnaire_id"]: dict(row)
+        for row in conn.execute(
+            select(_MEMBER).where(_MEMBER.c.questionnaire_id.in_(ids)).with_for_update()
+        ).mappings()
+    }
+    changed = [row for row in members if old.get(row["questionnaire_id"]) != row]
+    if not changed:
+        return
+    deltas: Deltas = {}
+    for row in changed:
+        if row["questionnaire_id"] in old:
+            _add(deltas, old[row["questionnaire_id"]], -1)
+        _add(deltas, row, 1)
+    stmt = _insert(conn)(_MEMBER)
+    conn.execute(
+        stmt.on_conflict_do_update(
+            index_elements=["questionnaire_id"],
+            set_={key: stmt.excluded[key] for key in _MEMBER.c.keys() if key != "questionnaire_id"},
+        ),
+        changed,
+    )
+    _increment(conn, deltas)
+
+
+def record(conn: Connection, questionnaire_id: str, context: Dict[str, Any], assessment: Dict[str, Any]) -> None:
+    """
+    replace() for one questionnaire whose answers (`context`) were just
+    scored. Does not commit.
+    """
+    replace(conn, [member(questionnaire_id, risk_engine.project_facts(context), assessment)])
+
+
+def forget(conn: Connection, questionnaire_id: str) -> None:
+    """
+    Take a questionnaire out of the rollups. Does not commit.
+    """
+    where = _MEMBER.c.questionnaire_id == questionnaire_id
+    if conn.dialect.delete_returning:
+        old = conn.execute(delete(_MEMBER).where(where).returning(*_MEMBER.c)).mappings().first()
+    else:
+        old = conn.execute(select(_MEMBER).where(where)).mappings().first()
+        conn.execute(delete(_MEMBER).where(where))
+    if old is not None:
+        deltas: Deltas = {}
+        _add(deltas, old, -1)
+        _increment(conn, deltas)
+
+
+# --- Full recompute ---
+
+def _current_members(conn: Connection) -> Iterator[Dict[str, Any]]:
+    """
+    Member rows computed from the stored assessments: each questionnaire's
+    newest one under the current rules.
+    """
+    rows = conn.execute(
+        select(Assessment.questionnaire_id, Assessment.context_json, Assessment.assessment_json)
+        .where(Assessment.rules_version == risk_engine.RULES_VERSION)
+        .order_by(Assessment.questionnaire_id, Assessment.created_at, Assessment.id)
+        .execution_options(yield_per=REBUILD_CHUNK)
+    )
+    last = None
+    for row in rows:
+        if last is not None and row.questionnaire_id != last.questionnaire_id:
+            yield _member_of(last)
+        last = row
+    if last is not None:
+        yield _member_of(last)
+
+
+def _member_of(row: Any) -> Dict[str, Any]:
+    facts = risk_engine.project_facts(json.loads(row.context_json))
+    return member(row.questionnaire_id, facts, json.loads(row.assessment_json))
+
+
+def rebuild(conn: Connection) -> int:
+    """
+    Recompute every member row and rollup from the stored assessments,
+    replacing what is there (for backfills, or after check() found
+    drift). Returns the number of members. Does not commit.
+    """
+    conn.execute(delete(_ROLLUP))
+    conn.execute(delete(_MEMBER))
+    deltas: Deltas = {}
+    chunk: List[Dict[str, Any]] = []
+    count = 0
+    for row in _current_members(conn):
+        _add(deltas, row, 1)
+        chunk.append(row)
+        if len(chunk) >= REBUILD_CHUNK:
+            conn.execute(insert(_MEMBER), chunk)
+            count += len(chunk)
+            chunk = []
+    if chunk:
+        conn.execute(insert(_MEMBER), chunk)
+        count += len(chunk)
+    _increment(conn, deltas)
+    return count
+
+
+def check(conn: Connection) -> List[str]:
+    """
+    Compare the rollups for the current rules with a recompute from the
+    stored assessments; one line per rollup row that differs.
+    """
+    expected: Deltas = {}
+    for row in _current_members(conn):
+        _add(expected, row, 1)
+    stored: Deltas = {
+        tuple(row[:5]): [row.members, row.score_total]
+        for row in conn.execute(select(_ROLLUP).where(_ROLLUP.c.rules_version == risk_engine.RULES_VERSION))
+    }
+    differences = []
+    for key in sorted(expected.keys() | stored.keys()):
+        want, have = expected.get(key, [0, 0]), stored.get(key, [0, 0])
+        if want != have:
+            _, dimension, bucket, score, bin = key
+            differences.append(
+                f"{dimension}={bucket} {score} bin {bin}: rollup has {have[0]} members "
+                f"(score total {have[1]}), recomputed {want[0]} (score total {want[1]})"
+            )
+    return differences
+
+
+# --- Reading ---
+
+def _summary(bucket: str, scores: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    distributions = {}
+    for name in SCORES:
+        found = scores.get(name, {"members": 0, "total": 0, "histogram": [0] * BINS})
+        mean = found["total"] / found["members"] if found["members"] else 0.0
+        distributions[name] = {"mean": round(mean, 2), "histogram": found["histogram"]}
+    return {"bucket": bucket, "questionnaires": scores["overall"]["members"] if scores else 0, "scores": distributions}
+
+
+async def coverage_report(db: AsyncSession, dimension: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Score distributions under the current rules, overall and per bucket of
+    every dimension (or just `dimension`), in one query over the rollups.
+    Histograms count members per BIN_WIDTH-wide score range.
+    """
+    rollup = CoverageRollup
+    stmt = select(
+        rollup.dimension, rollup.bucket, rollup.score, rollup.bin, rollup.members, rollup.score_total
+    ).where(rollup.rules_version == risk_engine.RULES_VERSION, rollup.members > 0)
+    if dimension is not None:
+        stmt = stmt.where(rollup.dimension.in_(("all", dimension)))
+
+    buckets: Dict[Tuple[str, str], Dict[str, Dict[str, Any]]] = {}
+    for name, bucket, score, bin, members, total in await db.execute(stmt):
+        found = buckets.setdefault((name, bucket), {}).setdefault(
+            score, {"members": 0, "total": 0, "histogram": [0] * BINS}
+        )
+        found["members"] += members
+        found["total"] += total
+        found["histogram"][bin] += members
+
+    return {
+        "rules_version": risk_engine.RULES_VERSION,
+        "bin_width": BIN_WIDTH,
+        "overall": _summary("all", buckets.get(("all", "all"), {})),
+        "dimensions": {
+            name: [_summary(bucket, buckets[name, bucket]) for bucket in BUCKETS[name] if (name, bucket) in buckets]
+            for name in (DIMENSIONS if dimension is None else (dimension,))
+        },
+    }
@@ -0,0 +1,112 @@
+import json
+from datetime import datetime, timedelta
+from typing import Any, Dict, Tuple
+
+from sqlalchemy import delete, insert, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
+
+from ..config import IDEMPOTENCY_KEY_TTL_SECONDS, IDEMPOTENCY_LOCK_SECONDS
+from ..models.idempotency import IdempotencyKey
+
+
+async def claim(db: AsyncSession, user_id: str, key: str, request: str) -> Tuple[IdempotencyKey, bool]:
+    """
+    Claim the user's `key` for `request` and commit straight away, so a
+    retry that lands on another worker sees it. Returns (row, True) when
+    this request should go ahead, or (earlier claim, False): replay its
+    response_json, or if that is NULL the first request is still running.
+
+    Keys are forgotten after IDEMPOTENCY_KEY_TTL_SECONDS; a claim that got
+    no response within IDEMPOTENCY_LOCK_SECONDS (its worker died) is taken
+    over.
+    """
+    now = datetime.utcnow()
+    await db.execute(
+        delete(IdempotencyKey)
+        .where(IdempotencyKey.created_at < now - timedelta(seconds=IDEMPOTENCY_KEY_TTL_SECONDS))
+        .execution_options(synchronize_session=False)
+    )
+    row = IdempotencyKey(user_id=user_id, key=key, request=request, created_at=now)
+    if not await _insert_new(db, row):
+        existing = await db.get(IdempotencyKey, (user_id, key))
+        if existing is None:
+            # Expired and deleted by someone else just now: try again
+            await db.commit()
+            return await claim(db, user_id, key, request)
+        abandoned = (
+            existing.response_json is None
+            and existing.request == request
+            and now - existing.created_at > timedelta(seconds=IDEMPOTENCY_LOCK_SECONDS)
+        )
+        if abandoned:
+            # Only one of several retries racing for it gets it
+            taken = await db.execute(
+                update(IdempotencyKey)
+                .where(
+                    IdempotencyKey.user_id == user_id,
+                    IdempotencyKey.key == key,
+                    IdempotencyKey.created_at == existing.created_at,
+                )
+                .values(created_at=now)
+                .execution_options(synchronize_session=False)
+            )
+            await db.commit()
+            if taken.rowcount == 1:
+                existing.created_at = now
+                return existing, True
+            await db.refresh(existing)
+        await db.commit()
+        return existing, False
+
+    # Tracked from here on, so finish() is an UPDATE
+    make_transient_to_detached(row)
+    db.add(row)
+    await db.commit()
+    return row, True
+
+
+async def _insert_new(db: AsyncSession, row: IdempotencyKey) -> bool:
+    """
+    Insert `row` unless its key is taken; True if it was inserted. One
+    INSERT ... ON CONFLICT DO NOTHING on SQLite and PostgreSQL, an INSERT
+    in a savepoint elsewhere.
+    """
+    values = {"user_id": row.user_id, "key": row.key, "request": row.request, "created_at": row.created_at}
+    dialect = db.bind.dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        result = await db.execute(dialect_insert(IdempotencyKey).values(**values).on_conflict_do_nothing())
+        return result.rowcount == 1
+    try:
+        async with db.begin_nested():
+            await db.execute(insert(IdempotencyKey).values(**values))
+    except IntegrityError:
+        return False
+    return True
+
+
+def finish(row: IdempotencyKey, response: Dict[str, Any]) -> None:
+    """
+    Store the response to replay. Does not commit: commit it together
+    with the request's own changes.
+    """
+    row.response_json = json.dumps(response, default=str)
+
+
+async def release(db: AsyncSession, row: IdempotencyKey) -> None:
+    """
+    Give the key up after the request failed, so a retry runs it again.
+    """
+    user_id, key = row.user_id, row.key  # the rollback expires them
+    await db.rollback()
+    await db.execute(
+        delete(IdempotencyKey)
+        .where(IdempotencyKey.user_id == user_id, IdempotencyKey.key == key)
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
@@ -0,0 +1,170 @@
+import hashlib
+import json
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import and_, delete, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..config import AI_PENDING_TIMEOUT_SECONDS
+from ..db import upsert
+from ..models.assessment import Assessment
+from ..models.questionnaire import Questionnaire, QuestionnaireFacts
+from . import coverage, risk_engine
+
+
+def context_from_answers(answers: Iterable[Any]) -> Dict[str, Any]:
+    """
+    Build the risk engine context from stored answer rows (anything with
+    `question_key` and `answer` attributes).
+    """
+    return {ans.question_key: ans.answer for ans in answers}
+
+
+async def save_facts(db: AsyncSession, questionnaire_id: str, context: Dict[str, Any]) -> None:
+    """
+    Refresh the typed QuestionnaireFacts row from the full set of answers. Does not commit.
+    """
+    row = {"questionnaire_id": questionnaire_id, "updated_at": datetime.utcnow(), **risk_engine.project_facts(context)}
+    await upsert(
+        db,
+        QuestionnaireFacts,
+        [row],
+        conflict_columns=("questionnaire_id",),
+        update_columns=[name for name in row if name != "questionnaire_id"],
+    )
+
+
+def answers_hash(context: Dict[str, Any]) -> str:
+    """
+    Stable content hash of a set of answers, independent of key order.
+    """
+    canonical = json.dumps(context, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+async def find_assessment(db: AsyncSession, questionnaire_id: str, digest: str) -> Optional[Assessment]:
+    """
+    Stored assessment for exactly these answers under the current rules.
+    """
+    return await db.scalar(
+        select(Assessment).where(
+            Assessment.questionnaire_id == questionnaire_id,
+            Assessment.answers_hash == digest,
+            Assessment.rules_version == risk_engine.RULES_VERSION,
+        )
+    )
+
+
+async def save_assessment(
+    db: AsyncSession,
+    questionnaire_id: str,
+    digest: str,
+    context: Dict[str, Any],
+    assessment: Dict[str, Any],
+) -> Assessment:
+    """
+    Insert the stored assessment (advice not requested yet) and count it
+    in the coverage rollups. Does not commit.
+    """
+    row = Assessment(
+        questionnaire_id=questionnaire_id,
+        answers_hash=digest,
+        rules_version=risk_engine.RULES_VERSION,
+        context_json=json.dumps(context),
+        assessment_json=json.dumps(assessment),
+    )
+    try:
+        # Savepoint, so losing a race to a concurrent /complete only undoes this insert
+        async with db.begin_nested():
+            db.add(row)
+    except IntegrityError:
+        return await find_assessment(db, questionnaire_id, digest)
+    conn = await db.connection()
+    await conn.run_sync(coverage.record, questionnaire_id, context, assessment)
+    return row
+
+
+def needs_advice(row: Assessment) -> bool:
+    """
+    True unless advice is ready or a job for it is still within its time budget.
+    """
+    if row.ai_status == "ready":
+        return False
+    if row.ai_status == "pending" and row.ai_requested_at is not None:
+        return datetime.utcnow() - row.ai_requested_at > timedelta(seconds=AI_PENDING_TIMEOUT_SECONDS)
+    return True
+
+
+def mark_advice_pending(row: Assessment) -> None:
+    row.ai_status = "pending"
+    row.ai_requested_at = datetime.utcnow()
+
+
+async def invalidate(db: AsyncSession, questionnaire_id: str) -> None:
+    """
+    Drop stored reports for a questionnaire whose answers changed, and its
+    coverage rollup contribution. Does not commit.
+    """
+    await db.execute(
+        delete(Assessment)
+        .where(Assessment.questionnaire_id == questionnaire_id)
+        .execution_options(synchronize_session=False)
+    )
+    conn = await db.connection()
+    await conn.run_sync(coverage.forget, questionnaire_id)
+
+
+async def latest_assessment(
+    db: AsyncSession,
+    questionnaire_id: str,
+    user_id: str,
+) -> Optional[Tuple[str, Optional[Assessment]]]:
+    """
+    (questionnaire status, newest assessment under the current rules or
+    None) for one of the user's questionnaires, in one query; None when
+    the user has no such questionnaire.
+    """
+    row = (
+        await db.execute(
+            select(Questionnaire.status, Assessment)
+            .outerjoin(
+                Assessment,
+                and_(
+                    Assessment.questionnaire_id == Questionnaire.id,
+                    Assessment.rules_version == risk_engine.RULES_VERSION,
+                ),
+            )
+            .where(Questionnaire.id == questionnaire_id, Questionnaire.user_id == user_id)
+            .order_by(Assessment.created_at.desc())
+            .limit(1)
+        )
+    ).first()
+    if row is None:
+        return None
+    return row[0], row[1]
+
+
+def report_etag(row: Assessment, status: str) -> str:
+    """
+    Strong ETag over everything the report body is built from, computed
+    from the stored strings so a 304 never has to decode them.
+    """
+    digest = hashlib.sha256()
+    parts = (row.answers_hash, row.rules_version, row.ai_status or "", row.ai_advice_json or "", status)
+    for part in parts:
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return f'"{digest.hexdigest()[:32]}"'
+
+
+def build_report(row: Assessment, status: str) -> Dict[str, Any]:
+    return {
+        "questionnaire_id": row.questionnaire_id,
+        "status": status,
+        "context": json.loads(row.context_json),
+        "assessment": json.loads(row.assessment_json),
+        "ai_advice": json.loads(row.ai_advice_json) if row.ai_advice_json is not None else None,
+        "ai_status": row.ai_status,
+    }
@@ -1,4 +1,359 @@
-from typing import Any, Dict
+import hashlib
+from string import Formatter
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+
+# --- Facts ---
+#
+# The normalized answers the rules look at, with the same safe fallbacks
+# the engine has always used. Kinds:
+#   int / float -> int(v or 0) / float(v or 0), missing means 0
+#   bool        -> bool(v), missing means False
+#   raw         -> the answer as given, missing means `default`
+
+class FactField(NamedTuple):
+    name: str
+    kind: str
+    default: Any = None
+
+
+FACT_FIELDS: Tuple[FactField, ...] = (
+    FactField("age", "int"),
+    FactField("income", "float"),
+    FactField("dependants", "int"),
+    FactField("province", "raw", "ON"),
+    FactField("has_vehicle", "bool"),
+    FactField("liability_limit", "float"),
+    FactField("owns_home", "bool"),
+    FactField("rents", "bool"),
+    FactField("has_mortgage", "bool"),
+    FactField("travels_outside_canada", "bool"),
+    FactField("has_existing_life", "bool"),
+)
+
+
+class Facts(NamedTuple):
+    age: int
+    income: float
+    dependants: int
+    province: Any
+    has_vehicle: bool
+    liability_limit: float
+    owns_home: bool
+    rents: bool
+    has_mortgage: bool
+    travels_outside_canada: bool
+    has_existing_life: bool
+
+
+assert Facts._fields == tuple(f.name for f in FACT_FIELDS)
+
+
+# --- Rule tables ---
+
+class Rule(NamedTuple):
+    """
+    One row of a rule table.
+
+    `when` is a Python expression over the Facts field names. If it holds
+    (and `province`, when set, matches) the rule adds `score` to its
+    category and, if it has a title, emits a recommendation. `detail` may
+    use str.format placeholders for any Facts field or derived value.
+    """
+
+    when: str
+    score: int = 0
+    title: Optional[str] = None
+    detail: Optional[str] = None
+    priority: int = 0
+    province: Optional[str] = None
+
+
+SCORE_CAP = 100
+
+# Values computed from Facts (expressions over the field names) that
+# recommendation templates can refer to.
+DERIVED: Dict[str, str] = {
+    "rec_coverage": "int(income * 10)",  # 10x income rule of thumb
+}
+
+# --- Life insurance ---
+LIFE_RULES: Tuple[Rule, ...] = (
+    Rule(
+        when="dependants > 0 and income > 0",
+        score=30,
+        title="Consider term life insurance",
+        detail=(
+            "Based on your income of ${income:,.0f} and {dependants} dependant(s), "
+            "a starting point could be around ${rec_coverage:,.0f} in term life coverage."
+        ),
+        priority=1,
+    ),
+    Rule(
+        when="has_mortgage",
+        score=20,
+        title="Protect your mortgage",
+        detail="You indicated that you have a mortgage; term life coverage that at least "
+               "covers your outstanding mortgage can help protect your family home.",
+        priority=2,
+    ),
+    Rule(
+        when="not has_existing_life and (dependants > 0 or has_mortgage)",
+        score=10,
+        title="No existing life insurance detected",
+        detail="Since you reported no existing life insurance but have dependants or a mortgage, "
+               "it may be worth prioritizing life coverage.",
+        priority=0,
+    ),
+)
+
+# --- Auto insurance (Ontario) ---
+AUTO_RULES: Tuple[Rule, ...] = (
+    Rule(
+        when="has_vehicle",
+        score=30,
+    ),
+    Rule(
+        when="has_vehicle",
+        title="Mandatory Ontario auto coverage",
+        detail="In Ontario, auto insurance is mandatory. Ensure you have at least the required "
+               "third-party liability, accident benefits, uninsured automobile, and DCPD coverage.",
+        priority=0,
+        province="ON",
+    ),
+    Rule(
+        when="has_vehicle and liability_limit != 0 and liability_limit < 2_000_000",
+        score=20,
+        title="Increase liability limit",
+        detail="Your current liability limit appears below $2,000,000. Many Ontario drivers choose "
+               "a $2M limit to better protect against large claims.",
+        priority=1,
+    ),
+)
+
+# --- Home / Tenant ---
+HOME_RULES: Tuple[Rule, ...] = (
+    Rule(
+        when="owns_home",
+        score=30,
+        title="Home insurance review",
+        detail="As a homeowner, make sure your policy reflects replacement cost and any upgrades "
+               "(finished basement, renovations, etc.).",
+        priority=0,
+    ),
+    Rule(
+        when="rents and not owns_home",
+        score=20,
+        title="Consider tenant insurance",
+        detail="Tenant insurance can protect your belongings and provide liability coverage, "
+               "even if you don’t own the property.",
+        priority=0,
+    ),
+)
+
+# --- Travel insurance ---
+TRAVEL_RULES: Tuple[Rule, ...] = (
+    Rule(
+        when="travels_outside_canada",
+        score=30,
+        title="Out-of-country medical coverage",
+        detail="You mentioned travelling outside Canada. Provincial health plans generally don’t cover "
+               "most emergency medical costs abroad; travel medical insurance can help cover this gap.",
+        priority=0,
+    ),
+)
+
+# Category order is part of the output contract.
+RULE_TABLES: Dict[str, Tuple[Rule, ...]] = {
+    "life": LIFE_RULES,
+    "auto": AUTO_RULES,
+    "home": HOME_RULES,
+    "travel": TRAVEL_RULES,
+}
+CATEGORIES: Tuple[str, ...] = tuple(RULE_TABLES)
+
+# Changes whenever any rule, fact or derived value changes, so stored
+# assessments can tell whether they were scored by the current rules.
+RULES_VERSION = hashlib.sha256(
+    repr((FACT_FIELDS, DERIVED, SCORE_CAP, RULE_TABLES)).encode("utf-8")
+).hexdigest()[:16]
+
+
+# --- Table evaluation ---
+#
+# At import each rule's `when` is compiled into a function of the facts,
+# and its recommendation into a ready-made dict (plus a renderer, when the
+# detail depends on the facts). Which rules fired is kept as a bitmask,
+# bit i being rule i in table order; scores and recommendations are read
+# off the rules whose bit is set. This is what incremental scoring
+# (rescore / assess) runs on; evaluate() has its own path, below.
+
+class _CompiledRule(NamedTuple):
+    bit: int
+    score: int
+    predicate: Callable[..., bool]  # called with the Facts fields, in order
+    recommendation: Optional[Dict[str, Any]]
+    render: Optional[Callable[..., str]]  # the detail, if it has placeholders; same arguments
+
+
+def _flat_rules() -> List[Tuple[str, Rule]]:
+    return [(name, rule) for name in CATEGORIES for rule in RULE_TABLES[name]]
+
+
+def _predicate_source(rule: Rule) -> str:
+    if rule.province is None:
+        return f"({rule.when})"
+    return f"(province == {rule.province!r} and ({rule.when}))"
+
+
+def _template_fields(detail: str) -> List[str]:
+    return [field for _, field, _, _ in Formatter().parse(detail) if field is not None]
+
+
+def _facts_lambda(body: str) -> Callable[..., Any]:
+    return eval(f"lambda {', '.join(Facts._fields)}: {body}")
+
+
+def _compile_renderer(detail: str) -> Callable[..., str]:
+    # detail.format(income=income, rec_coverage=int(income * 10), ...)
+    fields = dict.fromkeys(_template_fields(detail))
+    return _facts_lambda(f"{detail!r}.format({', '.join(f'{name}={DERIVED.get(name, name)}' for name in fields)})")
+
+
+def _compile_rule(bit: int, rule: Rule) -> _CompiledRule:
+    predicate = _facts_lambda(_predicate_source(rule))
+    recommendation = None
+    render = None
+    if rule.title is not None:
+        recommendation = {"title": rule.title, "detail": rule.detail, "priority": rule.priority}
+        if rule.detail is not None and _template_fields(rule.detail):
+            render = _compile_renderer(rule.detail)
+    return _CompiledRule(bit, rule.score, predicate, recommendation, render)
+
+
+# (category, its compiled rules) in output order
+_CATEGORY_RULES: Tuple[Tuple[str, Tuple[_CompiledRule, ...]], ...] = tuple(
+    (name, tuple(_compile_rule(bit, rule) for bit, (category, rule) in enumerate(_flat_rules()) if category == name))
+    for name in CATEGORIES
+)
+_RULES: Tuple[_CompiledRule, ...] = tuple(rule for _, rules in _CATEGORY_RULES for rule in rules)
+
+
+_COERCE: Dict[str, Callable[[Any], Any]] = {"int": int, "float": float, "bool": bool}
+_MISSING: Dict[str, Any] = {"int": 0, "float": 0, "bool": False}
+
+# (position, name, value when missing, coercion or None for raw) per Facts field
+_Normalizer = Tuple[int, str, Any, Optional[Callable[[Any], Any]]]
+_NORMALIZERS: Tuple[_Normalizer, ...] = tuple(
+    (i, field.name, _MISSING.get(field.kind, field.default), _COERCE.get(field.kind))
+    for i, field in enumerate(FACT_FIELDS)
+)
+
+
+def _normalize(context: Dict[str, Any], values: List[Any], normalizers: Iterable[_Normalizer]) -> List[Any]:
+    get = context.get
+    for i, name, missing, coerce in normalizers:
+        value = get(name, missing)
+        values[i] = value if coerce is None else coerce(value or missing)
+    return values
+
+
+def extract_facts(context: Dict[str, Any]) -> Facts:
+    return Facts._make(_normalize(context, [None] * len(_NORMALIZERS), _NORMALIZERS))
+
+
+def _match_rules(facts: Facts, rules: Iterable[_CompiledRule]) -> int:
+    mask = 0
+    for rule in rules:
+        if rule.predicate(*facts):
+            mask |= 1 << rule.bit
+    return mask
+
+
+def _match(context: Dict[str, Any]) -> Tuple[int, Facts]:
+    facts = extract_facts(context)
+    return _match_rules(facts, _RULES), facts
+
+
+def _category_score(rules: Sequence[_CompiledRule], mask: int) -> int:
+    score = 0
+    for rule in rules:
+        if mask >> rule.bit & 1:
+            score += rule.score
+    return min(score, SCORE_CAP)
+
+
+def _overall(scores: Iterable[int]) -> int:
+    # Overall is just a simple average of non-zero categories
+    non_zero_scores = [s for s in scores if s > 0]
+    return int(sum(non_zero_scores) / len(non_zero_scores)) if non_zero_scores else 0
+
+
+_INT64 = (-(2 ** 63), 2 ** 63 - 1)
+
+
+def project_facts(context: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    extract_facts() for storage, one field at a time: the same normalized
+    values, but None for an answer that can't be coerced (where evaluate()
+    would raise) or doesn't fit a typed column, instead of an exception.
+    """
+    row: Dict[str, Any] = {}
+    for field in FACT_FIELDS:
+        if field.kind == "raw":
+            value = context.get(field.name, field.default)
+            row[field.name] = value if isinstance(value, str) else None
+            continue
+        value = context.get(field.name)
+        try:
+            value = bool(value) if field.kind == "bool" else _COERCE[field.kind](value or 0)
+        except (TypeError, ValueError, OverflowError):
+            value = None
+        if field.kind == "int" and value is not None and not _INT64[0] <= value <= _INT64[1]:
+            value = None
+        row[field.name] = value
+    return row
+
+
+def _assemble(mask: int, facts: Facts) -> Dict[str, Any]:
+    categories = {}
+    for name, rules in _CATEGORY_RULES:
+        score = 0
+        recommendations = []
+        for rule in rules:
+            if not mask >> rule.bit & 1:
+                continue
+            score += rule.score
+            if rule.recommendation is not None:
+                recommendation = rule.recommendation.copy()
+                if rule.render is not None:
+                    recommendation["detail"] = rule.render(*facts)
+                recommendations.append(recommendation)
+        categories[name] = {"score": min(score, SCORE_CAP), "recommendations": recommendations}
+
+    return {
+        "overall_risk_score": _overall(category["score"] for category in categories.values()),
+        "categories": categories,
+    }
+
+
+# --- Scalar evaluation ---
+#
+# evaluate() is the hot path (/complete, app.reassess, bulk scoring), so
+# it spells the rule tables out by hand instead of interpreting them: the
+# same conditions and scores, in table order, emitting the tables' own
+# recommendation texts. tests/test_risk_engine.py diffs it against the
+# tables (assess) and the original engine; change the two together.
+
+def _recommendation(rule: Rule) -> Dict[str, Any]:
+    return {"title": rule.title, "detail": rule.detail, "priority": rule.priority}
+
+
+_LIFE_TERM, _LIFE_MORTGAGE, _LIFE_NONE = map(_recommendation, LIFE_RULES)
+_AUTO_ONTARIO, _AUTO_LIMIT = map(_recommendation, AUTO_RULES[1:])
+_HOME_OWNER, _HOME_TENANT = map(_recommendation, HOME_RULES)
+(_TRAVEL_MEDICAL,) = map(_recommendation, TRAVEL_RULES)
+_LIFE_TERM_DETAIL = LIFE_RULES[0].detail
 
 
 def evaluate(context: Dict[str, Any]) -> Dict[str, Any]:
@@ -18,150 +373,188 @@ def evaluate(context: Dict[str, Any]) -> Dict[str, Any]:
         ...
     }
     """
+    # Defaults with safe fallbacks, as extract_facts(); age isn't scored,
+    # but an unreadable one has always been an error
+    get = context.get
+    int(get("age", 0) or 0)
+    income = float(get("income", 0) or 0)
+    dependants = int(get("dependants", 0) or 0)
+    province = get("province", "ON")
+    has_vehicle = bool(get("has_vehicle", False))
+    liability_limit = float(get("liability_limit", 0) or 0)
+    owns_home = bool(get("owns_home", False))
+    rents = bool(get("rents", False))
+    has_mortgage = bool(get("has_mortgage", False))
+    travels_outside_canada = bool(get("travels_outside_canada", False))
+    has_existing_life = bool(get("has_existing_life", False))
 
-    # Defaults with safe fallbacks
-    age = int(context.get("age", 0) or 0)
-    income = float(context.get("income", 0) or 0)
-    dependants = int(context.get("dependants", 0) or 0)
-    province = context.get("province", "ON")
-    has_vehicle = bool(context.get("has_vehicle", False))
-    liability_limit = float(context.get("liability_limit", 0) or 0)
-    owns_home = bool(context.get("owns_home", False))
-    rents = bool(context.get("rents", False))
-    has_mortgage = bool(context.get("has_mortgage", False))
-    travels_outside_canada = bool(context.get("travels_outside_canada", False))
-    has_existing_life = bool(context.get("has_existing_life", False))
-
-    # --- Life insurance score & recommendations ---
-    life_score = 0
+    life = 0
     life_recos = []
-
     if dependants > 0 and income > 0:
-        life_score += 30
-        rec_coverage = int(income * 10)  # 10x income rule of thumb
-        life_recos.append(
-            {
-                "title": "Consider term life insurance",
-                "detail": (
-                    f"Based on your income of ${income:,.0f} and {dependants} dependant(s), "
-                    f"a starting point could be around ${rec_coverage:,.0f} in term life coverage."
-                ),
-                "priority": 1,
-            }
+        life += 30
+        recommendation = _LIFE_TERM.copy()
+        recommendation["detail"] = _LIFE_TERM_DETAIL.format(
+            income=income, dependants=dependants, rec_coverage=int(income * 10)
         )
-
+        life_recos.append(recommendation)
     if has_mortgage:
-        life_score += 20
-        life_recos.append(
-            {
-                "title": "Protect your mortgage",
-                "detail": "You indicated that you have a mortgage; term life coverage that at least "
-                          "covers your outstanding mortgage can help protect your family home.",
-                "priority": 2,
-            }
-        )
-
+        life += 20
+        life_recos.append(_LIFE_MORTGAGE.copy())
     if not has_existing_life and (dependants > 0 or has_mortgage):
-        life_recos.append(
-            {
-                "title": "No existing life insurance detected",
-                "detail": "Since you reported no existing life insurance but have dependants or a mortgage, "
-                          "it may be worth prioritizing life coverage.",
-                "priority": 0,
-            }
-        )
-        life_score += 10
+        life += 10
+        life_recos.append(_LIFE_NONE.copy())
 
-    # Cap score
-    life_score = min(life_score, 100)
-
-    # --- Auto insurance (Ontario) ---
-    auto_score = 0
+    auto = 0
     auto_recos = []
-
     if has_vehicle:
-        auto_score += 30
+        auto += 30
         if province == "ON":
-            auto_recos.append(
-                {
-                    "title": "Mandatory Ontario auto coverage",
-                    "detail": "In Ontario, auto insurance is mandatory. Ensure you have at least the required "
-                              "third-party liability, accident benefits, uninsured automobile, and DCPD coverage.",
-                    "priority": 0,
-                }
-            )
-
-        if liability_limit and liability_limit < 2_000_000:
-            auto_score += 20
-            auto_recos.append(
-                {
-                    "title": "Increase liability limit",
-                    "detail": "Your current liability limit appears below $2,000,000. Many Ontario drivers choose "
-                              "a $2M limit to better protect against large claims.",
-                    "priority": 1,
-                }
-            )
-
-    auto_score = min(auto_score, 100)
-
-    # --- Home / Tenant ---
-    home_score = 0
-    home_recos = []
+            auto_recos.append(_AUTO_ONTARIO.copy())
+        if liability_limit != 0 and liability_limit < 2_000_000:
+            auto += 20
+            auto_recos.append(_AUTO_LIMIT.copy())
 
+    home = 0
+    home_recos = []
     if owns_home:
-        home_score += 30
-        home_recos.append(
-            {
-                "title": "Home insurance review",
-                "detail": "As a homeowner, make sure your policy reflects replacement cost and any upgrades "
-                          "(finished basement, renovations, etc.).",
-                "priority": 0,
-            }
-        )
-
+        home += 30
+        home_recos.append(_HOME_OWNER.copy())
     if rents and not owns_home:
-        home_score += 20
-        home_recos.append(
-            {
-                "title": "Consider tenant insurance",
-                "detail": "Tenant insurance can protect your belongings and provide liability coverage, "
-                          "even if you don’t own the property.",
-                "priority": 0,
-            }
-        )
-
-    home_score = min(home_score, 100)
+        home += 20
+        home_recos.append(_HOME_TENANT.copy())
 
-    # --- Travel insurance ---
-    travel_score = 0
+    travel = 0
     travel_recos = []
-
     if travels_outside_canada:
-        travel_score += 30
-        travel_recos.append(
-            {
-                "title": "Out-of-country medical coverage",
-                "detail": "You mentioned travelling outside Canada. Provincial health plans generally don’t cover "
-                          "most emergency medical costs abroad; travel medical insurance can help cover this gap.",
-                "priority": 0,
-            }
-        )
+        travel += 30
+        travel_recos.append(_TRAVEL_MEDICAL.copy())
 
-    travel_score = min(travel_score, 100)
-
-    # --- Overall score ---
-    categories = {
-        "life": {"score": life_score, "recommendations": life_recos},
-        "auto": {"score": auto_score, "recommendations": auto_recos},
-        "home": {"score": home_score, "recommendations": home_recos},
-        "travel": {"score": travel_score, "recommendations": travel_recos},
+    # Capped as in the tables (conditionals: min() costs more than the rules)
+    life = life if life < SCORE_CAP else SCORE_CAP
+    auto = auto if auto < SCORE_CAP else SCORE_CAP
+    home = home if home < SCORE_CAP else SCORE_CAP
+    travel = travel if travel < SCORE_CAP else SCORE_CAP
+    # Overall is just a simple average of non-zero categories
+    scored = (life > 0) + (auto > 0) + (home > 0) + (travel > 0)
+    return {
+        "overall_risk_score": int((life + auto + home + travel) / scored) if scored else 0,
+        "categories": {
+            "life": {"score": life, "recommendations": life_recos},
+            "auto": {"score": auto, "recommendations": auto_recos},
+            "home": {"score": home, "recommendations": home_recos},
+            "travel": {"score": travel, "recommendations": travel_recos},
+        },
     }
 
-    # Overall is just a simple average of non-zero categories
-    non_zero_scores = [c["score"] for c in categories.values() if c["score"] > 0]
-    overall = int(sum(non_zero_scores) / len(non_zero_scores)) if non_zero_scores else 0
 
+# --- Incremental scoring ---
+#
+# Each category only reads some of the answers. Those dependencies are
+# read off the rule tables (predicates, provinces and detail templates),
+# so after a change only the categories that read a changed key have to
+# be matched again; the rest of the (mask, facts) state is kept.
+
+def _names(expr: str) -> FrozenSet[str]:
+    return frozenset(compile(expr, "<risk_engine deps>", "eval").co_names) & frozenset(Facts._fields)
+
+
+def _category_fields(rules: Sequence[Rule]) -> FrozenSet[str]:
+    fields = set()
+    for rule in rules:
+        fields |= _names(_predicate_source(rule))
+        for name in _template_fields(rule.detail or ""):
+            fields |= _names(DERIVED[name]) if name in DERIVED else {name}
+    return frozenset(fields)
+
+
+# e.g. {"life": {"dependants", "income", "has_mortgage", "has_existing_life"}, ...}
+CATEGORY_FIELDS: Dict[str, FrozenSet[str]] = {
+    name: _category_fields(rules) for name, rules in RULE_TABLES.items()
+}
+
+# Bit i set = CATEGORIES[i] reads the field
+_FIELD_BITS: Dict[str, int] = {
+    field: sum(1 << i for i, name in enumerate(CATEGORIES) if field in CATEGORY_FIELDS[name])
+    for field in Facts._fields
+}
+
+
+def _changed_bits(changed: Iterable[str]) -> int:
+    bits = 0
+    for key in changed:
+        bits |= _FIELD_BITS.get(key, 0)
+    return bits
+
+
+def affected_categories(changed: Iterable[str]) -> Tuple[str, ...]:
+    """
+    The categories whose score or recommendations can depend on any of
+    the `changed` answer keys, in output order.
+    """
+    bits = _changed_bits(changed)
+    return tuple(name for i, name in enumerate(CATEGORIES) if bits >> i & 1)
+
+
+class ScoreState(NamedTuple):
+    """
+    What evaluate() works from: which rules fired, and the normalized
+    answers their details are rendered from. After rescore(), facts no
+    category reads (age) may be stale; nothing is computed from them.
+    """
+    mask: int
+    facts: Facts
+
+
+def _rescore_plan(bits: int) -> Tuple[Tuple[_Normalizer, ...], Tuple[_CompiledRule, ...], int]:
+    # The fields the categories in `bits` read, their rules and those rules' bits
+    fields: set = set()
+    rules: List[_CompiledRule] = []
+    for i, (name, category_rules) in enumerate(_CATEGORY_RULES):
+        if bits >> i & 1:
+            fields |= CATEGORY_FIELDS[name]
+            rules.extend(category_rules)
+    normalizers = tuple(entry for entry in _NORMALIZERS if entry[1] in fields)
+    return normalizers, tuple(rules), sum(1 << rule.bit for rule in rules)
+
+
+_RESCORE_PLANS = tuple(_rescore_plan(bits) for bits in range(1 << len(CATEGORIES)))
+
+
+def score_state(context: Dict[str, Any]) -> ScoreState:
+    return ScoreState(*_match(context))
+
+
+def rescore(state: ScoreState, context: Dict[str, Any], changed: Iterable[str]) -> ScoreState:
+    """
+    score_state(context), given the `state` of a context that differed
+    from this one only in the `changed` keys: only the categories reading
+    one of those keys are matched again.
+    """
+    bits = _changed_bits(changed)
+    if not bits:
+        return state
+    # Normalize the categories' fields again and re-match only their rules
+    normalizers, rules, rule_bits = _RESCORE_PLANS[bits]
+    facts = Facts._make(_normalize(context, list(state.facts), normalizers))
+    return ScoreState(state.mask & ~rule_bits | _match_rules(facts, rules), facts)
+
+
+def scores(state: ScoreState) -> Dict[str, Any]:
+    """
+    Overall and per-category scores of evaluate(), without rendering any
+    recommendations.
+    """
+    categories = {}
+    for name, rules in _CATEGORY_RULES:
+        categories[name] = _category_score(rules, state.mask)
     return {
-        "overall_risk_score": overall,
+        "overall_risk_score": _overall(categories.values()),
         "categories": categories,
     }
+
+
+def assess(state: ScoreState) -> Dict[str, Any]:
+    """
+    evaluate() of the context `state` was computed from.
+    """
+    return _assemble(state.mask, state.facts)
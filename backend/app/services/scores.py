@@ -0,0 +1,65 @@
+import time
+from typing import Any, Dict, NamedTuple, Optional
+
+from sqlalchemy import and_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..caches import TTLCache
+from ..config import SCORE_CACHE_MAX_ENTRIES, SCORE_CACHE_TTL_SECONDS
+from ..models.questionnaire import Questionnaire, QuestionnaireAnswer
+from . import risk_engine
+
+
+class Scored(NamedTuple):
+    version: int  # Questionnaire.version the answers were read at
+    context: Dict[str, Any]
+    state: risk_engine.ScoreState
+
+
+# questionnaire id -> Scored, per process. Entries are replaced, never
+# mutated, so a request can keep using the one it read.
+cache = TTLCache(SCORE_CACHE_MAX_ENTRIES)
+
+
+async def current_scores(db: AsyncSession, questionnaire_id: str, user_id: str) -> Optional[Scored]:
+    """
+    The user's questionnaire scored as it is now, or None if it is not
+    theirs. Reads only the answers saved since the cached version (every
+    save stamps the answers it changes with the new version) and re-scores
+    just the categories those answers feed. Raises ValueError/TypeError
+    for answers the risk engine cannot read.
+    """
+    cached = cache.get(questionnaire_id)
+    since = cached.version if cached is not None else -1
+    rows = (
+        await db.execute(
+            select(Questionnaire.version, QuestionnaireAnswer.question_key, QuestionnaireAnswer.answer)
+            .outerjoin(
+                QuestionnaireAnswer,
+                and_(
+                    QuestionnaireAnswer.questionnaire_id == Questionnaire.id,
+                    QuestionnaireAnswer.version > since,
+                ),
+            )
+            .where(Questionnaire.id == questionnaire_id, Questionnaire.user_id == user_id)
+        )
+    ).all()
+    if not rows:
+        return None
+
+    version = rows[0][0]
+    changed = {key: answer for _, key, answer in rows if key is not None}
+    if cached is None:
+        scored = Scored(version, changed, risk_engine.score_state(changed))
+    elif version < cached.version:
+        # The row went back in time (restored from a backup?): start over
+        cache.pop(questionnaire_id)
+        return await current_scores(db, questionnaire_id, user_id)
+    elif version == cached.version:
+        return cached
+    else:
+        context = {**cached.context, **changed}
+        scored = Scored(version, context, risk_engine.rescore(cached.state, context, changed))
+
+    cache.set(questionnaire_id, scored, time.time() + SCORE_CACHE_TTL_SECONDS)
+    return scored
@@ -0,0 +1,64 @@
+# backend/app/singleflight.py
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls. While do(key, fn) is running fn, other do()
+    calls with the same key wait for it and share its result (or its
+    exception) instead of running fn again. Nothing is kept afterwards:
+    the next call after it finishes runs fn again.
+
+    Per process; state is kept per event loop, like asyncio itself.
+    """
+
+    def __init__(self) -> None:
+        self._calls: Dict[Tuple[asyncio.AbstractEventLoop, Hashable], "asyncio.Future[Any]"] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> Tuple[T, bool]:
+        """
+        (result, True) for the call that ran fn, (result, False) for the
+        ones that shared it. If the call running fn is cancelled, one of
+        the waiting calls runs fn in its place.
+        """
+        loop = asyncio.get_running_loop()
+        slot = (loop, key)
+        while True:
+            pending = self._calls.get(slot)
+            if pending is None:
+                break
+            try:
+                # Shielded: a waiter that is cancelled mustn't cancel the call it waits for
+                result = await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                if pending.cancelled():
+                    continue  # the caller running fn went away; take over
+                raise
+            self.coalesced += 1
+            return result, False
+
+        future: "asyncio.Future[Any]" = loop.create_future()
+        self._calls[slot] = future
+        self.leaders += 1
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as exc:
+            future.set_exception(exc)
+            future.exception()  # retrieved: don't warn when nobody was waiting
+            raise
+        else:
+            future.set_result(result)
+            return result, True
+        finally:
+            del self._calls[slot]
+
+    def stats(self) -> Dict[str, int]:
+        return {"in_flight": len(self._calls), "leaders": self.leaders, "coalesced": self.coalesced}
@@ -0,0 +1,311 @@
+# backend/app/telemetry.py
+"""
+Process-wide latency and throughput metrics, exposed at GET /metrics in
+the Prometheus text format.
+
+MetricsMiddleware records, per route: request latency, requests by
+status, requests in flight, and the time and statement count spent in
+the database. Services time their own hot spots with the histograms
+below (risk engine, AI advice, upstream LLM calls). Counters that other
+modules already keep (llm_client, caches, password pool) are read at
+scrape time through register_stats(), so they cost nothing per request.
+
+Kept deliberately small: one lock per metric family, fixed buckets, no
+dependency on prometheus_client. bench/metrics_overhead_bench.py checks
+the per-request cost.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+FAST_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.1)
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 50)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Family:
+    """
+    A named metric with a fixed set of label names; one child per
+    combination of label values.
+    """
+
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._children: Dict[Tuple[str, ...], Any] = {}
+        _registry.append(self)
+
+    def _new_child(self) -> Any:
+        raise NotImplementedError
+
+    def labels(self, *values: str) -> Any:
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            children = sorted(self._children.items())
+        for values, child in children:
+            lines.extend(child.render(self.name, self.labelnames, values))
+        return lines
+
+
+class _Value:
+    def __init__(self, lock: threading.Lock) -> None:
+        self._lock = lock
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value -= amount
+
+    def render(self, name: str, labelnames: Sequence[str], values: Sequence[str]) -> List[str]:
+        return [f"{name}{_labels(labelnames, values)} {_number(self.value)}"]
+
+
+class Counter(_Family):
+    kind = "counter"
+
+    def _new_child(self) -> _Value:
+        return _Value(self._lock)
+
+
+class Gauge(_Family):
+    kind = "gauge"
+
+    def _new_child(self) -> _Value:
+        return _Value(self._lock)
+
+
+class _Buckets:
+    def __init__(self, lock: threading.Lock, bounds: Sequence[float]) -> None:
+        self._lock = lock
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # the last one is +Inf
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        i = bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+
+    @contextmanager
+    def time(self) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+    def render(self, name: str, labelnames: Sequence[str], values: Sequence[str]) -> List[str]:
+        with self._lock:
+            counts, total = list(self.counts), self.sum
+        lines = []
+        cumulative = 0
+        for bound, count in zip((*self.bounds, float("inf")), counts):
+            cumulative += count
+            le = f'le="{_number(bound)}"'
+            lines.append(f"{name}_bucket{_labels(labelnames, values, le)} {cumulative}")
+        lines.append(f"{name}_sum{_labels(labelnames, values)} {_number(total)}")
+        lines.append(f"{name}_count{_labels(labelnames, values)} {cumulative}")
+        return lines
+
+
+class Histogram(_Family):
+    kind = "histogram"
+
+    def __init__(
+            self,
+            name: str,
+            help: str,
+            labelnames: Sequence[str] = (),
+            buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> None:
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self) -> _Buckets:
+        return _Buckets(self._lock, self.buckets)
+
+
+_registry: List[_Family] = []
+
+# name prefix, stats() callable, keys that only ever go up
+_stats: List[Tuple[str, Callable[[], Dict[str, Any]], Tuple[str, ...]]] = []
+
+
+def register_stats(prefix: str, stats: Callable[[], Dict[str, Any]], counters: Iterable[str] = ()) -> None:
+    """
+    Publish a component's stats() dict at scrape time: numbers become
+    `<prefix>_<key>` gauges (`_total` counters for keys in `counters`),
+    strings become a `<prefix>_<key>{<key>="..."} 1` gauge.
+    """
+    _stats.append((prefix, stats, tuple(counters)))
+
+
+def _render_stats() -> List[str]:
+    lines: List[str] = []
+    for prefix, stats, counters in _stats:
+        for key, value in stats().items():
+            if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+                continue
+            name = f"{prefix}_{key}"
+            if isinstance(value, str):
+                lines += [f"# TYPE {name} gauge", f'{name}{{{key}="{_escape(value)}"}} 1']
+            elif key in counters:
+                lines += [f"# TYPE {name}_total counter", f"{name}_total {_number(value)}"]
+            else:
+                lines += [f"# TYPE {name} gauge", f"{name} {_number(value)}"]
+    return lines
+
+
+def render() -> str:
+    lines: List[str] = []
+    for family in _registry:
+        lines.extend(family.render())
+    lines.extend(_render_stats())
+    return "\n".join(lines) + "\n"
+
+
+# --- Application metrics ---
+
+requests_total = Counter("http_requests_total", "HTTP requests by route and status.", ("method", "route", "status"))
+requests_in_flight = Gauge("http_requests_in_flight", "HTTP requests being served.").labels()
+request_seconds = Histogram("http_request_duration_seconds", "HTTP request latency.", ("method", "route"))
+request_db_seconds = Histogram(
+    "http_request_db_seconds", "Time per HTTP request spent executing SQL.", ("method", "route"), FAST_BUCKETS + (0.25, 1.0)
+)
+request_db_statements = Histogram(
+    "http_request_db_statements", "SQL statements per HTTP request.", ("method", "route"), STATEMENT_BUCKETS
+)
+
+risk_evaluate_seconds = Histogram(
+    "risk_evaluate_seconds", "risk_engine.evaluate() time.", buckets=FAST_BUCKETS
+).labels()
+advice_seconds = Histogram(
+    "advice_seconds", "AI advice generation time, by where the advice came from.", ("source",)
+)
+llm_request_seconds = Histogram(
+    "llm_request_seconds", "Upstream LLM call latency (to the first token for streams), retries included.",
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 15.0, 30.0),
+).labels()
+llm_tokens = Counter("llm_tokens_total", "Tokens reported by the upstream LLM.", ("kind",))
+
+
+def record_usage(usage: Any) -> None:
+    """
+    Count the tokens in an OpenAI `usage` object (None is ignored).
+    """
+    if usage is None:
+        return
+    prompt = getattr(usage, "prompt_tokens", None)
+    completion = getattr(usage, "completion_tokens", None)
+    if prompt:
+        llm_tokens.labels("prompt").inc(prompt)
+    if completion:
+        llm_tokens.labels("completion").inc(completion)
+
+
+# --- Database time per request ---
+
+# [statements, seconds, start of the running statement]; a list for the
+# same reason as query_counter's: SQLAlchemy's greenlets run in a copy of
+# the request's context.
+_db: ContextVar[Optional[List[float]]] = ContextVar("request_db", default=None)
+
+
+def _before_cursor_execute(*_: Any) -> None:
+    cell = _db.get()
+    if cell is not None:
+        cell[2] = time.perf_counter()
+
+
+def _after_cursor_execute(*_: Any) -> None:
+    cell = _db.get()
+    if cell is not None:
+        cell[0] += 1
+        cell[1] += time.perf_counter() - cell[2]
+
+
+def install(engine: Engine) -> None:
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording the http_* metrics above for every request.
+    Routes are labelled by their path template, so ids don't blow up the
+    number of series; requests that match no route share one label.
+    """
+
+    def __init__(self, app: Any) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Any, receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        cell = [0, 0.0, 0.0]
+        token = _db.set(cell)
+
+        async def send_with_status(message: Any) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        requests_in_flight.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            requests_in_flight.dec()
+            _db.reset(token)
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "<unmatched>"
+            method = scope["method"]
+            requests_total.labels(method, path, str(status)).inc()
+            request_seconds.labels(method, path).observe(elapsed)
+            request_db_seconds.labels(method, path).observe(cell[1])
+            request_db_statements.labels(method, path).observe(cell[0])
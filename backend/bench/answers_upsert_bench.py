@@ -0,0 +1,68 @@
+"""
+SQL statements and latency of PUT /questionnaires/{id}/answers with
+50-key payloads: first save (all new keys), a save that changes every
+value, and a save that changes nothing.
+
+Run from backend/:
+
+    python -m bench.answers_upsert_bench [--rounds 100] [--keys 50]
+
+Uses a throwaway SQLite database; the app runs in-process.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+_tmpdir = tempfile.mkdtemp(prefix="answers-bench-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_tmpdir}/bench.db"
+os.environ["DB_MIGRATE_ON_STARTUP"] = "1"
+os.environ.setdefault("LLM_CACHE_PATH", "")
+
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+
+from app.db import async_engine  # noqa: E402
+from app.main import app  # noqa: E402
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rounds", type=int, default=100)
+    parser.add_argument("--keys", type=int, default=50)
+    args = parser.parse_args()
+
+    statements = 0
+
+    @event.listens_for(async_engine.sync_engine, "before_cursor_execute")
+    def _count(*_):
+        nonlocal statements
+        statements += 1
+
+    with TestClient(app) as client:
+        client.post("/auth/register", json={"email": "bench@example.com", "password": "bench"})
+        token = client.post(
+            "/auth/login", data={"username": "bench@example.com", "password": "bench"}
+        ).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        qids = [client.post("/questionnaires/", headers=headers).json()["id"] for _ in range(args.rounds)]
+        client.put(f"/questionnaires/{qids[0]}/answers", headers=headers, json={"answers": {"warmup": 1}})
+
+        def payload(value: int):
+            return {"answers": {f"question_{k}": value + k for k in range(args.keys)}}
+
+        for label, value in (("insert", 0), ("update", 1), ("no-op", 1)):
+            statements = 0
+            start = time.perf_counter()
+            for qid in qids:
+                response = client.put(f"/questionnaires/{qid}/answers", headers=headers, json=payload(value))
+                assert response.status_code == 200, response.text
+            elapsed = time.perf_counter() - start
+            print(
+                f"{label:>6}: {statements / args.rounds:.1f} statements/save, "
+                f"{elapsed / args.rounds * 1000:.2f} ms/save"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+SQL statements and latency per answer autosave, with and without the
+authenticated-principal cache.
+
+Run from backend/:
+
+    python -m bench.auth_cache_bench [--requests 500]
+
+Uses a throwaway SQLite database; the app runs in-process.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+_tmpdir = tempfile.mkdtemp(prefix="auth-cache-bench-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_tmpdir}/bench.db"
+os.environ["DB_MIGRATE_ON_STARTUP"] = "1"
+os.environ.setdefault("LLM_CACHE_PATH", "")
+
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+
+from app import auth_cache  # noqa: E402
+from app.db import async_engine  # noqa: E402
+from app.main import app  # noqa: E402
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=500)
+    args = parser.parse_args()
+
+    statements = 0
+
+    @event.listens_for(async_engine.sync_engine, "before_cursor_execute")
+    def _count(*_):
+        nonlocal statements
+        statements += 1
+
+    with TestClient(app) as client:
+        client.post("/auth/register", json={"email": "bench@example.com", "password": "bench"})
+        token = client.post(
+            "/auth/login", data={"username": "bench@example.com", "password": "bench"}
+        ).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        qid = client.post("/questionnaires/", headers=headers).json()["id"]
+
+        for label, cached in (("uncached", False), ("cached", True)):
+            statements = 0
+            start = time.perf_counter()
+            for i in range(args.requests):
+                if not cached:
+                    auth_cache.tokens.clear()
+                    auth_cache.principals.clear()
+                client.put(
+                    f"/questionnaires/{qid}/answers",
+                    headers=headers,
+                    json={"answers": {"age": 20 + i % 50}},
+                )
+            elapsed = time.perf_counter() - start
+            print(
+                f"{label:>9}: {statements / args.requests:.2f} statements/request, "
+                f"{elapsed / args.requests * 1000:.2f} ms/request"
+            )
+
+
+if __name__ == "__main__":
+    main()
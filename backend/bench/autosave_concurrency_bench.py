@@ -0,0 +1,132 @@
+"""
+Many concurrent autosave clients against a real uvicorn server.
+
+Run from backend/:
+
+    python -m bench.autosave_concurrency_bench [--clients 1000] [--saves 5]
+
+Each client owns one questionnaire and PUTs `--saves` answer changes to
+it, all clients at once. Reported: throughput, latency percentiles and
+non-200 responses.
+
+The server runs from `--app-dir` (default: this checkout), so the same load
+can be pointed at the old synchronous database layer for comparison:
+
+    git worktree add /tmp/sync-db <commit before the async switch>
+    python -m bench.autosave_concurrency_bench --app-dir /tmp/sync-db/backend
+
+Uses a throwaway SQLite database.
+"""
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from typing import List
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def _run(base: str, clients: int, saves: int) -> None:
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+    async with httpx.AsyncClient(base_url=base, timeout=120, limits=limits) as client:
+        credentials = {"username": "bench@example.com", "password": "bench"}
+        await client.post("/auth/register", json={"email": credentials["username"], "password": "bench"})
+        token = (await client.post("/auth/login", data=credentials)).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+
+        # Setup, not measured: one questionnaire per client, 50 at a time
+        qids: List[str] = []
+        for start in range(0, clients, 50):
+            batch = [client.post("/questionnaires/", headers=headers) for _ in range(min(50, clients - start))]
+            qids += [r.json()["id"] for r in await asyncio.gather(*batch)]
+
+        statuses: Counter = Counter()
+        latencies: List[float] = []
+
+        async def autosave(qid: str) -> None:
+            for i in range(saves):
+                start = time.perf_counter()
+                try:
+                    r = await client.put(
+                        f"/questionnaires/{qid}/answers",
+                        headers=headers,
+                        json={"answers": {"age": 20 + i, "income": 50_000 + i, "province": "ON"}},
+                    )
+                    statuses[r.status_code] += 1
+                except httpx.HTTPError as exc:
+                    statuses[type(exc).__name__] += 1
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(autosave(qid) for qid in qids))
+        elapsed = time.perf_counter() - start
+
+    total = clients * saves
+    print(f"clients:     {clients:,} x {saves} saves")
+    print(f"statuses:    {dict(sorted(statuses.items(), key=str))}")
+    print(f"throughput:  {total / elapsed:,.0f} saves/sec ({elapsed:.1f}s)")
+    print(
+        f"latency:     p50 {_percentile(latencies, 50) * 1000:.0f} ms, "
+        f"p95 {_percentile(latencies, 95) * 1000:.0f} ms, "
+        f"p99 {_percentile(latencies, 99) * 1000:.0f} ms"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=1000)
+    parser.add_argument("--saves", type=int, default=5, help="autosaves per client")
+    parser.add_argument("--app-dir", default=BACKEND_DIR, help="backend/ directory to serve the app from")
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp(prefix="autosave-bench-")
+    port = _free_port()
+    env = {
+        **os.environ,
+        "DATABASE_URL": f"sqlite:///{tmpdir}/bench.db",
+        "DB_MIGRATE_ON_STARTUP": "1",
+        "LLM_CACHE_PATH": "",
+        "PASSWORD_HASH_WORKERS": "0",
+    }
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=args.app_dir,
+        env=env,
+    )
+    base = f"http://127.0.0.1:{port}"
+    try:
+        for _ in range(200):
+            try:
+                httpx.get(f"{base}/health")
+                break
+            except httpx.TransportError:
+                time.sleep(0.1)
+        print(f"app:         {os.path.abspath(args.app_dir)}")
+        asyncio.run(_run(base, args.clients, args.saves))
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Autosaving a long form: PUT of the whole form on every change vs. PATCH
+of just the changed answer with If-Match.
+
+Run from backend/:
+
+    python -m bench.autosave_patch_bench [--keys 200] [--forms 20]
+
+Each form is filled in one answer at a time, with a save after every
+change. Reported per save: request and response body bytes, SQL
+statements and latency. Uses a throwaway SQLite database; the app runs
+in-process.
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+_tmpdir = tempfile.mkdtemp(prefix="autosave-patch-bench-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_tmpdir}/bench.db"
+os.environ["DB_MIGRATE_ON_STARTUP"] = "1"
+os.environ.setdefault("LLM_CACHE_PATH", "")
+os.environ.setdefault("PASSWORD_HASH_WORKERS", "0")
+
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+
+from app.db import async_engine  # noqa: E402
+from app.main import app  # noqa: E402
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--keys", type=int, default=200, help="answers per form")
+    parser.add_argument("--forms", type=int, default=20)
+    args = parser.parse_args()
+
+    statements = 0
+
+    @event.listens_for(async_engine.sync_engine, "before_cursor_execute")
+    def _count(*_):
+        nonlocal statements
+        statements += 1
+
+    with TestClient(app) as client:
+        client.post("/auth/register", json={"email": "bench@example.com", "password": "bench"})
+        token = client.post(
+            "/auth/login", data={"username": "bench@example.com", "password": "bench"}
+        ).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+
+        def fill(mode: str) -> None:
+            sent = received = saved_statements = 0
+            elapsed = 0.0
+            for _ in range(args.forms):
+                qid = client.post("/questionnaires/", headers=headers).json()["id"]
+                version = client.get(f"/questionnaires/{qid}", headers=headers).headers["etag"]
+                form = {}
+                for k in range(args.keys):
+                    key, value = f"question_{k}", f"answer {k}"
+                    form[key] = value
+                    request_headers = {**headers, "Content-Type": "application/json"}
+                    if mode == "PUT":
+                        body = json.dumps({"answers": form})
+                    else:
+                        body = json.dumps({"answers": {key: value}})
+                        request_headers["If-Match"] = version
+
+                    before = statements
+                    start = time.perf_counter()
+                    response = client.request(
+                        mode, f"/questionnaires/{qid}/answers", headers=request_headers, content=body
+                    )
+                    elapsed += time.perf_counter() - start
+                    saved_statements += statements - before
+                    assert response.status_code == 200, response.text
+
+                    version = response.headers["etag"]
+                    sent += len(body)
+                    received += len(response.content)
+
+            saves = args.forms * args.keys
+            print(
+                f"{mode:>5}: {sent / saves:>8,.0f} B sent, {received / saves:>8,.0f} B received, "
+                f"{saved_statements / saves:.1f} statements, {elapsed / saves * 1000:.2f} ms per save"
+            )
+
+        print(f"{args.forms} forms x {args.keys} answers, one save per answer")
+        fill("PUT")
+        fill("PATCH")
+
+
+if __name__ == "__main__":
+    main()
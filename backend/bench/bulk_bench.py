@@ -0,0 +1,124 @@
+"""
+Throughput of bulk import and export (services/bulk.py) into a throwaway
+SQLite database.
+
+Run from backend/:
+
+    python -m bench.bulk_bench [--n 50000] [--batch-size 5000]
+    python -m bench.bulk_bench --out after.json --compare before.json
+
+Imports `--n` synthetic profiles from an NDJSON file (and from Parquet
+when pyarrow is installed), plain and with scoring, then exports the
+questionnaires and assessments in every available format. Rates are
+profiles (rows) per second, end to end: parsing, inserting or reading,
+and encoding. Results are written as JSON (see bench/results.py) and
+optionally compared with an earlier run, exiting non-zero on a
+regression.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+from . import results
+from .risk_engine_bench import synthetic_contexts
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n", type=int, default=50_000, help="profiles per import")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--out", help="results file (default: bench-results/bulk-<time>.json)")
+    parser.add_argument("--compare", help="earlier results file to compare with")
+    parser.add_argument("--threshold", type=float, default=0.2, help="relative change that counts as a regression")
+    args = parser.parse_args()
+
+    # Settings are read at import time, so set them before importing the app
+    tmpdir = tempfile.mkdtemp(prefix="bulk-bench-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{tmpdir}/bench.db"
+    os.environ["LLM_CACHE_PATH"] = ""
+    os.environ["PASSWORD_HASH_WORKERS"] = "0"
+
+    from app.db import AsyncSessionLocal, async_engine
+    from app.migrations import upgrade_async
+    from app.models.user import User
+    from app.services import bulk
+
+    ndjson_path = os.path.join(tmpdir, "profiles.ndjson")
+    with open(ndjson_path, "w") as f:
+        for ctx in synthetic_contexts(args.n):
+            f.write(json.dumps({"answers": ctx}) + "\n")
+    sources = {"ndjson": ndjson_path}
+    if bulk.columnar_available():
+        sources["parquet"] = os.path.join(tmpdir, "profiles.parquet")
+
+    async def run() -> results.Results:
+        summary: results.Results = {}
+        await upgrade_async(async_engine)
+        async with AsyncSessionLocal() as db:
+            user = User(email="bulk@example.com", hashed_password="-")
+            db.add(user)
+            await db.commit()
+            user_id = user.id
+        rows = {"questionnaires": 0, "assessments": 0}
+
+        if "parquet" in sources:
+            # The export of the first import is the Parquet input
+            with open(ndjson_path, "rb") as source:
+                async with AsyncSessionLocal() as db:
+                    for records in bulk.ndjson_records(source, args.batch_size):
+                        rows["questionnaires"] += await bulk.import_batch(db, user_id, records)
+            with open(sources["parquet"], "wb") as sink:
+                async for chunk in bulk.export_questionnaires("parquet", batch_size=args.batch_size):
+                    sink.write(chunk)
+
+        for fmt, path in sources.items():
+            for score in (False, True):
+                start = time.perf_counter()
+                with open(path, "rb") as source:
+                    if fmt == "ndjson":
+                        batches = bulk.ndjson_records(source, args.batch_size)
+                    else:
+                        batches = bulk.columnar_records(source, fmt, args.batch_size)
+                    async with AsyncSessionLocal() as db:
+                        imported = sum([await bulk.import_batch(db, user_id, records, score=score)
+                                        for records in batches])
+                elapsed = time.perf_counter() - start
+                rows["questionnaires"] += imported
+                rows["assessments"] += imported if score else 0
+                summary[f"import {fmt}{' scored' if score else ''}"] = {
+                    "count": imported, "ops_per_sec": imported / elapsed,
+                }
+
+        for what, export in (("questionnaires", bulk.export_questionnaires),
+                             ("assessments", bulk.export_assessments)):
+            for fmt in bulk.MEDIA_TYPES:
+                if fmt in bulk.COLUMNAR and not bulk.columnar_available():
+                    continue
+                size = 0
+                start = time.perf_counter()
+                async for chunk in export(fmt, user_id, args.batch_size):
+                    size += len(chunk)
+                elapsed = time.perf_counter() - start
+                summary[f"export {what} {fmt}"] = {
+                    "count": rows[what], "ops_per_sec": rows[what] / elapsed, "bytes": size,
+                }
+        await async_engine.dispose()
+        return summary
+
+    summary = asyncio.run(run())
+    for name, metrics in summary.items():
+        size = f"  {metrics['bytes'] / 1e6:,.1f} MB" if "bytes" in metrics else ""
+        print(f"{name:<30} {metrics['count']:>9,} rows  {metrics['ops_per_sec']:>9,.0f} rows/sec{size}")
+
+    settings = {key: value for key, value in vars(args).items() if key not in ("out", "compare")}
+    results.write(args.out or results.default_path("bulk"), "bulk", summary, settings)
+    if args.compare and results.compare(summary, args.compare, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Latency of GET /analytics/coverage as the number of assessed
+questionnaires grows, against recomputing the same numbers from scratch.
+
+Run from backend/:
+
+    python -m bench.coverage_bench [--sizes 1000,10000,50000] [--requests 200]
+    python -m bench.coverage_bench --out after.json --compare before.json
+
+Scored profiles are bulk imported (which maintains the rollups) up to
+each size, and the endpoint is timed there. At the largest size it
+also times a recompute from the stored assessments (what
+`python -m app.coverage check` does) and from the answers themselves
+(scan every answer row, re-run risk_engine.evaluate), and exits
+non-zero if the rollups differ from the recompute. Results are written
+as JSON (see bench/results.py) and optionally compared with an earlier
+run, exiting non-zero on a regression.
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+from . import results
+from .risk_engine_bench import synthetic_contexts
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1000,10000,50000", help="questionnaire counts to time the endpoint at")
+    parser.add_argument("--requests", type=int, default=200, help="endpoint calls per size")
+    parser.add_argument("--out", help="results file (default: bench-results/coverage-<time>.json)")
+    parser.add_argument("--compare", help="earlier results file to compare with")
+    parser.add_argument("--threshold", type=float, default=0.2, help="relative change that counts as a regression")
+    args = parser.parse_args()
+    sizes = sorted(int(size) for size in args.sizes.split(","))
+
+    # Settings are read at import time, so set them before importing the app
+    tmpdir = tempfile.mkdtemp(prefix="coverage-bench-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{tmpdir}/bench.db"
+    os.environ["DB_MIGRATE_ON_STARTUP"] = "1"
+    os.environ["LLM_CACHE_PATH"] = ""
+    os.environ["PASSWORD_HASH_WORKERS"] = "0"
+    os.environ["BCRYPT_ROUNDS"] = "4"
+    os.environ["ANALYTICS_EMAILS"] = "bench@example.com"
+
+    from fastapi.testclient import TestClient
+    from sqlalchemy import select
+
+    from app.db import AsyncSessionLocal, engine
+    from app.main import app
+    from app.models.questionnaire import QuestionnaireAnswer
+    from app.services import bulk, coverage, risk_engine
+
+    contexts = synthetic_contexts(sizes[-1])
+    summary: results.Results = {}
+
+    async def import_profiles(user_id: str, start: int, stop: int) -> None:
+        async with AsyncSessionLocal() as db:
+            for offset in range(start, stop, 5000):
+                records = [(n + 1, {"answers": contexts[n]}) for n in range(offset, min(offset + 5000, stop))]
+                await bulk.import_batch(db, user_id, records, score=True)
+
+    with TestClient(app) as client:
+        client.post("/auth/register", json={"email": "bench@example.com", "password": "bench"})
+        token = client.post("/auth/login", data={"username": "bench@example.com", "password": "bench"}).json()
+        headers = {"Authorization": f"Bearer {token['access_token']}"}
+        with engine.connect() as conn:
+            user_id = conn.exec_driver_sql("SELECT id FROM users").scalar()
+
+        imported = 0
+        for size in sizes:
+            start = time.perf_counter()
+            asyncio.run(import_profiles(user_id, imported, size))
+            rate = (size - imported) / (time.perf_counter() - start)
+            imported = size
+
+            latencies: List[float] = []
+            begin = time.perf_counter()
+            for _ in range(args.requests):
+                start = time.perf_counter()
+                response = client.get("/analytics/coverage", headers=headers)
+                latencies.append(time.perf_counter() - start)
+            elapsed = time.perf_counter() - begin
+            if response.json()["overall"]["questionnaires"] != size:
+                raise SystemExit(f"Endpoint counted {response.json()['overall']['questionnaires']}, expected {size}")
+            summary[f"GET /analytics/coverage n={size}"] = results.latency_summary(latencies, elapsed)
+            summary[f"import scored n={size}"] = {"ops_per_sec": rate}
+
+    with engine.connect() as conn:
+        start = time.perf_counter()
+        differences = coverage.check(conn)
+        summary[f"recompute from assessments n={imported}"] = {"elapsed_ms": (time.perf_counter() - start) * 1000}
+
+        start = time.perf_counter()
+        deltas: Dict[Any, List[int]] = {}
+        context: Dict[str, Any] = {}
+        last = None
+        rows = conn.execute(
+            select(QuestionnaireAnswer.questionnaire_id, QuestionnaireAnswer.question_key, QuestionnaireAnswer.answer)
+            .order_by(QuestionnaireAnswer.questionnaire_id)
+            .execution_options(yield_per=5000)
+        )
+        for qid, key, value in itertools.chain(rows, [(None, None, None)]):
+            if qid != last and last is not None:
+                facts = risk_engine.project_facts(context)
+                coverage._add(deltas, coverage.member(last, facts, risk_engine.evaluate(context)), 1)
+                context = {}
+            context[key] = value
+            last = qid
+        summary[f"recompute from answers n={imported}"] = {"elapsed_ms": (time.perf_counter() - start) * 1000}
+
+    for name, metrics in summary.items():
+        if "p50_ms" in metrics:
+            print(f"{name:<44} p50 {metrics['p50_ms']:7.2f} ms  p95 {metrics['p95_ms']:7.2f} ms")
+        elif "elapsed_ms" in metrics:
+            print(f"{name:<44} {metrics['elapsed_ms']:10,.0f} ms")
+        else:
+            print(f"{name:<44} {metrics['ops_per_sec']:10,.0f} profiles/sec")
+
+    settings = {key: value for key, value in vars(args).items() if key not in ("out", "compare")}
+    results.write(args.out or results.default_path("coverage"), "coverage", summary, settings)
+    if differences:
+        print("\n".join(differences[:20]), file=sys.stderr)
+        print(f"{len(differences)} rollup rows differ from a recompute", file=sys.stderr)
+        sys.exit(1)
+    if args.compare and results.compare(summary, args.compare, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
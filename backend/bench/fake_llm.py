@@ -0,0 +1,107 @@
+"""
+A local stand-in for the OpenAI chat completions API, for benchmarks.
+
+    from bench import fake_llm
+    base_url = fake_llm.start(latency=0.2)
+    os.environ["OPENAI_BASE_URL"] = base_url  # before the app makes its first call
+
+Answers every POST /v1/chat/completions with the same advice text after
+`latency` seconds, as one response or (with "stream": true) as a stream of
+small chunks spread over that time, with token usage like the real API.
+Runs uvicorn in a daemon thread of the calling process; `calls` counts
+the completions requested so far, and setting `delay` holds every answer
+back that many more seconds.
+"""
+import asyncio
+import json
+import socket
+import threading
+import time
+import uuid
+from typing import Any, AsyncIterator, Dict
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+ADVICE = (
+    "You have dependants and a mortgage, so the main question is whether your life cover "
+    "would replace your income for long enough. Your home and auto policies look typical "
+    "for your province.\n"
+    "- Ask an advisor how much term life cover would clear your mortgage and support your dependants.\n"
+    "- Check that your auto liability limit is at least $2M.\n"
+    "- Confirm your home policy covers contents at replacement cost.\n"
+    "- Buy emergency medical cover before travelling outside Canada.\n"
+)
+CHUNK_CHARS = 16
+
+calls = 0
+delay = 0.0
+
+
+def _usage(body: Dict[str, Any]) -> Dict[str, int]:
+    # Roughly four characters per token, like English text
+    prompt = sum(len(m.get("content") or "") for m in body.get("messages", [])) // 4
+    completion = len(ADVICE) // 4
+    return {"prompt_tokens": prompt, "completion_tokens": completion, "total_tokens": prompt + completion}
+
+
+def create_app(latency: float) -> FastAPI:
+    app = FastAPI()
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        global calls
+        calls += 1
+        body = await request.json()
+        await asyncio.sleep(delay)
+        common = {"id": f"chatcmpl-{uuid.uuid4().hex}", "created": int(time.time()), "model": body.get("model")}
+
+        if not body.get("stream"):
+            await asyncio.sleep(latency)
+            return JSONResponse({
+                **common,
+                "object": "chat.completion",
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": ADVICE},
+                    "finish_reason": "stop",
+                }],
+                "usage": _usage(body),
+            })
+
+        include_usage = bool((body.get("stream_options") or {}).get("include_usage"))
+        pieces = [ADVICE[i:i + CHUNK_CHARS] for i in range(0, len(ADVICE), CHUNK_CHARS)]
+
+        async def events() -> AsyncIterator[str]:
+            for piece in pieces:
+                await asyncio.sleep(latency / len(pieces))
+                chunk = {
+                    **common,
+                    "object": "chat.completion.chunk",
+                    "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}],
+                }
+                yield f"data: {json.dumps(chunk)}\n\n"
+            if include_usage:
+                chunk = {**common, "object": "chat.completion.chunk", "choices": [], "usage": _usage(body)}
+                yield f"data: {json.dumps(chunk)}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return app
+
+
+def start(latency: float = 0.2) -> str:
+    """
+    Serve the fake API on a free local port; returns its base URL.
+    """
+    import uvicorn
+
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(create_app(latency), host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return f"http://127.0.0.1:{port}/v1"
@@ -0,0 +1,217 @@
+"""
+Load test of the whole user journey against the app served in-process,
+with SQLite and a local fake LLM (bench/fake_llm.py).
+
+Run from backend/:
+
+    python -m bench.journey_bench [--users 200] [--concurrency 50] [--autosaves 10]
+    python -m bench.journey_bench --out after.json --compare before.json
+
+Each simulated user registers, logs in, creates a questionnaire, autosaves
+it `--autosaves` times (one more answer each time, like a form being
+filled in), completes it and polls GET /reports/{id}/advice until the AI
+advice is ready; with `--stream` it reads the advice stream instead.
+At most `--concurrency` journeys run at once. Reported per endpoint:
+requests/sec and p50/p95/p99 latency, 429s (retried after Retry-After)
+and other non-2xx responses. Results are written as JSON (see
+bench/results.py) and optionally compared with an earlier run, exiting
+non-zero on a regression.
+
+Registration and login are dominated by bcrypt; lower --bcrypt-rounds to
+focus on the rest of the journey.
+"""
+import argparse
+import asyncio
+import os
+import random
+import socket
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+from typing import Any, Dict, List
+
+from . import fake_llm, results
+
+PROFILE_KEYS = (
+    "age", "income", "dependants", "province", "has_vehicle", "liability_limit",
+    "owns_home", "rents", "has_mortgage", "travels_outside_canada", "has_existing_life",
+)
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _profile(rng: random.Random) -> Dict[str, Any]:
+    # Distinct per user, so advice isn't served from the LLM cache
+    owns_home = rng.random() < 0.6
+    return {
+        "age": rng.randint(18, 80),
+        "income": rng.randint(20, 250) * 1000,
+        "dependants": rng.randint(0, 4),
+        "province": rng.choice(["ON", "BC", "AB", "QC", "NS", "MB"]),
+        "has_vehicle": rng.random() < 0.7,
+        "liability_limit": rng.choice([1_000_000, 2_000_000]),
+        "owns_home": owns_home,
+        "rents": not owns_home,
+        "has_mortgage": owns_home and rng.random() < 0.7,
+        "travels_outside_canada": rng.random() < 0.5,
+        "has_existing_life": rng.random() < 0.4,
+    }
+
+
+class Recorder:
+    def __init__(self) -> None:
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Counter = Counter()
+        self.throttled: Counter = Counter()
+
+    async def request(self, client: Any, name: str, method: str, url: str, **kwargs: Any) -> Any:
+        while True:
+            start = time.perf_counter()
+            response = await client.request(method, url, **kwargs)
+            self.latencies[name].append(time.perf_counter() - start)
+            if response.status_code != 429:
+                break
+            # Back off like a well-behaved client (the password pool is full)
+            self.throttled[name] += 1
+            await asyncio.sleep(float(response.headers.get("Retry-After", "1")))
+        if response.status_code >= 300:
+            self.errors[name] += 1
+        return response
+
+
+async def _journey(client: Any, recorder: Recorder, n: int, run_id: str, args: argparse.Namespace) -> None:
+    start = time.perf_counter()
+    rng = random.Random(n)
+    email = f"journey-{run_id}-{n}@example.com"
+    password = "correct horse battery staple"
+
+    await recorder.request(client, "POST /auth/register", "POST", "/auth/register",
+                           json={"email": email, "password": password})
+    r = await recorder.request(client, "POST /auth/login", "POST", "/auth/login",
+                               data={"username": email, "password": password})
+    if r.status_code != 200:
+        return
+    headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+    r = await recorder.request(client, "POST /questionnaires/", "POST", "/questionnaires/", headers=headers)
+    qid = r.json()["id"]
+
+    profile = _profile(rng)
+    for i in range(args.autosaves):
+        answers = {key: profile[key] for key in PROFILE_KEYS[:i % len(PROFILE_KEYS) + 1]}
+        await recorder.request(client, "PUT /questionnaires/{id}/answers", "PUT",
+                               f"/questionnaires/{qid}/answers", headers=headers, json={"answers": answers})
+        await asyncio.sleep(args.think_time)
+
+    await recorder.request(client, "POST /questionnaires/{id}/complete", "POST",
+                           f"/questionnaires/{qid}/complete", headers=headers,
+                           params={"stream_advice": "true"} if args.stream else None)
+
+    advice_start = time.perf_counter()
+    if args.stream:
+        await recorder.request(client, "GET /reports/{id}/advice/stream", "GET",
+                               f"/reports/{qid}/advice/stream", headers=headers)
+    else:
+        while True:
+            r = await recorder.request(client, "GET /reports/{id}/advice", "GET",
+                                       f"/reports/{qid}/advice", headers=headers)
+            if r.status_code != 200 or r.json()["ai_status"] != "pending":
+                break
+            await asyncio.sleep(args.poll_interval)
+    recorder.latencies["advice ready (after complete)"].append(time.perf_counter() - advice_start)
+    recorder.latencies["journey"].append(time.perf_counter() - start)
+
+
+async def _run(base: str, args: argparse.Namespace) -> Dict[str, Any]:
+    import httpx
+
+    recorder = Recorder()
+    run_id = f"{int(time.time())}-{os.getpid()}"
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async with httpx.AsyncClient(base_url=base, timeout=120, limits=limits) as client:
+        async def one(n: int) -> None:
+            async with semaphore:
+                try:
+                    await _journey(client, recorder, n, run_id, args)
+                except httpx.HTTPError as exc:
+                    recorder.errors[type(exc).__name__] += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(n) for n in range(args.users)))
+        elapsed = time.perf_counter() - start
+
+    return {"recorder": recorder, "elapsed": elapsed}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=200, help="journeys in total")
+    parser.add_argument("--concurrency", type=int, default=50, help="journeys at once")
+    parser.add_argument("--autosaves", type=int, default=10, help="PUT /answers per journey")
+    parser.add_argument("--think-time", type=float, default=0.0, help="seconds between autosaves")
+    parser.add_argument("--stream", action="store_true", help="stream the advice instead of polling for it")
+    parser.add_argument("--poll-interval", type=float, default=0.1)
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="fake LLM seconds per completion")
+    parser.add_argument("--bcrypt-rounds", type=int, help="override BCRYPT_ROUNDS")
+    parser.add_argument("--out", help="results file (default: bench-results/journey-<time>.json)")
+    parser.add_argument("--compare", help="earlier results file to compare with")
+    parser.add_argument("--threshold", type=float, default=0.2, help="relative change that counts as a regression")
+    args = parser.parse_args()
+
+    # Settings are read at import time, so set them before importing the app
+    tmpdir = tempfile.mkdtemp(prefix="journey-bench-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{tmpdir}/bench.db"
+    os.environ["DB_MIGRATE_ON_STARTUP"] = "1"
+    os.environ["LLM_CACHE_PATH"] = ""
+    os.environ["OPENAI_API_KEY"] = "bench"
+    os.environ["OPENAI_BASE_URL"] = fake_llm.start(args.llm_latency)
+    if args.bcrypt_rounds is not None:
+        os.environ["BCRYPT_ROUNDS"] = str(args.bcrypt_rounds)
+
+    import uvicorn
+
+    from app.main import app
+
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+
+    run = asyncio.run(_run(f"http://127.0.0.1:{port}", args))
+    server.should_exit = True
+    recorder, elapsed = run["recorder"], run["elapsed"]
+
+    summary: results.Results = {}
+    print(f"{args.users} journeys, {args.concurrency} at a time, {elapsed:.1f}s")
+    print(f"{'':<36} {'count':>6} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'429s':>6} {'errors':>6}")
+    for name, latencies in recorder.latencies.items():
+        summary[name] = {
+            **results.latency_summary(latencies, elapsed),
+            "throttled": recorder.throttled[name],
+            "errors": recorder.errors[name],
+        }
+        row = summary[name]
+        print(f"{name:<36} {row['count']:>6} {row['rps']:>8.1f} {row['p50_ms']:>8.1f} "
+              f"{row['p95_ms']:>8.1f} {row['p99_ms']:>8.1f} {row['throttled']:>6} {row['errors']:>6}")
+    for name, count in recorder.errors.items():
+        if name not in summary:
+            print(f"{name}: {count}")
+            summary[name] = {"errors": count}
+
+    settings = {key: value for key, value in vars(args).items() if key not in ("out", "compare")}
+    results.write(args.out or results.default_path("journey"), "journey", summary, settings)
+    if args.compare and results.compare(summary, args.compare, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+GET /questionnaires/{id}/score after every autosave: scored from the
+cached state and the answers changed since (the normal case) vs. from
+scratch (cache cleared before each call, so every answer is read and
+every rule matched, as on a cache miss). Both take the same one query.
+
+Run from backend/:
+
+    python -m bench.live_score_bench [--forms 20] [--keys 200]
+
+Each form has `--keys` questions, the risk engine's among them, and is
+filled in one answer at a time with a PATCH and a score after every
+change. Reported per score: SQL statements and latency. Every score is
+checked against risk_engine.evaluate() of the whole form. Uses a
+throwaway SQLite database; the app runs in-process.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+_tmpdir = tempfile.mkdtemp(prefix="live-score-bench-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_tmpdir}/bench.db"
+os.environ["DB_MIGRATE_ON_STARTUP"] = "1"
+os.environ.setdefault("LLM_CACHE_PATH", "")
+os.environ.setdefault("PASSWORD_HASH_WORKERS", "0")
+
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+
+from app.db import async_engine  # noqa: E402
+from app.main import app  # noqa: E402
+from app.services import risk_engine, scores  # noqa: E402
+
+from .journey_bench import PROFILE_KEYS  # noqa: E402
+from .risk_engine_bench import synthetic_contexts  # noqa: E402
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--forms", type=int, default=20)
+    parser.add_argument("--keys", type=int, default=200, help="questions per form (at least the engine's 11)")
+    args = parser.parse_args()
+
+    statements = 0
+
+    @event.listens_for(async_engine.sync_engine, "before_cursor_execute")
+    def _count(*_):
+        nonlocal statements
+        statements += 1
+
+    profiles = synthetic_contexts(args.forms)
+    # The engine's questions spread through the rest of the form
+    questions = [f"question_{k}" for k in range(max(args.keys - len(PROFILE_KEYS), 0))]
+    step = max(len(questions) // len(PROFILE_KEYS), 1)
+    for i, key in enumerate(PROFILE_KEYS):
+        questions.insert(i * (step + 1), key)
+
+    with TestClient(app) as client:
+        client.post("/auth/register", json={"email": "bench@example.com", "password": "bench"})
+        token = client.post(
+            "/auth/login", data={"username": "bench@example.com", "password": "bench"}
+        ).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+
+        def fill(mode: str) -> None:
+            scored = scored_statements = 0
+            elapsed = 0.0
+            for profile in profiles:
+                qid = client.post("/questionnaires/", headers=headers).json()["id"]
+                version = client.get(f"/questionnaires/{qid}", headers=headers).headers["etag"]
+                form = {}
+                for key in questions:
+                    form[key] = profile.get(key, 0) if key in PROFILE_KEYS else f"answer to {key}"
+                    response = client.patch(
+                        f"/questionnaires/{qid}/answers",
+                        headers={**headers, "If-Match": version},
+                        json={"answers": {key: form[key]}},
+                    )
+                    version = response.headers["etag"]
+
+                    if mode == "from scratch":
+                        scores.cache.clear()
+                    before = statements
+                    start = time.perf_counter()
+                    response = client.get(f"/questionnaires/{qid}/score", headers=headers)
+                    elapsed += time.perf_counter() - start
+                    scored_statements += statements - before
+                    scored += 1
+
+                    expected = risk_engine.evaluate(form)
+                    body = response.json()
+                    assert body["overall_risk_score"] == expected["overall_risk_score"], (body, expected)
+                    assert body["categories"] == {
+                        name: category["score"] for name, category in expected["categories"].items()
+                    }, (body, expected)
+
+            print(f"{mode:>14}: {scored_statements / scored:.1f} statements, {elapsed / scored * 1000:.2f} ms per score")
+
+        print(f"{args.forms} forms x {len(questions)} answers, PATCH + GET /score per answer")
+        fill("from scratch")
+        fill("incremental")
+
+    # The engine on its own: one changed answer
+    contexts = synthetic_contexts(20_000)
+    states = [risk_engine.score_state(ctx) for ctx in contexts]
+    changed = [{**ctx, "income": 50_000} for ctx in contexts]
+    for name, fn in (
+        ("evaluate", lambda i: risk_engine.evaluate(changed[i])),
+        ("score_state + scores", lambda i: risk_engine.scores(risk_engine.score_state(changed[i]))),
+        ("rescore + scores", lambda i: risk_engine.scores(risk_engine.rescore(states[i], changed[i], ("income",)))),
+    ):
+        start = time.perf_counter()
+        for i in range(len(contexts)):
+            fn(i)
+        print(f"{name:>22}: {(time.perf_counter() - start) / len(contexts) * 1e6:.2f} us")
+
+
+if __name__ == "__main__":
+    main()
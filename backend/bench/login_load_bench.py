@@ -0,0 +1,119 @@
+"""
+Login bursts mixed with ordinary questionnaire traffic, against a real
+uvicorn server.
+
+Run from backend/:
+
+    python -m bench.login_load_bench [--seconds 10] [--logins 32] [--readers 4]
+    python -m bench.login_load_bench --inline   # hash in the request thread (old behaviour)
+
+`--logins` threads hammer POST /auth/login while `--readers` threads poll
+GET /questionnaires/{id}. Reported: login status counts and throughput, and
+questionnaire latency percentiles, which is what a login burst used to hurt.
+Uses a throwaway SQLite database.
+"""
+import argparse
+import os
+import socket
+import tempfile
+import threading
+import time
+from collections import Counter
+from typing import Dict, List
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--logins", type=int, default=32, help="concurrent login clients")
+    parser.add_argument("--readers", type=int, default=4, help="concurrent questionnaire clients")
+    parser.add_argument("--inline", action="store_true", help="hash in the request thread, no admission limit")
+    args = parser.parse_args()
+
+    # Settings are read at import time, so set them before importing the app
+    tmpdir = tempfile.mkdtemp(prefix="login-load-bench-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{tmpdir}/bench.db"
+    os.environ["DB_MIGRATE_ON_STARTUP"] = "1"
+    os.environ.setdefault("LLM_CACHE_PATH", "")
+    if args.inline:
+        os.environ["PASSWORD_HASH_WORKERS"] = "0"
+        os.environ["PASSWORD_HASH_MAX_PENDING"] = "1000000"
+
+    import httpx
+    import uvicorn
+
+    from app.main import app
+    from app.password_pool import pool
+
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    base = f"http://127.0.0.1:{port}"
+
+    credentials = {"username": "bench@example.com", "password": "correct horse battery staple"}
+    with httpx.Client(base_url=base, timeout=60) as client:
+        client.post("/auth/register", json={"email": credentials["username"], "password": credentials["password"]})
+        token = client.post("/auth/login", data=credentials).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        qid = client.post("/questionnaires/", headers=headers).json()["id"]
+        client.put(f"/questionnaires/{qid}/answers", headers=headers, json={"answers": {"age": 40}})
+
+    deadline = time.perf_counter() + args.seconds
+    login_statuses: Counter = Counter()
+    read_latencies: List[float] = []
+    lock = threading.Lock()
+
+    def log_in() -> None:
+        with httpx.Client(base_url=base, timeout=60) as client:
+            while time.perf_counter() < deadline:
+                r = client.post("/auth/login", data=credentials)
+                with lock:
+                    login_statuses[r.status_code] += 1
+                if r.status_code == 429:
+                    time.sleep(float(r.headers.get("Retry-After", "1")))
+
+    def read() -> None:
+        with httpx.Client(base_url=base, timeout=60) as client:
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                client.get(f"/questionnaires/{qid}", headers=headers)
+                with lock:
+                    read_latencies.append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=log_in) for _ in range(args.logins)]
+    threads += [threading.Thread(target=read) for _ in range(args.readers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    server.should_exit = True
+    results: Dict[str, float] = {
+        "p50": _percentile(read_latencies, 50) * 1000,
+        "p95": _percentile(read_latencies, 95) * 1000,
+        "p99": _percentile(read_latencies, 99) * 1000,
+    }
+    print(f"mode:            {'inline' if args.inline else f'pool ({pool.workers} workers, {pool.max_pending} pending)'}")
+    print(f"logins:          {dict(sorted(login_statuses.items()))}, "
+          f"{login_statuses[200] / args.seconds:,.1f} ok/sec")
+    print(f"questionnaires:  {len(read_latencies) / args.seconds:,.1f} req/sec, "
+          f"p50 {results['p50']:.1f} ms, p95 {results['p95']:.1f} ms, p99 {results['p99']:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
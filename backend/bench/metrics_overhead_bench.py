@@ -0,0 +1,109 @@
+"""
+Per-request cost of the /metrics instrumentation.
+
+Run from backend/:
+
+    python -m bench.metrics_overhead_bench [--requests 200000]
+
+Times a do-nothing ASGI app with and without MetricsMiddleware around it,
+and SQLite statements with and without the DB timing listeners, then
+reports the difference per request / per statement. Exits non-zero when
+a typical request (the middleware plus --statements-per-request timed
+statements) pays more than --budget-us microseconds for it.
+"""
+import argparse
+import asyncio
+import sys
+import time
+from types import SimpleNamespace
+
+from sqlalchemy import create_engine, text
+
+from app import telemetry
+
+_ROUTE = SimpleNamespace(path="/bench/{item_id}")
+_START = {"type": "http.response.start", "status": 200, "headers": []}
+_BODY = {"type": "http.response.body", "body": b"{}"}
+
+
+async def _endpoint(scope, receive, send) -> None:
+    scope["route"] = _ROUTE  # as the router would
+    await send(_START)
+    await send(_BODY)
+
+
+async def _receive() -> dict:
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+
+async def _send(message) -> None:
+    pass
+
+
+async def _drive(app, requests: int) -> float:
+    start = time.perf_counter()
+    for _ in range(requests):
+        await app({"type": "http", "method": "GET", "path": "/bench/1"}, _receive, _send)
+    return time.perf_counter() - start
+
+
+def _statements(conn, count: int) -> float:
+    statement = text("SELECT 1")
+    start = time.perf_counter()
+    for _ in range(count):
+        conn.execute(statement)
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200_000)
+    parser.add_argument("--statements", type=int, default=20_000)
+    parser.add_argument("--statements-per-request", type=int, default=3, help="for the typical request")
+    parser.add_argument("--rounds", type=int, default=5, help="interleaved runs; the fastest counts")
+    parser.add_argument("--budget-us", type=float, default=50.0, help="allowed instrumentation cost per request")
+    args = parser.parse_args()
+
+    wrapped = telemetry.MetricsMiddleware(_endpoint)
+    asyncio.run(_drive(wrapped, 1000))  # warm up: creates the label children
+    bare = metered = float("inf")
+    for _ in range(args.rounds):
+        bare = min(bare, asyncio.run(_drive(_endpoint, args.requests)))
+        metered = min(metered, asyncio.run(_drive(wrapped, args.requests)))
+    per_request = (metered - bare) / args.requests * 1e6
+
+    timed = create_engine("sqlite://")
+    telemetry.install(timed)
+    token = telemetry._db.set([0, 0.0, 0.0])
+    untimed_s = timed_s = float("inf")
+    try:
+        with create_engine("sqlite://").connect() as plain_conn, timed.connect() as timed_conn:
+            for _ in range(args.rounds):
+                untimed_s = min(untimed_s, _statements(plain_conn, args.statements))
+                timed_s = min(timed_s, _statements(timed_conn, args.statements))
+    finally:
+        telemetry._db.reset(token)
+    per_statement = (timed_s - untimed_s) / args.statements * 1e6
+    typical = per_request + args.statements_per_request * per_statement
+
+    start = time.perf_counter()
+    body = telemetry.render()
+    render_ms = (time.perf_counter() - start) * 1000
+
+    print(f"requests:       {args.requests:,}")
+    print(f"bare app:       {bare / args.requests * 1e6:.2f} us/request")
+    print(f"with metrics:   {metered / args.requests * 1e6:.2f} us/request")
+    print(f"middleware:     {per_request:.2f} us/request")
+    print(f"DB listeners:   {per_statement:.2f} us/statement")
+    print(
+        f"typical:        {typical:.2f} us/request with {args.statements_per_request} statements "
+        f"(budget {args.budget_us:g})"
+    )
+    print(f"GET /metrics:   {render_ms:.2f} ms to render {len(body.splitlines())} lines")
+    if typical > args.budget_us:
+        print("instrumentation is over budget", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Microbenchmarks for the CPU work behind /complete, /score and the advice
+job: the risk engine (in full, and re-scoring one changed answer), prompt
+building and parsing the model's answer.
+
+Run from backend/:
+
+    python -m bench.micro_bench [--n 20000] [--rounds 5]
+    python -m bench.micro_bench --out after.json --compare before.json
+
+Each case runs over the same `--n` synthetic inputs `--rounds` times; the
+fastest round counts. Results are written as JSON (see bench/results.py)
+and optionally compared with an earlier run, exiting non-zero on a
+regression.
+"""
+import argparse
+import sys
+import time
+from typing import Any, Callable, Dict, List
+
+from app import ai_engine
+from app.services import risk_engine
+
+from . import fake_llm, results
+from .risk_engine_bench import synthetic_contexts
+
+
+def _best_round(fn: Callable[[Any], Any], inputs: List[Any], rounds: int) -> float:
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for item in inputs:
+            fn(item)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _parse_streamed(text: str) -> Dict[str, Any]:
+    parser = ai_engine.AdviceParser()
+    for i in range(0, len(text), fake_llm.CHUNK_CHARS):
+        parser.feed(text[i:i + fake_llm.CHUNK_CHARS])
+    parser.close()
+    return parser.result()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n", type=int, default=20_000, help="inputs per case")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--out", help="results file (default: bench-results/micro-<time>.json)")
+    parser.add_argument("--compare", help="earlier results file to compare with")
+    parser.add_argument("--threshold", type=float, default=0.2, help="relative change that counts as a regression")
+    args = parser.parse_args()
+
+    contexts = synthetic_contexts(args.n)
+    assessed = [(ctx, risk_engine.evaluate(ctx)) for ctx in contexts]
+    answers = [fake_llm.ADVICE] * args.n
+    # An autosave changed one answer since the state was scored
+    rescored = [(risk_engine.score_state(ctx), {**ctx, "income": 50_000}) for ctx in contexts]
+
+    cases: Dict[str, Any] = {
+        "risk_engine.evaluate": (risk_engine.evaluate, contexts),
+        "risk_engine.rescore (1 key)": (
+            lambda pair: risk_engine.scores(risk_engine.rescore(pair[0], pair[1], ("income",))), rescored
+        ),
+        "ai_engine._build_prompt": (lambda pair: ai_engine._build_prompt(*pair), assessed),
+        "ai_engine._parse_advice": (ai_engine._parse_advice, answers),
+        "AdviceParser (streamed)": (_parse_streamed, answers),
+    }
+
+    summary: results.Results = {}
+    print(f"{'':<28} {'ops/sec':>12} {'us/op':>9}")
+    for name, (fn, inputs) in cases.items():
+        fn(inputs[0])  # warm up caches (compiled rules, lru_cache)
+        elapsed = _best_round(fn, inputs, args.rounds)
+        summary[name] = {"ops_per_sec": len(inputs) / elapsed, "mean_us": elapsed / len(inputs) * 1e6}
+        print(f"{name:<28} {summary[name]['ops_per_sec']:>12,.0f} {summary[name]['mean_us']:>9.2f}")
+
+    settings = {"n": args.n, "rounds": args.rounds}
+    results.write(args.out or results.default_path("micro"), "micro", summary, settings)
+    if args.compare and results.compare(summary, args.compare, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
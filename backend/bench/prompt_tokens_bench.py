@@ -0,0 +1,110 @@
+"""
+Input tokens per advice request: the prompt builder as it was (static
+text rebuilt around str(assessment), every answer and recommendation
+detail included) vs. the current one (constant prefix, compact canonical
+JSON, token budget).
+
+Run from backend/:
+
+    python -m bench.prompt_tokens_bench [--n 5000] [--budget 600]
+    python -m bench.prompt_tokens_bench --out after.json --compare before.json
+
+Tokens are ai_engine.estimate_tokens() of the system and user messages,
+over `--n` synthetic profiles plus the frontend's "_partner" answer.
+"Cacheable" is the part of the request before anything user-specific,
+which the provider can serve from its prompt cache. Build time is the
+best of three passes. Results are written as JSON (see bench/results.py).
+"""
+import argparse
+import os
+import sys
+import time
+from typing import Any, Dict, List
+
+
+def legacy_prompt(context: Dict[str, Any], assessment: Dict[str, Any]) -> str:
+    # ai_engine._build_prompt before the prompt was made compact
+    lines: List[str] = []
+    lines.append(
+        "You are an insurance assistant helping a Canadian consumer "
+        "understand their insurance coverage situation. "
+        "Be clear, neutral and educational. "
+        "Do NOT give legal or tax advice, and do not recommend specific "
+        "company products. Focus on concepts and what they should discuss "
+        "with a licensed advisor."
+    )
+    lines.append("\nUser profile (raw answers):")
+    for k, v in context.items():
+        lines.append(f"- {k}: {v}")
+    lines.append("\nRule-based assessment (JSON):")
+    lines.append(str(assessment))
+    lines.append(
+        "\nBased on this, write:\n"
+        "1) A short 3–5 sentence overview of their situation.\n"
+        "2) 3–5 bullet points with concrete next steps or questions to ask "
+        "an insurance advisor.\n"
+        "Keep total length under 250 words."
+    )
+    return "\n".join(lines)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n", type=int, default=5000, help="profiles")
+    parser.add_argument("--budget", type=int, help="override AI_PROMPT_TOKEN_BUDGET")
+    parser.add_argument("--out", help="results file (default: bench-results/prompt-<time>.json)")
+    parser.add_argument("--compare", help="earlier results file to compare with")
+    parser.add_argument("--threshold", type=float, default=0.2, help="relative change that counts as a regression")
+    args = parser.parse_args()
+
+    # Settings are read at import time, so set them before importing the app
+    if args.budget is not None:
+        os.environ["AI_PROMPT_TOKEN_BUDGET"] = str(args.budget)
+
+    from app import ai_engine
+    from app.services import risk_engine
+
+    from . import results
+    from .risk_engine_bench import synthetic_contexts
+
+    contexts = [{**ctx, "_partner": "bench"} for ctx in synthetic_contexts(args.n)]
+    pairs = [(ctx, risk_engine.evaluate(ctx)) for ctx in contexts]
+    system = ai_engine.estimate_tokens(ai_engine.SYSTEM_PROMPT)
+
+    builders = {
+        "legacy": (legacy_prompt, 0),
+        "current": (ai_engine._build_prompt, ai_engine.estimate_tokens(ai_engine.PROMPT_PREFIX)),
+    }
+    summary: results.Results = {}
+    print(f"{args.n} profiles, budget {ai_engine.AI_PROMPT_TOKEN_BUDGET} tokens")
+    print(f"{'':<8} {'mean':>7} {'p95':>7} {'max':>7} {'cacheable':>10} {'us/build':>9}")
+    for name, (build, prefix) in builders.items():
+        elapsed = float("inf")
+        for _ in range(3):
+            start = time.perf_counter()
+            prompts = [build(ctx, assessment) for ctx, assessment in pairs]
+            elapsed = min(elapsed, time.perf_counter() - start)
+        tokens = sorted(system + ai_engine.estimate_tokens(prompt) for prompt in prompts)
+        summary[name] = {
+            "mean_tokens": sum(tokens) / len(tokens),
+            "p95_tokens": results.percentile(tokens, 95),
+            "max_tokens": tokens[-1],
+            "cacheable_tokens": system + prefix,
+            "build_us": elapsed / len(pairs) * 1e6,
+        }
+        row = summary[name]
+        print(f"{name:<8} {row['mean_tokens']:>7.0f} {row['p95_tokens']:>7.0f} {row['max_tokens']:>7.0f} "
+              f"{row['cacheable_tokens']:>10.0f} {row['build_us']:>9.2f}")
+
+    saved = 1 - summary["current"]["mean_tokens"] / summary["legacy"]["mean_tokens"]
+    print(f"input tokens per request: {saved:.0%} fewer, "
+          f"{summary['current']['mean_tokens'] - summary['current']['cacheable_tokens']:.0f} of them user-specific")
+
+    settings = {"n": args.n, "budget": ai_engine.AI_PROMPT_TOKEN_BUDGET}
+    results.write(args.out or results.default_path("prompt"), "prompt", summary, settings)
+    if args.compare and results.compare(summary, args.compare, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
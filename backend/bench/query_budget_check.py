@@ -0,0 +1,98 @@
+"""
+Run every endpoint once with a cold principal cache and compare the SQL
+statements it ran (X-Query-Count) with its declared @query_budget.
+
+Run from backend/:
+
+    python -m bench.query_budget_check
+
+Exits non-zero when any endpoint goes over its budget or has none
+declared, so it can gate CI. Uses a throwaway SQLite database; the app
+runs in-process with DEBUG=1.
+"""
+import os
+import sys
+import tempfile
+
+_tmpdir = tempfile.mkdtemp(prefix="query-budget-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_tmpdir}/bench.db"
+os.environ["DB_MIGRATE_ON_STARTUP"] = "1"
+os.environ["DEBUG"] = "1"
+os.environ.setdefault("LLM_CACHE_PATH", "")
+os.environ.setdefault("PASSWORD_HASH_WORKERS", "0")
+os.environ["ANALYTICS_EMAILS"] = "budget@example.com"
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app import auth_cache  # noqa: E402
+from app.main import app  # noqa: E402
+
+
+def main() -> None:
+    failures = 0
+
+    with TestClient(app) as client:
+
+        def call(method: str, url: str, **kwargs):
+            nonlocal failures
+            auth_cache.principals.clear()
+            response = client.request(method, url, **kwargs)
+            count = int(response.headers["x-query-count"])
+            budget = response.headers.get("x-query-budget")
+            over = budget is None or count > int(budget)
+            failures += over
+            print(
+                f"{'FAIL' if over else 'ok':>4}  {method:<5} {url:<52} "
+                f"{response.status_code}  {count} statements (budget {budget or 'none'})"
+            )
+            return response
+
+        credentials = {"username": "budget@example.com", "password": "budget"}
+        call("POST", "/auth/register", json={"email": credentials["username"], "password": "budget"})
+        token = call("POST", "/auth/login", data=credentials).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+
+        qid = call("POST", "/questionnaires/", headers=headers).json()["id"]
+        answers = {"age": 40, "income": 90_000, "dependants": 2, "has_vehicle": True, "province": "ON"}
+        call("PUT", f"/questionnaires/{qid}/answers", headers=headers, json={"answers": answers})
+        saved = call("PUT", f"/questionnaires/{qid}/answers", headers=headers, json={"answers": answers})
+        patch_headers = {**headers, "If-Match": saved.headers["etag"]}
+        call("PATCH", f"/questionnaires/{qid}/answers", headers=patch_headers, json={"answers": {"age": 41}})
+        # Same base version again: a conflict
+        call("PATCH", f"/questionnaires/{qid}/answers", headers=patch_headers, json={"answers": {"age": 42}})
+        call("GET", f"/questionnaires/{qid}", headers=headers)
+        call("GET", f"/questionnaires/{qid}/score", headers=headers)
+        call("PATCH", f"/questionnaires/{qid}/answers", headers={**headers, "If-Match": saved.headers["etag"]},
+             json={"answers": {"income": 120_000}})
+        # Scored again from the one changed answer
+        call("GET", f"/questionnaires/{qid}/score", headers=headers)
+        call("GET", "/questionnaires/", headers=headers)
+        call("POST", f"/questionnaires/{qid}/complete", headers=headers)
+        call("POST", f"/questionnaires/{qid}/complete", headers=headers)
+        keyed = {**headers, "Idempotency-Key": "budget-check"}
+        call("POST", f"/questionnaires/{qid}/complete", headers=keyed)
+        # Replayed
+        call("POST", f"/questionnaires/{qid}/complete", headers=keyed)
+        call("GET", f"/reports/{qid}", headers=headers)
+        call("GET", f"/reports/{qid}/advice", headers=headers)
+        call("GET", f"/reports/{qid}/advice/stream", headers=headers)
+        # Answers changed after completion: stored reports (and rollup counts) dropped
+        call("PUT", f"/questionnaires/{qid}/answers", headers=headers, json={"answers": {"age": 43}})
+        # Re-scored, with an Idempotency-Key
+        call("POST", f"/questionnaires/{qid}/complete", headers={**headers, "Idempotency-Key": "budget-check-2"})
+
+        profiles = "".join(f'{{"answers": {{"age": {age}, "province": "BC"}}}}\n' for age in range(30, 40))
+        ndjson = {**headers, "Content-Type": "application/x-ndjson"}
+        call("POST", "/bulk/questionnaires", headers=ndjson, content=profiles)
+        call("POST", "/bulk/questionnaires?score=true", headers=ndjson, content=profiles)
+        call("GET", "/bulk/questionnaires", headers=headers)
+        call("GET", "/bulk/assessments", headers=headers)
+        call("GET", "/analytics/coverage", headers=headers)
+
+    if failures:
+        print(f"{failures} endpoint call(s) over budget", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
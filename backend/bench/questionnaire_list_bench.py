@@ -0,0 +1,122 @@
+"""
+GET /questionnaires page fetches at increasing depth into one user's list,
+keyset cursor vs. the equivalent LIMIT/OFFSET query.
+
+Run from backend/:
+
+    python -m bench.questionnaire_list_bench [--rows 10000000] [--db /tmp/list-bench.db]
+
+`--rows` questionnaires are spread over many users, with one user (the one
+the benchmark logs in as) owning a tenth of them. Building 10M rows takes a
+few minutes and a couple of GB; pass `--db` to keep the file and reuse it
+on later runs. The app runs in-process.
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Iterator, Tuple
+
+STATUSES = ("in_progress", "completed")
+OTHER_USERS = 10_000
+
+
+def _rows(user_id: str, count: int, start: datetime) -> Iterator[Tuple[str, str, str, str, str]]:
+    # Inserted in index order, so building the table is mostly appends
+    for i in range(count):
+        ts = (start + timedelta(seconds=i)).isoformat(sep=" ")
+        yield str(uuid.UUID(int=uuid.uuid4().int)), user_id, STATUSES[i % 7 == 0], ts, ts
+
+
+def _populate(path: str, user_id: str, total: int) -> None:
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode = OFF")
+    conn.execute("PRAGMA synchronous = OFF")
+    conn.execute("PRAGMA cache_size = -512000")
+    insert = "INSERT INTO questionnaires (id, user_id, status, created_at, updated_at) VALUES (?, ?, ?, ?, ?)"
+    start = datetime(2024, 1, 1)
+    mine = total // 10
+    conn.executemany(insert, _rows(user_id, mine, start))
+    per_user, extra = divmod(total - mine, OTHER_USERS)
+    for n in range(OTHER_USERS):
+        conn.executemany(insert, _rows(f"user-{n:05d}", per_user + (n < extra), start))
+        if n % 1000 == 999:
+            print(f"  {mine + (n + 1) * per_user:,} rows", file=sys.stderr)
+    conn.commit()
+    conn.execute("ANALYZE")
+    conn.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--db", help="database file to build, or reuse if it exists")
+    parser.add_argument("--repeat", type=int, default=20, help="fetches per depth")
+    args = parser.parse_args()
+
+    path = args.db or os.path.join(tempfile.mkdtemp(prefix="list-bench-"), "bench.db")
+    fresh = not os.path.exists(path)
+    os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+    os.environ["DB_MIGRATE_ON_STARTUP"] = "1"
+    os.environ.setdefault("LLM_CACHE_PATH", "")
+    os.environ.setdefault("PASSWORD_HASH_WORKERS", "0")
+
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+    from app.routers.questionnaire import encode_cursor
+
+    with TestClient(app) as client:
+        credentials = {"username": "list-bench@example.com", "password": "bench"}
+        client.post("/auth/register", json={"email": credentials["username"], "password": "bench"})
+        token = client.post("/auth/login", data=credentials).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+
+        conn = sqlite3.connect(path)
+        user_id = conn.execute("SELECT id FROM users WHERE email = ?", (credentials["username"],)).fetchone()[0]
+        if fresh:
+            print(f"Building {args.rows:,} questionnaires in {path} ...", file=sys.stderr)
+            _populate(path, user_id, args.rows)
+        mine = conn.execute("SELECT COUNT(*) FROM questionnaires WHERE user_id = ?", (user_id,)).fetchone()[0]
+        total = conn.execute("SELECT MAX(rowid) FROM questionnaires").fetchone()[0]
+        print(f"questionnaires: {total:,} total, {mine:,} for the benchmark user")
+
+        page = 20
+        offset_sql = (
+            "SELECT id, status, created_at, updated_at FROM questionnaires WHERE user_id = ? "
+            "ORDER BY updated_at DESC, id DESC LIMIT ? OFFSET ?"
+        )
+        print(f"{'depth':>12}  {'keyset (API)':>14}  {'OFFSET (SQL only)':>18}")
+        depths = [0, 1_000, 10_000, 100_000, mine - page]
+        for depth in sorted({d for d in depths if 0 <= d <= mine - page}):
+            url = "/questionnaires/?limit=20"
+            if depth:
+                # The cursor a client holds after reading `depth` rows (found untimed)
+                last_id, last_updated = conn.execute(
+                    "SELECT id, updated_at FROM questionnaires WHERE user_id = ? "
+                    "ORDER BY updated_at DESC, id DESC LIMIT 1 OFFSET ?",
+                    (user_id, depth - 1),
+                ).fetchone()
+                url += "&cursor=" + encode_cursor(datetime.fromisoformat(last_updated), last_id)
+
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                response = client.get(url, headers=headers)
+                assert response.status_code == 200 and len(response.json()["items"]) == page, response.text
+            keyset = (time.perf_counter() - start) / args.repeat
+
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                conn.execute(offset_sql, (user_id, page, depth)).fetchall()
+            offset = (time.perf_counter() - start) / args.repeat
+
+            print(f"{depth:>12,}  {keyset * 1000:>11.2f} ms  {offset * 1000:>15.2f} ms")
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+JSON results for the benchmark suite (journey_bench, micro_bench,
+prompt_tokens_bench), so two runs can be compared:
+
+    python -m bench.journey_bench --out before.json
+    ... change something ...
+    python -m bench.journey_bench --out after.json --compare before.json
+
+A result file is {"suite", "environment", "results": {name: {metric: value}}}.
+Metrics ending in "_ms", "_us" or "_tokens" are lower-is-better, "rps" and
+"ops_per_sec" higher-is-better; compare() flags any that got worse by more
+than the threshold.
+"""
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+Results = Dict[str, Dict[str, float]]
+
+HIGHER_IS_BETTER = ("rps", "ops_per_sec")
+LOWER_IS_BETTER = ("_ms", "_us", "_tokens")  # suffixes
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def latency_summary(latencies: List[float], elapsed: float) -> Dict[str, float]:
+    """
+    Request count, throughput over `elapsed` seconds and latency
+    percentiles in milliseconds.
+    """
+    return {
+        "count": len(latencies),
+        "rps": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return out.stdout.strip() or None
+
+
+def environment() -> Dict[str, Any]:
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def default_path(suite: str) -> str:
+    return os.path.join("bench-results", f"{suite}-{time.strftime('%Y%m%d-%H%M%S')}.json")
+
+
+def write(path: str, suite: str, results: Results, settings: Dict[str, Any]) -> None:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    document = {"suite": suite, "environment": environment(), "settings": settings, "results": results}
+    with open(path, "w") as f:
+        json.dump(document, f, indent=2, sort_keys=True)
+        f.write("\n")
+    print(f"results written to {path}")
+
+
+def _worse_by(metric: str, current: float, baseline: float) -> Optional[float]:
+    """
+    Relative regression of `current` against `baseline` (0.1 = 10% worse),
+    or None for metrics without a direction.
+    """
+    if not baseline:
+        return None
+    if metric in HIGHER_IS_BETTER:
+        return (baseline - current) / baseline
+    if metric.endswith(LOWER_IS_BETTER):
+        return (current - baseline) / baseline
+    return None
+
+
+def compare(current: Results, baseline_path: str, threshold: float) -> int:
+    """
+    Print every directional metric next to the baseline run's value and
+    return how many regressed by more than `threshold`.
+    """
+    with open(baseline_path) as f:
+        baseline: Results = json.load(f)["results"]
+
+    regressions = 0
+    print(f"\nagainst {baseline_path} (regression threshold {threshold:.0%}):")
+    for name, metrics in current.items():
+        for metric, value in metrics.items():
+            before = baseline.get(name, {}).get(metric)
+            if before is None:
+                continue
+            worse = _worse_by(metric, value, before)
+            if worse is None:
+                continue
+            flag = "REGRESSION" if worse > threshold else ""
+            regressions += worse > threshold
+            print(f"  {name:<36} {metric:<8} {before:>12.2f} -> {value:>12.2f}  {-worse:+7.1%}  {flag}")
+    if regressions:
+        print(f"{regressions} metric(s) regressed", file=sys.stderr)
+    return regressions
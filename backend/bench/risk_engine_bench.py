@@ -0,0 +1,96 @@
+"""
+Throughput of risk_engine.evaluate against the original hand-written
+version.
+
+Run from backend/:
+
+    python -m bench.risk_engine_bench [--n 1000000] [--min-relative 1.0]
+
+Every synthetic context is also diffed (as serialized JSON) against the
+reference implementation so a speedup can never come from a behaviour change.
+Exits non-zero on a mismatch, or when evaluate is slower than the
+reference times --min-relative.
+"""
+import argparse
+import gc
+import json
+import random
+import sys
+import time
+from typing import Any, Dict, List
+
+from app.services import risk_engine
+
+from . import legacy_risk_engine
+
+PROVINCES = ["ON", "BC", "AB", "QC", "NS", "MB", None]
+
+
+def synthetic_contexts(n: int, seed: int = 1234) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    contexts: List[Dict[str, Any]] = []
+    for _ in range(n):
+        ctx: Dict[str, Any] = {
+            "age": rng.choice([rng.randint(18, 80), str(rng.randint(18, 80)), None]),
+            "income": rng.choice([rng.randint(0, 250) * 1000, rng.uniform(0, 250_000), "", None]),
+            "dependants": rng.choice([0, 0, 1, 2, 3, "2", None]),
+            "has_vehicle": rng.random() < 0.7,
+            "liability_limit": rng.choice([0, 1_000_000, 2_000_000, None]),
+            "owns_home": rng.random() < 0.5,
+            "rents": rng.random() < 0.4,
+            "has_mortgage": rng.random() < 0.4,
+            "travels_outside_canada": rng.random() < 0.5,
+            "has_existing_life": rng.random() < 0.3,
+        }
+        province = rng.choice(PROVINCES)
+        if province is not None:
+            ctx["province"] = province
+        # Sparse answers, like a partially filled form
+        for key in rng.sample(list(ctx), rng.randint(0, 3)):
+            ctx.pop(key, None)
+        contexts.append(ctx)
+    return contexts
+
+
+def _throughput(fn, contexts: List[Dict[str, Any]]) -> float:
+    start = time.perf_counter()
+    for ctx in contexts:
+        fn(ctx)
+    return len(contexts) / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--n", type=int, default=1_000_000)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--min-relative", type=float, default=1.0, help="slowest acceptable speed relative to legacy")
+    args = parser.parse_args()
+
+    contexts = synthetic_contexts(args.n)
+
+    for ctx in contexts:
+        expected = json.dumps(legacy_risk_engine.evaluate(ctx), ensure_ascii=False)
+        actual = json.dumps(risk_engine.evaluate(ctx), ensure_ascii=False)
+        if expected != actual:
+            raise SystemExit(f"Output mismatch for {ctx!r}")
+
+    # Keep the synthetic data out of the collector's way, and interleave
+    # rounds so both sides see the same machine noise; best round wins.
+    gc.collect()
+    gc.freeze()
+    legacy = current = 0.0
+    for _ in range(args.rounds):
+        legacy = max(legacy, _throughput(legacy_risk_engine.evaluate, contexts))
+        current = max(current, _throughput(risk_engine.evaluate, contexts))
+
+    print(f"contexts:  {args.n:,}")
+    print(f"legacy:    {legacy:,.0f} evals/sec")
+    print(f"evaluate:  {current:,.0f} evals/sec")
+    print(f"relative:  {current / legacy:.2f}x")
+    if current / legacy < args.min_relative:
+        print(f"evaluate is slower than {args.min_relative:.2f}x the legacy engine", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
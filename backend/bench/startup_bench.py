@@ -0,0 +1,177 @@
+"""
+Cold start: how long `import app.main` takes, where that time goes, and
+how long a fresh uvicorn process takes to answer its first GET /health.
+
+Run from backend/:
+
+    python -m bench.startup_bench [--runs 5] [--budget-ms 1500]
+    python -m bench.startup_bench --out after.json --compare before.json
+
+Every run is a new interpreter. The import is profiled with
+`python -X importtime` and summarised by top-level package (self time,
+so nothing is counted twice). Time to first /health is from starting
+`uvicorn app.main:app` to the first 200, once against a new database
+(the schema is created on startup, DB_MIGRATE_ON_STARTUP=1) and then
+against the existing one, as after a scale-to-zero restart.
+
+Exits non-zero when the best import time is over --budget-ms, when
+importing the app loads any of the dependencies that are meant to be
+loaded on first use (LAZY), or, with --compare, on a regression.
+"""
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from typing import Dict, List, Set, Tuple
+
+from . import results
+
+# Only imported by the code paths that need them (llm_client, security,
+# deps, services/bulk columnar formats, which bring in numpy)
+LAZY = ("openai", "httpx", "passlib", "bcrypt", "jose.jwt", "cryptography", "numpy", "pyarrow")
+
+
+def _importtime(env: Dict[str, str]) -> Tuple[float, Dict[str, float], Set[str]]:
+    """
+    Import app.main in a new interpreter: (cumulative ms, self ms by
+    top-level package, every module imported).
+    """
+    out = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        env=env, capture_output=True, text=True, check=True,
+    )
+    total = 0.0
+    packages: Dict[str, float] = {}
+    modules: Set[str] = set()
+    for line in out.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        own, cumulative, name = line[len("import time:"):].split("|")
+        name = name.strip()
+        modules.add(name)
+        top = name.split(".")[0]
+        packages[top] = packages.get(top, 0.0) + int(own) / 1000
+        if name == "app.main":
+            total = int(cumulative) / 1000
+    return total, packages, modules
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _first_health(env: Dict[str, str]) -> float:
+    """
+    Milliseconds from starting uvicorn to its first 200 from /health.
+    """
+    port = _free_port()
+    url = f"http://127.0.0.1:{port}/health"
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning"],
+        env=env,
+    )
+    try:
+        deadline = start + 60
+        while True:
+            try:
+                with urllib.request.urlopen(url, timeout=1) as response:
+                    if response.status == 200:
+                        return (time.perf_counter() - start) * 1000
+            except (urllib.error.URLError, ConnectionError):
+                pass
+            if time.perf_counter() > deadline or server.poll() is not None:
+                raise RuntimeError("uvicorn did not answer /health")
+            time.sleep(0.005)
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def _timings(values: List[float]) -> Dict[str, float]:
+    return {"min_ms": min(values), "median_ms": statistics.median(values)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="new interpreters per measurement")
+    parser.add_argument("--budget-ms", type=float, default=1500.0, help="limit for the best import app.main time")
+    parser.add_argument("--top", type=int, default=12, help="packages to list in the import profile")
+    parser.add_argument("--out", help="results file (default: bench-results/startup-<time>.json)")
+    parser.add_argument("--compare", help="earlier results file to compare with")
+    parser.add_argument("--threshold", type=float, default=0.2, help="relative change that counts as a regression")
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp(prefix="startup-bench-")
+    env = {
+        **os.environ,
+        "DATABASE_URL": f"sqlite:///{tmpdir}/bench.db",
+        "DB_MIGRATE_ON_STARTUP": "1",
+        "LLM_CACHE_PATH": "",
+        "PASSWORD_HASH_WORKERS": "0",
+    }
+
+    interpreter: List[float] = []
+    imports: List[float] = []
+    profiles: List[Dict[str, float]] = []
+    loaded: Set[str] = set()
+    for _ in range(args.runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", "pass"], env=env, check=True)
+        interpreter.append((time.perf_counter() - start) * 1000)
+        total, packages, modules = _importtime(env)
+        imports.append(total)
+        profiles.append(packages)
+        loaded |= modules
+
+    new_database = _first_health(env)
+    restarts = [_first_health(env) for _ in range(args.runs)]
+
+    summary: results.Results = {
+        "python -c pass": _timings(interpreter),
+        "import app.main": _timings(imports),
+        "first /health, new database": {"elapsed_ms": new_database},
+        "first /health, existing database": _timings(restarts),
+    }
+
+    # Profile of the fastest run
+    fastest = profiles[imports.index(min(imports))]
+    print(f"import app.main by package (self time, fastest of {args.runs} runs):")
+    for package, ms in sorted(fastest.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"  {package:<24} {ms:8.1f} ms")
+    print()
+    for name, metrics in summary.items():
+        if "min_ms" in metrics:
+            print(f"{name:<36} min {metrics['min_ms']:8.1f} ms  median {metrics['median_ms']:8.1f} ms")
+        else:
+            print(f"{name:<36}     {metrics['elapsed_ms']:8.1f} ms")
+
+    settings = {key: value for key, value in vars(args).items() if key not in ("out", "compare")}
+    results.write(args.out or results.default_path("startup"), "startup", summary, settings)
+
+    failed = False
+    eager = sorted(name for name in LAZY if name in loaded)
+    if eager:
+        print(f"import app.main loaded {', '.join(eager)}; these should load on first use", file=sys.stderr)
+        failed = True
+    if min(imports) > args.budget_ms:
+        print(f"import app.main took {min(imports):.0f} ms, over the {args.budget_ms:.0f} ms budget", file=sys.stderr)
+        failed = True
+    if args.compare and results.compare(summary, args.compare, args.threshold):
+        failed = True
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""
+Requests/sec with 1, 2, ... uvicorn worker processes serving one database
+and one shared cache file (SHARED_CACHE_PATH).
+
+Run from backend/:
+
+    python -m bench.workers_bench [--workers 1,2,4] [--users 50] [--duration 10]
+    python -m bench.workers_bench --out after.json --compare before.json
+
+The schema is created once with `python -m app.migrations` and the
+workers start with DB_MIGRATE_ON_STARTUP=0, like a multi-worker
+deployment. `--users` users each get a completed questionnaire; then
+`--clients` load-generating processes (kept apart from the servers so the
+client isn't what's measured) repeat the read side of the journey for
+`--duration` seconds: GET the questionnaire, its live score and its
+report, and a retried POST /complete that is replayed from its
+Idempotency-Key. Reported per worker count: requests/sec, p50/p95
+latency and scaling efficiency, rps(N) / (N * rps(1)).
+
+Workers can't scale past the CPUs they get: on a machine with fewer
+cores than workers plus clients the efficiency drops for that reason
+alone.
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Tuple
+
+from . import results
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _start(workers: int, env: Dict[str, str]) -> Tuple[subprocess.Popen, str]:
+    import httpx
+
+    port = _free_port()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning"],
+        env=env,
+    )
+    base = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 60
+    while True:
+        try:
+            httpx.get(base + "/", timeout=1)
+            return server, base
+        except httpx.HTTPError:
+            if time.time() > deadline or server.poll() is not None:
+                server.kill()
+                raise RuntimeError(f"{workers} worker(s) did not start")
+            time.sleep(0.2)
+
+
+def _seed(base: str, users: int) -> List[Tuple[str, str]]:
+    import httpx
+
+    seeded = []
+    with httpx.Client(base_url=base, timeout=60) as client:
+        for n in range(users):
+            email, password = f"workers-{n}@example.com", "correct horse battery staple"
+            client.post("/auth/register", json={"email": email, "password": password})
+            token = client.post("/auth/login", data={"username": email, "password": password}).json()["access_token"]
+            headers = {"Authorization": f"Bearer {token}"}
+            qid = client.post("/questionnaires/", headers=headers).json()["id"]
+            answers = {"age": 30 + n % 40, "income": 40_000 + 1000 * n, "dependants": n % 3, "province": "ON",
+                       "has_vehicle": n % 2 == 0, "owns_home": n % 3 == 0, "travels_outside_canada": True}
+            client.put(f"/questionnaires/{qid}/answers", headers=headers, json={"answers": answers})
+            client.post(f"/questionnaires/{qid}/complete", headers={**headers, "Idempotency-Key": f"seed-{qid}"})
+            seeded.append((token, qid))
+    return seeded
+
+
+async def _load(base: str, seeded: List[Tuple[str, str]], concurrency: int, duration: float, seed: int) -> Dict[str, Any]:
+    import httpx
+
+    rng = random.Random(seed)
+    latencies: List[float] = []
+    errors = 0
+    stop = time.perf_counter() + duration
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base, timeout=30, limits=limits) as client:
+        async def user() -> None:
+            nonlocal errors
+            while time.perf_counter() < stop:
+                token, qid = rng.choice(seeded)
+                headers = {"Authorization": f"Bearer {token}"}
+                for method, url, extra in (
+                    ("GET", f"/questionnaires/{qid}", {}),
+                    ("GET", f"/questionnaires/{qid}/score", {}),
+                    ("GET", f"/reports/{qid}", {}),
+                    ("POST", f"/questionnaires/{qid}/complete", {"Idempotency-Key": f"seed-{qid}"}),
+                ):
+                    start = time.perf_counter()
+                    response = await client.request(method, url, headers={**headers, **extra})
+                    latencies.append(time.perf_counter() - start)
+                    errors += response.status_code >= 300
+
+        start = time.perf_counter()
+        await asyncio.gather(*(user() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    return {"latencies": latencies, "errors": errors, "elapsed": elapsed}
+
+
+def _client(args: Tuple[str, List[Tuple[str, str]], int, float, int]) -> Dict[str, Any]:
+    return asyncio.run(_load(*args))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", default="1,2,4", help="comma-separated worker counts")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds of load per worker count")
+    parser.add_argument("--clients", type=int, default=2, help="load-generating processes")
+    parser.add_argument("--concurrency", type=int, default=16, help="requests in flight per client")
+    parser.add_argument("--out", help="results file (default: bench-results/workers-<time>.json)")
+    parser.add_argument("--compare", help="earlier results file to compare with")
+    parser.add_argument("--threshold", type=float, default=0.2, help="relative change that counts as a regression")
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp(prefix="workers-bench-")
+    env = {
+        **os.environ,
+        "DATABASE_URL": f"sqlite:///{tmpdir}/bench.db",
+        "SHARED_CACHE_PATH": f"{tmpdir}/shared-cache.db",
+        "LLM_CACHE_PATH": f"{tmpdir}/llm-cache.db",
+        "DB_MIGRATE_ON_STARTUP": "0",
+        "BCRYPT_ROUNDS": "4",
+        "PASSWORD_HASH_WORKERS": "0",
+        "OPENAI_API_KEY": "",
+    }
+    subprocess.run([sys.executable, "-m", "app.migrations"], env=env, check=True)
+
+    server, base = _start(1, env)
+    try:
+        seeded = _seed(base, args.users)
+    finally:
+        server.terminate()
+        server.wait()
+
+    summary: results.Results = {}
+    print(f"{args.users} users, {args.clients} client processes x {args.concurrency} in flight, "
+          f"{args.duration:.0f}s per run, {os.cpu_count()} CPUs")
+    print(f"{'workers':>7} {'requests':>9} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'errors':>6} {'efficiency':>10}")
+    baseline = None
+    for workers in [int(n) for n in args.workers.split(",")]:
+        server, base = _start(workers, env)
+        try:
+            with multiprocessing.get_context("spawn").Pool(args.clients) as pool:
+                runs = pool.map(
+                    _client,
+                    [(base, seeded, args.concurrency, args.duration, n) for n in range(args.clients)],
+                )
+        finally:
+            server.terminate()
+            server.wait()
+
+        latencies = [latency for run in runs for latency in run["latencies"]]
+        elapsed = max(run["elapsed"] for run in runs)
+        row = {**results.latency_summary(latencies, elapsed), "errors": sum(run["errors"] for run in runs)}
+        baseline = baseline or row["rps"] / workers
+        row["efficiency"] = row["rps"] / (workers * baseline)
+        summary[f"{workers} workers"] = row
+        print(f"{workers:>7} {row['count']:>9} {row['rps']:>8.1f} {row['p50_ms']:>8.1f} {row['p95_ms']:>8.1f} "
+              f"{row['errors']:>6} {row['efficiency']:>10.0%}")
+
+    settings = {key: value for key, value in vars(args).items() if key not in ("out", "compare")}
+    results.write(args.out or results.default_path("workers"), "workers", summary, settings)
+    if args.compare and results.compare(summary, args.compare, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Shared fixtures. Run from backend/:
+
+    python -m pytest
+
+Settings are read when app.config is imported, so the environment is set
+here, before any test imports the app: a throwaway SQLite database
+(created on startup), the LLM cache in memory only, password hashing in
+a thread with cheap bcrypt rounds, DEBUG on so responses carry their SQL
+statement count, and the monitoring endpoints on, behind a token. The
+upstream model is bench/fake_llm.py, started once.
+"""
+import os
+import socket
+import tempfile
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, Iterator
+
+import pytest
+
+_tmpdir = tempfile.mkdtemp(prefix="tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_tmpdir}/test.db"
+os.environ["DB_MIGRATE_ON_STARTUP"] = "1"
+os.environ["LLM_CACHE_PATH"] = ""
+os.environ["PASSWORD_HASH_WORKERS"] = "0"
+os.environ["BCRYPT_ROUNDS"] = "4"
+os.environ["DEBUG"] = "1"
+os.environ["METRICS_ENABLED"] = "1"
+os.environ["METRICS_TOKEN"] = "metrics-token"
+os.environ["ANALYTICS_EMAILS"] = "analytics@example.com"
+os.environ.pop("OPENAI_API_KEY", None)
+
+# Upstream latency of the fake model, seconds
+LLM_LATENCY = 0.3
+
+
+@pytest.fixture(scope="session")
+def fake_llm_url() -> str:
+    from bench import fake_llm
+
+    url = fake_llm.start(latency=LLM_LATENCY)
+    os.environ["OPENAI_BASE_URL"] = url
+    return url
+
+
+@pytest.fixture
+def llm(fake_llm_url: str, monkeypatch: pytest.MonkeyPatch) -> Any:
+    """
+    The fake model module (fake_llm.calls counts upstream calls), with
+    OPENAI_API_KEY set and the advice cache empty.
+    """
+    from app.ai_engine import advice_cache
+    from bench import fake_llm
+
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    advice_cache.clear()
+    return fake_llm
+
+
+@pytest.fixture(scope="session")
+def server() -> Iterator[str]:
+    """
+    The app served by uvicorn in a thread, like a deployment (background
+    tasks run after the response is sent); returns its base URL.
+    """
+    import uvicorn
+
+    from app.main import app
+
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    yield f"http://127.0.0.1:{port}"
+    server.should_exit = True
+    thread.join()
+
+
+def _cold_principal_cache(request: Any) -> None:
+    # Budgets are counted with a cold principal cache (see query_counter.py)
+    from app import auth_cache
+
+    auth_cache.principals.clear()
+
+
+def _within_query_budget(response: Any) -> None:
+    budget = response.headers.get("x-query-budget")
+    if budget is not None:
+        count = int(response.headers["x-query-count"])
+        request = response.request
+        assert count <= int(budget), f"{request.method} {request.url.path} ran {count} SQL statements (budget {budget})"
+
+
+@pytest.fixture(scope="session")
+def client(server: str) -> Iterator[Any]:
+    """
+    An HTTP client for the app. Every response from an endpoint with a
+    @query_budget is checked against it, so any test that calls one
+    fails when it runs more SQL statements than declared.
+    """
+    import httpx
+
+    hooks = {"request": [_cold_principal_cache], "response": [_within_query_budget]}
+    with httpx.Client(base_url=server, timeout=30, event_hooks=hooks) as client:
+        yield client
+
+
+@pytest.fixture
+def register(client: Any) -> Callable[[], Dict[str, str]]:
+    """
+    Registers and logs in a new user per call; returns their auth headers.
+    """
+    def register() -> Dict[str, str]:
+        email, password = f"{uuid.uuid4().hex}@example.com", "correct horse battery staple"
+        client.post("/auth/register", json={"email": email, "password": password})
+        response = client.post("/auth/login", data={"username": email, "password": password})
+        return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    return register
@@ -0,0 +1,105 @@
+"""
+POST /complete answers without waiting for the model; the advice is
+generated in the background and shows up on GET /reports/{id}/advice.
+"""
+import asyncio
+import time
+from typing import Any, Callable, Dict, List
+
+import httpx
+import pytest
+
+from .conftest import LLM_LATENCY
+
+ANSWERS = {"age": 35, "income": 70_000, "dependants": 1, "province": "BC", "rents": True}
+
+
+def _questionnaire(client: Any, headers: Dict[str, str], answers: Dict[str, Any]) -> str:
+    qid = client.post("/questionnaires/", headers=headers).json()["id"]
+    client.put(f"/questionnaires/{qid}/answers", headers=headers, json={"answers": answers})
+    return qid
+
+
+def _wait_for_advice(client: Any, headers: Dict[str, str], qid: str, timeout: float = 10) -> Dict[str, Any]:
+    deadline = time.monotonic() + timeout
+    while True:
+        body = client.get(f"/reports/{qid}/advice", headers=headers).json()
+        if body["ai_status"] != "pending" or time.monotonic() > deadline:
+            return body
+        time.sleep(0.02)
+
+
+def test_complete_does_not_wait_for_the_model(client: Any, register: Callable, llm: Any) -> None:
+    headers = register()
+    qid = _questionnaire(client, headers, ANSWERS)
+    calls = llm.calls
+
+    start = time.monotonic()
+    response = client.post(f"/questionnaires/{qid}/complete", headers=headers)
+    elapsed = time.monotonic() - start
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["status"] == "completed"
+    assert body["assessment"]["overall_risk_score"] > 0
+    assert body["ai_status"] == "pending"
+    assert body["ai_advice"] is None
+    assert elapsed < LLM_LATENCY
+
+    advice = _wait_for_advice(client, headers, qid)
+    assert advice["ai_status"] == "ready"
+    assert advice["ai_advice"]["bullets"]
+    assert llm.calls == calls + 1
+
+
+def test_reads_do_not_wait_for_a_slow_model(
+        server: str, client: Any, register: Callable, llm: Any, monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    headers = register()
+    qid = _questionnaire(client, headers, {**ANSWERS, "income": 76_000})
+    monkeypatch.setattr(llm, "delay", 2.0)
+    assert client.post(f"/questionnaires/{qid}/complete", headers=headers).json()["ai_status"] == "pending"
+
+    paths = ["/health", f"/questionnaires/{qid}", f"/reports/{qid}", f"/reports/{qid}/advice"] * 10
+
+    async def get_all() -> List[float]:
+        async with httpx.AsyncClient(base_url=server, timeout=30, headers=headers) as http:
+            async def timed(path: str) -> float:
+                start = time.monotonic()
+                assert (await http.get(path)).status_code == 200
+                return time.monotonic() - start
+
+            return await asyncio.gather(*(timed(path) for path in paths))
+
+    # While the model holds the job's call open
+    start = time.monotonic()
+    elapsed = asyncio.run(get_all())
+    assert time.monotonic() - start < 1.0
+    assert max(elapsed) < 1.0
+    assert client.get(f"/reports/{qid}/advice", headers=headers).json()["ai_status"] == "pending"
+
+    assert _wait_for_advice(client, headers, qid)["ai_status"] == "ready"
+
+
+def test_completing_again_reuses_the_advice(client: Any, register: Callable, llm: Any) -> None:
+    headers = register()
+    qid = _questionnaire(client, headers, {**ANSWERS, "income": 71_000})
+    client.post(f"/questionnaires/{qid}/complete", headers=headers)
+    ready = _wait_for_advice(client, headers, qid)
+    calls = llm.calls
+
+    again = client.post(f"/questionnaires/{qid}/complete", headers=headers).json()
+    assert again["ai_status"] == "ready"
+    assert again["ai_advice"] == ready["ai_advice"]
+    assert llm.calls == calls
+
+
+def test_without_a_model_the_fallback_is_stored(client: Any, register: Callable) -> None:
+    # No OPENAI_API_KEY (the llm fixture isn't used)
+    headers = register()
+    qid = _questionnaire(client, headers, {**ANSWERS, "income": 72_000})
+    assert client.post(f"/questionnaires/{qid}/complete", headers=headers).status_code == 200
+
+    advice = _wait_for_advice(client, headers, qid)
+    assert advice["ai_status"] == "ready"
+    assert advice["ai_advice"]["bullets"]
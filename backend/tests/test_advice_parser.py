@@ -0,0 +1,123 @@
+"""
+ai_engine.AdviceParser over streamed completions: however the text is
+cut into chunks, feed()/close()/result() give the same advice as parsing
+the whole text, and each line is emitted as soon as its newline arrives.
+"""
+import asyncio
+import random
+from typing import Any, Dict, Iterable, List
+
+import pytest
+
+from app import ai_engine
+from app.ai_engine import AdviceParser, _parse_advice
+from app.services import risk_engine
+
+TEXTS = {
+    "dash bullets": "Your cover looks reasonable.\nReview your life policy.\n- Ask about term life.\n- Check auto limits.\n",
+    "bullet marker": "Overview line.\n• First step.\n•Second step\n• Third step.\n",
+    "no trailing newline": "Summary here.\n- Only bullet without newline",
+    "blank lines": "\n\nSummary one.\n\n\nSummary two.\n\n- Bullet.\n\n",
+    "summary after bullets": "Intro.\n- Bullet one.\nA line after the bullets is a bullet too.\n",
+    "no summary": "- Just bullets.\n- And another.",
+    "no bullets": "Only a summary, on one line",
+    "empty": "",
+    "whitespace": "  \n \n",
+    "crlf": "Summary.\r\n- Bullet one.\r\n- Bullet two.\r\n",
+}
+
+
+def _reference(text: str) -> Dict[str, Any]:
+    # The original whole-text split the parser must keep matching
+    parts = [p.strip() for p in text.split("\n") if p.strip()]
+    summary_lines: List[str] = []
+    bullet_lines: List[str] = []
+    in_bullets = False
+    for line in parts:
+        if line.startswith("-") or line.startswith("•"):
+            in_bullets = True
+        if in_bullets:
+            bullet_lines.append(line.lstrip("-• ").strip())
+        else:
+            summary_lines.append(line)
+    summary = " ".join(summary_lines).strip()
+    if not summary:
+        summary = text.strip()
+    return {"summary": summary, "bullets": bullet_lines}
+
+
+def _streamed(chunks: Iterable[str]) -> Dict[str, Any]:
+    parser = AdviceParser()
+    events = []
+    for chunk in chunks:
+        events.extend(parser.feed(chunk))
+    events.extend(parser.close())
+    result = parser.result()
+    # The events are the lines, in order
+    assert [line for kind, line in events if kind == "bullet"] == result["bullets"]
+    assert [kind for kind, _ in events] == ["summary"] * len(parser.summary_lines) + ["bullet"] * len(result["bullets"])
+    return result
+
+
+def _split(text: str, cuts: Iterable[int]) -> List[str]:
+    bounds = [0, *sorted(cuts), len(text)]
+    return [text[a:b] for a, b in zip(bounds, bounds[1:])]
+
+
+@pytest.mark.parametrize("name", TEXTS)
+def test_whole_text_matches_the_reference(name: str) -> None:
+    assert _parse_advice(TEXTS[name]) == _reference(TEXTS[name])
+
+
+@pytest.mark.parametrize("name", TEXTS)
+def test_every_two_chunk_split(name: str) -> None:
+    text = TEXTS[name]
+    for cut in range(len(text) + 1):
+        assert _streamed(_split(text, [cut])) == _parse_advice(text), cut
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 16])
+@pytest.mark.parametrize("name", TEXTS)
+def test_fixed_size_chunks(name: str, size: int) -> None:
+    text = TEXTS[name]
+    chunks = [text[i:i + size] for i in range(0, len(text), size)]
+    assert _streamed(chunks) == _parse_advice(text)
+
+
+def test_random_chunkings() -> None:
+    rng = random.Random(7)
+    texts = [*TEXTS.values(), "".join(TEXTS.values())]
+    for _ in range(500):
+        text = rng.choice(texts)
+        cuts = rng.sample(range(len(text) + 1), rng.randint(0, min(len(text), 12)))
+        # Empty chunks too, as a stream may send them
+        chunks = _split(text, cuts) + [""] * rng.randint(0, 2)
+        assert _streamed(chunks) == _parse_advice(text) == _reference(text)
+
+
+def test_lines_are_emitted_when_their_newline_arrives() -> None:
+    parser = AdviceParser()
+    assert parser.feed("Summary li") == []
+    assert parser.feed("ne.\n- Fir") == [("summary", "Summary line.")]
+    assert parser.feed("st step") == []
+    assert parser.feed(".\n") == [("bullet", "First step.")]
+    assert parser.feed("• Second") == []
+    assert parser.close() == [("bullet", "Second")]
+
+
+def test_empty_summary_falls_back_to_the_raw_text() -> None:
+    text = "- One.\n- Two."
+    assert _streamed(_split(text, [3, 8])) == {"summary": text, "bullets": ["One.", "Two."]}
+
+
+def test_stream_ai_advice_matches_the_full_completion(llm: Any) -> None:
+    # The fake model streams its answer in 16-character chunks
+    context = {"age": 52, "income": 98_000, "dependants": 2, "province": "QC", "owns_home": True}
+
+    async def collect() -> List[Any]:
+        return [event async for event in ai_engine.stream_ai_advice(context, risk_engine.evaluate(context))]
+
+    events = asyncio.run(collect())
+    expected = _parse_advice(llm.ADVICE)
+    assert events[-1] == ("done", expected)
+    assert [line for kind, line in events if kind == "bullet"] == expected["bullets"]
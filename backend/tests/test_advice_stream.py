@@ -0,0 +1,82 @@
+"""
+GET /reports/{id}/advice/stream: streams of one prompt share one upstream
+read, as do a stream and the background job, and a slow client holds no
+limiter slot once the model has finished.
+"""
+import asyncio
+from typing import Any, Callable, Dict, List
+
+import httpx
+
+from app import ai_engine
+from app.config import AI_MAX_CONCURRENCY
+from app.services import risk_engine
+
+from .conftest import LLM_LATENCY
+from .test_advice_jobs import ANSWERS, _questionnaire, _wait_for_advice
+
+STREAMS = 5
+
+
+def _stream_all(server: str, headers: Dict[str, str], qid: str, count: int) -> List[str]:
+    async def get_all() -> List[str]:
+        async with httpx.AsyncClient(base_url=server, timeout=30, headers=headers) as client:
+            responses = await asyncio.gather(*(
+                client.get(f"/reports/{qid}/advice/stream") for _ in range(count)
+            ))
+        assert [r.status_code for r in responses] == [200] * count
+        return [r.text for r in responses]
+
+    return asyncio.run(get_all())
+
+
+def test_streaming_complete_leaves_nothing_pending(
+        server: str, client: Any, register: Callable[[], Dict[str, str]], llm: Any,
+) -> None:
+    headers = register()
+    qid = _questionnaire(client, headers, {**ANSWERS, "income": 73_000})
+    calls = llm.calls
+
+    body = client.post(f"/questionnaires/{qid}/complete?stream_advice=true", headers=headers).json()
+    assert body["ai_status"] is None
+    assert client.get(f"/reports/{qid}/advice", headers=headers).json()["ai_status"] is None
+
+    streams = _stream_all(server, headers, qid, STREAMS)
+    assert all("event: done" in text for text in streams)
+    assert len(set(streams)) == 1
+    assert llm.calls == calls + 1
+    assert client.get(f"/reports/{qid}/advice", headers=headers).json()["ai_status"] == "ready"
+
+
+def test_stream_shares_the_call_of_a_pending_job(
+        server: str, client: Any, register: Callable[[], Dict[str, str]], llm: Any,
+) -> None:
+    headers = register()
+    qid = _questionnaire(client, headers, {**ANSWERS, "income": 74_000})
+    calls = llm.calls
+
+    assert client.post(f"/questionnaires/{qid}/complete", headers=headers).json()["ai_status"] == "pending"
+    [stream] = _stream_all(server, headers, qid, 1)
+
+    assert "event: done" in stream
+    assert _wait_for_advice(client, headers, qid)["ai_status"] == "ready"
+    assert llm.calls == calls + 1
+
+
+def test_slow_reader_holds_no_limiter_slot(llm: Any) -> None:
+    context = {**ANSWERS, "income": 75_000}
+
+    async def read_slowly() -> List[Any]:
+        events = ai_engine.stream_ai_advice(context, risk_engine.evaluate(context))
+        first = await events.__anext__()
+        # The client stops reading; the model finishes without it
+        for _ in range(int(LLM_LATENCY * 100)):
+            if not ai_engine._streams:
+                break
+            await asyncio.sleep(0.05)
+        assert not ai_engine._streams
+        assert ai_engine._limiter()._value == AI_MAX_CONCURRENCY
+        return [first] + [event async for event in events]
+
+    events = asyncio.run(read_slowly())
+    assert events[-1] == ("done", ai_engine._parse_advice(llm.ADVICE))
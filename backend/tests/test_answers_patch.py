@@ -0,0 +1,74 @@
+"""
+PATCH /questionnaires/{id}/answers: autosaves against a stale version
+merge when they touch other answers and are refused (409, nothing
+written) when they change one that was saved elsewhere meanwhile.
+"""
+from typing import Any, Callable, Dict
+
+import pytest
+
+from .test_advice_jobs import _questionnaire
+
+
+@pytest.fixture
+def saved(client: Any, register: Callable[[], Dict[str, str]]) -> Dict[str, Any]:
+    """
+    A questionnaire with a few answers, and the version they were saved at.
+    """
+    headers = register()
+    qid = _questionnaire(client, headers, {"age": 35, "income": 70_000, "vehicles": {"cars": 1, "bikes": 2}})
+    etag = client.get(f"/questionnaires/{qid}", headers=headers).headers["etag"]
+    return {"headers": headers, "qid": qid, "etag": etag}
+
+
+def _patch(client: Any, saved: Dict[str, Any], answers: Dict[str, Any], etag: str) -> Any:
+    return client.patch(
+        f"/questionnaires/{saved['qid']}/answers",
+        headers={**saved["headers"], "If-Match": etag},
+        json={"answers": answers},
+    )
+
+
+def _answers(client: Any, saved: Dict[str, Any]) -> Dict[str, Any]:
+    return client.get(f"/questionnaires/{saved['qid']}", headers=saved["headers"]).json()["answers"]
+
+
+def test_if_match_is_required(client: Any, saved: Dict[str, Any]) -> None:
+    response = client.patch(
+        f"/questionnaires/{saved['qid']}/answers", headers=saved["headers"], json={"answers": {"age": 36}},
+    )
+    assert response.status_code == 428
+
+
+def test_stale_patch_of_other_answers_merges(client: Any, saved: Dict[str, Any]) -> None:
+    elsewhere = _patch(client, saved, {"income": 80_000}, saved["etag"])
+    assert elsewhere.status_code == 200
+
+    response = _patch(client, saved, {"age": 36}, saved["etag"])
+
+    assert response.status_code == 200
+    assert response.json()["changes"] == {"income": 80_000}
+    assert response.headers["etag"] == f'"{response.json()["version"]}"'
+    assert _answers(client, saved) == {"age": 36, "income": 80_000, "vehicles": {"cars": 1, "bikes": 2}}
+
+
+def test_conflicting_patch_is_refused(client: Any, saved: Dict[str, Any]) -> None:
+    elsewhere = _patch(client, saved, {"age": 40, "income": 80_000}, saved["etag"])
+    assert elsewhere.status_code == 200
+
+    response = _patch(client, saved, {"age": 36, "vehicles": {"cars": 2}}, saved["etag"])
+
+    assert response.status_code == 409
+    detail = response.json()["detail"]
+    assert detail["changes"] == {"age": 40, "income": 80_000}
+    assert response.headers["etag"] == f'"{detail["version"]}"' == elsewhere.headers["etag"]
+    # Nothing of the refused patch was written
+    assert _answers(client, saved) == {"age": 40, "income": 80_000, "vehicles": {"cars": 1, "bikes": 2}}
+
+
+def test_same_object_in_another_key_order_is_no_conflict(client: Any, saved: Dict[str, Any]) -> None:
+    assert _patch(client, saved, {"vehicles": {"cars": 2, "bikes": 2}}, saved["etag"]).status_code == 200
+
+    response = _patch(client, saved, {"vehicles": {"bikes": 2, "cars": 2}}, saved["etag"])
+
+    assert response.status_code == 200
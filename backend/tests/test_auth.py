@@ -0,0 +1,61 @@
+"""
+Registration and login through the running app, and the cached
+principals of users who change.
+"""
+import asyncio
+import uuid
+from typing import Any, List
+
+import httpx
+
+from app import auth_cache
+from app.db import SessionLocal
+from app.models.user import User
+
+
+def test_concurrent_registrations_of_one_email(server: str) -> None:
+    body = {"email": f"{uuid.uuid4().hex}@example.com", "password": "correct horse battery staple"}
+
+    async def register_all() -> List[Any]:
+        async with httpx.AsyncClient(base_url=server, timeout=30) as client:
+            return await asyncio.gather(*(client.post("/auth/register", json=body) for _ in range(10)))
+
+    responses = asyncio.run(register_all())
+    assert sorted(r.status_code for r in responses) == [200] + [400] * 9
+    assert {r.json()["detail"] for r in responses if r.status_code == 400} == {"Email already registered"}
+
+
+def test_login_after_register(client: Any) -> None:
+    body = {"email": f"{uuid.uuid4().hex}@example.com", "password": "correct horse battery staple"}
+    assert client.post("/auth/register", json=body).status_code == 200
+    response = client.post("/auth/login", data={"username": body["email"], "password": body["password"]})
+    assert response.status_code == 200
+    assert client.post("/auth/login", data={"username": body["email"], "password": "wrong"}).status_code == 401
+
+
+def test_deactivation_evicts_the_principal_on_commit(server: str) -> None:
+    body = {"email": f"{uuid.uuid4().hex}@example.com", "password": "correct horse battery staple"}
+    # Not the `client` fixture: it starts every request with a cold principal cache
+    with httpx.Client(base_url=server, timeout=30) as client:
+        user_id = client.post("/auth/register", json=body).json()["id"]
+        token = client.post("/auth/login", data={"username": body["email"], "password": body["password"]})
+        headers = {"Authorization": f"Bearer {token.json()['access_token']}"}
+        assert client.get("/questionnaires/", headers=headers).status_code == 200
+        assert auth_cache.principals.get(user_id) is not None
+
+        with SessionLocal() as db:
+            db.get(User, user_id).is_active = False
+            db.flush()
+            db.rollback()
+        # Rolled back: still active, still cached
+        assert auth_cache.principals.get(user_id) is not None
+
+        with SessionLocal() as db:
+            db.get(User, user_id).is_active = False
+            db.flush()
+            # Until the commit, the old row is still what everyone else reads
+            assert auth_cache.principals.get(user_id) is not None
+            db.commit()
+        assert auth_cache.principals.get(user_id) is None
+
+        assert client.get("/questionnaires/", headers=headers).status_code == 401
@@ -0,0 +1,77 @@
+"""
+Bulk exports (app/services/bulk.py) read in batches, each on a connection
+that is back in the pool before the batch is handed on: a client that
+stops reading must not hold the API's only SQLite connection.
+"""
+import asyncio
+import json
+from typing import Any, AsyncIterator, Callable, Dict, List
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+
+from app.config import DATABASE_URL
+from app.db import async_url, engine
+from app.services import bulk
+
+PROFILES = (
+    {"answers": {"age": 38, "income": 85_000, "dependants": 2, "province": "ON", "has_vehicle": True}},
+    {"answers": {"age": 29, "income": 52_000, "province": "BC", "rents": True}},
+    {"answers": {"age": 61, "owns_home": True, "travels_outside_canada": True}},
+)
+
+
+@pytest.fixture
+def export_engine(
+        client: Any, register: Callable[[], Dict[str, str]], monkeypatch: pytest.MonkeyPatch,
+) -> AsyncEngine:
+    """
+    Some scored questionnaires, and an engine for the export to read them
+    with that has one connection and gives up waiting for it after a second.
+    """
+    body = "".join(json.dumps(profile) + "\n" for profile in PROFILES * 3)
+    response = client.post("/bulk/questionnaires?score=true", headers=register(), content=body)
+    assert response.status_code == 200
+    exports = create_async_engine(async_url(DATABASE_URL), pool_size=1, max_overflow=0, pool_timeout=1)
+    monkeypatch.setattr(bulk, "async_engine", exports)
+    return exports
+
+
+async def _lines(chunks: AsyncIterator[bytes]) -> List[Dict[str, Any]]:
+    return [json.loads(line) async for chunk in chunks for line in chunk.splitlines()]
+
+
+def test_stalled_export_holds_no_connection(export_engine: AsyncEngine) -> None:
+    async def stall() -> None:
+        chunks = bulk.export_questionnaires("ndjson", batch_size=2)
+        await chunks.__anext__()
+        # The consumer is away; the next request gets the connection at once
+        assert export_engine.pool.checkedout() == 0
+        async with export_engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+        await chunks.aclose()
+        await export_engine.dispose()
+
+    asyncio.run(stall())
+
+
+def test_batches_resume_where_the_last_one_ended(export_engine: AsyncEngine) -> None:
+    async def export() -> List[List[Dict[str, Any]]]:
+        try:
+            return [
+                await _lines(bulk.export_questionnaires("ndjson", batch_size=2)),
+                await _lines(bulk.export_assessments("ndjson", batch_size=2)),
+            ]
+        finally:
+            await export_engine.dispose()
+
+    questionnaires, assessments = asyncio.run(export())
+
+    with engine.connect() as conn:
+        ids = conn.execute(text("SELECT id FROM questionnaires ORDER BY id")).scalars().all()
+        scored = conn.execute(
+            text("SELECT questionnaire_id, answers_hash FROM assessments ORDER BY questionnaire_id, created_at")
+        ).all()
+    assert [record["id"] for record in questionnaires] == ids
+    assert [(record["questionnaire_id"], record["answers_hash"]) for record in assessments] == [tuple(row) for row in scored]
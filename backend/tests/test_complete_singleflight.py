@@ -0,0 +1,70 @@
+"""
+Concurrent POST /questionnaires/{id}/complete calls share one upstream
+LLM call: for one questionnaire (coalesced by routers.questionnaire's
+SingleFlight) and for many questionnaires with the same answers (one
+prompt, so one call).
+"""
+import asyncio
+from typing import Any, Callable, Dict, List
+
+import httpx
+
+from app.routers.questionnaire import completions
+
+from .test_advice_jobs import _questionnaire, _wait_for_advice
+
+REQUESTS = 100
+USERS = 20
+
+PROFILES = (
+    {"age": 38, "income": 85_000, "dependants": 2, "province": "ON", "has_vehicle": True,
+     "owns_home": True, "has_mortgage": True, "travels_outside_canada": True},
+    {"age": 29, "income": 52_000, "dependants": 0, "province": "BC", "has_vehicle": False,
+     "rents": True, "travels_outside_canada": True},
+)
+
+
+def _complete_all(server: str, calls: List[Dict[str, Any]]) -> List[httpx.Response]:
+    async def post_all() -> List[httpx.Response]:
+        limits = httpx.Limits(max_connections=len(calls), max_keepalive_connections=len(calls))
+        async with httpx.AsyncClient(base_url=server, timeout=60, limits=limits) as client:
+            return await asyncio.gather(*(
+                client.post(f"/questionnaires/{call['qid']}/complete", headers=call["headers"]) for call in calls
+            ))
+
+    return asyncio.run(post_all())
+
+
+def test_concurrent_calls_for_one_questionnaire(
+        server: str, client: Any, register: Callable[[], Dict[str, str]], llm: Any,
+) -> None:
+    headers = register()
+    qid = _questionnaire(client, headers, PROFILES[0])
+    calls, leaders = llm.calls, completions.leaders
+
+    responses = _complete_all(server, [{"qid": qid, "headers": headers}] * REQUESTS)
+
+    assert [r.status_code for r in responses] == [200] * REQUESTS
+    # Calls that only arrive after the first run finished run again (and may
+    # already see its advice), but find the same assessment
+    assert {str(r.json()["assessment"]) for r in responses} == {str(responses[0].json()["assessment"])}
+    assert completions.leaders - leaders < REQUESTS
+    assert _wait_for_advice(client, headers, qid)["ai_status"] == "ready"
+    assert llm.calls == calls + 1
+
+
+def test_identical_answers_share_one_call(
+        server: str, client: Any, register: Callable[[], Dict[str, str]], llm: Any,
+) -> None:
+    users = []
+    for _ in range(USERS):
+        headers = register()
+        users.append({"qid": _questionnaire(client, headers, PROFILES[1]), "headers": headers})
+    calls = llm.calls
+
+    responses = _complete_all(server, users)
+
+    assert [r.status_code for r in responses] == [200] * USERS
+    for user in users:
+        assert _wait_for_advice(client, user["headers"], user["qid"])["ai_status"] == "ready"
+    assert llm.calls == calls + 1
@@ -0,0 +1,65 @@
+"""
+The coverage rollups (app/services/coverage.py) are kept up to date
+incrementally: after questionnaires are scored, re-scored and have their
+reports dropped, coverage.check() finds them equal to a full recompute.
+"""
+import json
+from typing import Any, Callable, Dict, List
+
+from sqlalchemy import update
+
+from app.db import engine
+from app.models.coverage import CoverageRollup
+from app.services import coverage
+
+from .test_advice_jobs import ANSWERS, _questionnaire
+
+
+def _differences() -> List[str]:
+    with engine.connect() as conn:
+        return coverage.check(conn)
+
+
+def test_rollups_match_a_recompute(client: Any, register: Callable[[], Dict[str, str]]) -> None:
+    headers = register()
+
+    # Inserts: completed one by one, and imported in bulk with scoring
+    ids = []
+    for age, province in ((23, "ON"), (37, "QC"), (48, "AB"), (70, "XX")):
+        qid = _questionnaire(client, headers, {**ANSWERS, "age": age, "province": province})
+        assert client.post(f"/questionnaires/{qid}/complete", headers=headers).status_code == 200
+        ids.append(qid)
+    body = "".join(json.dumps({"answers": {**ANSWERS, "dependants": n}}) + "\n" for n in range(5))
+    assert client.post("/bulk/questionnaires?score=true", headers=headers, content=body).status_code == 200
+    assert _differences() == []
+
+    # Updates: new answers scored again move the contribution to new buckets
+    for qid in ids[:2]:
+        client.put(f"/questionnaires/{qid}/answers", headers=headers, json={"answers": {"age": 58, "dependants": 4}})
+        assert client.post(f"/questionnaires/{qid}/complete", headers=headers).status_code == 200
+    assert _differences() == []
+
+    # Deletes: changed answers drop the report and its contribution
+    for qid in ids[2:]:
+        client.put(f"/questionnaires/{qid}/answers", headers=headers, json={"answers": {"income": 10_000}})
+    assert _differences() == []
+
+
+def test_check_reports_drift(client: Any, register: Callable[[], Dict[str, str]]) -> None:
+    headers = register()
+    qid = _questionnaire(client, headers, {**ANSWERS, "province": "NS"})
+    assert client.post(f"/questionnaires/{qid}/complete", headers=headers).status_code == 200
+
+    with engine.begin() as conn:
+        conn.execute(
+            update(CoverageRollup)
+            .where(CoverageRollup.dimension == "province", CoverageRollup.bucket == "NS")
+            .values(members=CoverageRollup.members + 1)
+        )
+    differences = _differences()
+    assert differences
+    assert all(line.startswith("province=NS ") for line in differences)
+
+    with engine.begin() as conn:
+        coverage.rebuild(conn)
+    assert _differences() == []
@@ -0,0 +1,82 @@
+"""
+Idempotency-Key on POST /questionnaires/{id}/complete: a retry after the
+first call finished replays its response, one while it is still running
+gets 409, and the key can't be reused for another request.
+"""
+import asyncio
+from typing import Any, Callable, Dict, List
+
+import httpx
+import pytest
+
+from app.routers import questionnaire
+
+from .test_advice_jobs import ANSWERS, _questionnaire, _wait_for_advice
+
+
+def _complete(client: Any, headers: Dict[str, str], qid: str, key: str) -> Any:
+    return client.post(f"/questionnaires/{qid}/complete", headers={**headers, "Idempotency-Key": key})
+
+
+def test_retry_replays_the_first_response(client: Any, register: Callable[[], Dict[str, str]], llm: Any) -> None:
+    headers = register()
+    qid = _questionnaire(client, headers, ANSWERS)
+    first = _complete(client, headers, qid, "retry-1")
+    assert first.status_code == 200
+    assert "idempotent-replayed" not in first.headers
+    assert _wait_for_advice(client, headers, qid)["ai_status"] == "ready"
+    calls = llm.calls
+
+    retry = _complete(client, headers, qid, "retry-1")
+
+    assert retry.status_code == 200
+    assert retry.headers["idempotent-replayed"] == "true"
+    assert retry.json() == first.json()
+    # Nothing ran again: the advice job was not queued a second time
+    assert _wait_for_advice(client, headers, qid)["ai_status"] == "ready"
+    assert llm.calls == calls
+
+
+def test_key_reused_for_another_request(client: Any, register: Callable[[], Dict[str, str]]) -> None:
+    headers = register()
+    first, other = (_questionnaire(client, headers, ANSWERS) for _ in range(2))
+    assert _complete(client, headers, first, "reused").status_code == 200
+
+    response = _complete(client, headers, other, "reused")
+
+    assert response.status_code == 422
+    assert client.get(f"/questionnaires/{other}", headers=headers).json()["status"] == "in_progress"
+
+
+def test_retry_while_the_first_call_runs(
+        server: str, client: Any, register: Callable[[], Dict[str, str]], monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    headers = {**register(), "Idempotency-Key": "in-flight"}
+    qid = _questionnaire(client, headers, ANSWERS)
+    started = asyncio.Event()
+    complete = questionnaire._complete
+
+    async def slow_complete(*args: Any) -> Any:
+        started.set()
+        await asyncio.sleep(0.5)
+        return await complete(*args)
+
+    monkeypatch.setattr(questionnaire, "_complete", slow_complete)
+
+    async def first_and_retry() -> List[httpx.Response]:
+        async with httpx.AsyncClient(base_url=server, timeout=30) as http:
+            first = asyncio.ensure_future(http.post(f"/questionnaires/{qid}/complete", headers=headers))
+            while not started.is_set():
+                await asyncio.sleep(0.01)
+            retry = await http.post(f"/questionnaires/{qid}/complete", headers=headers)
+            return [await first, retry]
+
+    first, retry = asyncio.run(first_and_retry())
+
+    assert first.status_code == 200
+    assert retry.status_code == 409
+    assert retry.headers["retry-after"] == "1"
+    monkeypatch.undo()
+    replay = client.post(f"/questionnaires/{qid}/complete", headers=headers)
+    assert replay.headers["idempotent-replayed"] == "true"
+    assert replay.json() == first.json()
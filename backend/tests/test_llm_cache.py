@@ -0,0 +1,60 @@
+"""
+AI advice cache (app/llm_cache.py): an identical profile never costs a
+second upstream call, in memory or after a restart with a SQLite file.
+"""
+from typing import Any
+
+import pytest
+
+from app import ai_engine
+from app.llm_cache import LLMCache
+from app.services import risk_engine
+
+PROFILE = {"age": 41, "income": 120_000, "dependants": 3, "province": "ON", "has_mortgage": True}
+
+
+def _advise(profile: Any = PROFILE) -> Any:
+    return ai_engine.generate_ai_advice(profile, risk_engine.evaluate(profile))
+
+
+def test_repeated_profile_is_served_from_memory(llm: Any) -> None:
+    calls = llm.calls
+    first = _advise()
+    assert llm.calls == calls + 1
+
+    for _ in range(3):
+        assert _advise() == first
+    assert llm.calls == calls + 1
+    assert ai_engine.advice_cache.stats()["hits"] >= 3
+
+
+def test_different_profile_is_not_a_hit(llm: Any) -> None:
+    calls = llm.calls
+    _advise()
+    _advise({**PROFILE, "income": 60_000})
+    assert llm.calls == calls + 2
+
+
+def test_cache_file_survives_a_restart(llm: Any, tmp_path: Any, monkeypatch: pytest.MonkeyPatch) -> None:
+    path = str(tmp_path / "llm_cache.db")
+    calls = llm.calls
+
+    monkeypatch.setattr(ai_engine, "advice_cache", LLMCache(max_entries=16, ttl_seconds=60, path=path))
+    first = _advise()
+    assert llm.calls == calls + 1
+
+    # A new process: empty memory tier, same file
+    restarted = LLMCache(max_entries=16, ttl_seconds=60, path=path)
+    monkeypatch.setattr(ai_engine, "advice_cache", restarted)
+    assert _advise() == first
+    assert llm.calls == calls + 1
+    assert restarted.stats()["disk_hits"] == 1
+
+
+def test_expired_entries_are_fetched_again(llm: Any, tmp_path: Any, monkeypatch: pytest.MonkeyPatch) -> None:
+    cache = LLMCache(max_entries=16, ttl_seconds=-1, path=str(tmp_path / "llm_cache.db"))
+    monkeypatch.setattr(ai_engine, "advice_cache", cache)
+    calls = llm.calls
+    _advise()
+    _advise()
+    assert llm.calls == calls + 2
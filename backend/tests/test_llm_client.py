@@ -0,0 +1,171 @@
+"""
+Retries and the circuit breaker (app/llm_client.py) against stub calls
+that fail on purpose: upstream errors, bugs, malformed chunks and
+cancellation must all leave the breaker able to admit a later call.
+"""
+import asyncio
+from types import SimpleNamespace
+from typing import Any, AsyncIterator, Callable, List
+
+import pytest
+
+from app import llm_client
+from app.llm_client import CircuitBreaker, LLMUnavailable
+
+openai = pytest.importorskip("openai")
+
+
+@pytest.fixture
+def breaker(monkeypatch: pytest.MonkeyPatch) -> CircuitBreaker:
+    """
+    A fresh breaker that opens on the first failure, with no retry backoff.
+    """
+    breaker = CircuitBreaker(failure_threshold=1, cooldown_seconds=60, latency_budget=10)
+    monkeypatch.setattr(llm_client, "breaker", breaker)
+    monkeypatch.setattr(llm_client, "_backoff", lambda attempt: 0)
+    return breaker
+
+
+def _connection_error() -> Exception:
+    import httpx
+
+    return openai.APIConnectionError(request=httpx.Request("POST", "http://upstream.invalid"))
+
+
+def _half_open(breaker: CircuitBreaker) -> None:
+    breaker.record_failure()
+    breaker.cooldown_seconds = 0
+    assert breaker.state == "half_open"
+
+
+def _chunk(content: Any) -> Any:
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=content))], usage=None)
+
+
+def _stream(*chunks: Any, hang: bool = False) -> Callable[[], Any]:
+    async def chunks_() -> AsyncIterator[Any]:
+        for chunk in chunks:
+            yield chunk
+        if hang:
+            await asyncio.Event().wait()
+
+    async def open_stream() -> AsyncIterator[Any]:
+        return chunks_()
+
+    return open_stream
+
+
+async def _collect(open_stream: Callable[[], Any]) -> List[str]:
+    return [delta async for delta in llm_client.stream_deltas(open_stream)]
+
+
+def test_retryable_errors_are_retried(breaker: CircuitBreaker) -> None:
+    attempts = []
+
+    def flaky() -> str:
+        attempts.append(1)
+        if len(attempts) <= llm_client.LLM_MAX_RETRIES:
+            raise _connection_error()
+        return "ok"
+
+    assert llm_client.call(flaky) == "ok"
+    assert breaker.state == "closed"
+
+
+def test_failure_opens_the_circuit(breaker: CircuitBreaker) -> None:
+    attempts = []
+
+    def down() -> None:
+        attempts.append(1)
+        raise _connection_error()
+
+    with pytest.raises(LLMUnavailable):
+        llm_client.call(down)
+    assert len(attempts) == llm_client.LLM_MAX_RETRIES + 1
+    assert breaker.state == "open"
+
+    with pytest.raises(LLMUnavailable, match="circuit open"):
+        llm_client.call(down)
+    assert len(attempts) == llm_client.LLM_MAX_RETRIES + 1
+
+
+def test_half_open_trial_success_closes(breaker: CircuitBreaker) -> None:
+    _half_open(breaker)
+    assert llm_client.call(lambda: "ok") == "ok"
+    assert breaker.state == "closed"
+
+
+def test_unexpected_exception_in_trial_counts_as_failure(breaker: CircuitBreaker) -> None:
+    _half_open(breaker)
+
+    def broken() -> None:
+        raise AttributeError("'NoneType' object has no attribute 'choices'")
+
+    with pytest.raises(AttributeError):
+        llm_client.call(broken)
+    # Failed, not stuck: the next trial is let through
+    assert breaker.trips == 2
+    assert llm_client.call(lambda: "ok") == "ok"
+    assert breaker.state == "closed"
+
+
+def test_cancelled_trial_is_released(breaker: CircuitBreaker) -> None:
+    _half_open(breaker)
+
+    async def slow() -> str:
+        await asyncio.sleep(10)
+        return "late"
+
+    async def fast() -> str:
+        return "ok"
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(asyncio.wait_for(llm_client.call_async(slow), timeout=0.05))
+    # Cancellation is not a verdict on the upstream
+    assert breaker.trips == 1
+    assert breaker.state == "half_open"
+    assert asyncio.run(llm_client.call_async(fast)) == "ok"
+    assert breaker.state == "closed"
+
+
+def test_stream_cancelled_before_first_delta_is_released(breaker: CircuitBreaker) -> None:
+    _half_open(breaker)
+
+    async def cancel_midway() -> None:
+        task = asyncio.ensure_future(_collect(_stream(_chunk(None), hang=True)))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancel_midway())
+    assert breaker.state == "half_open"
+    assert asyncio.run(_collect(_stream(_chunk("Hello"), _chunk(" there")))) == ["Hello", " there"]
+    assert breaker.state == "closed"
+
+
+def test_stream_closed_by_consumer_is_released(breaker: CircuitBreaker) -> None:
+    _half_open(breaker)
+
+    async def read_nothing() -> None:
+        # Opened, then dropped before any content: the client disconnected
+        deltas = llm_client.stream_deltas(_stream(_chunk(None), hang=True))
+        reader = asyncio.ensure_future(deltas.__anext__())
+        await asyncio.sleep(0.05)
+        reader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await reader
+        await deltas.aclose()
+
+    asyncio.run(read_nothing())
+    assert breaker.state == "half_open"
+    assert asyncio.run(_collect(_stream(_chunk("ok")))) == ["ok"]
+    assert breaker.state == "closed"
+
+
+def test_malformed_chunk_counts_as_failure(breaker: CircuitBreaker) -> None:
+    _half_open(breaker)
+    with pytest.raises(AttributeError):
+        asyncio.run(_collect(_stream(SimpleNamespace(usage=None))))
+    assert breaker.trips == 2
+    assert asyncio.run(_collect(_stream(_chunk("ok")))) == ["ok"]
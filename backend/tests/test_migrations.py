@@ -0,0 +1,103 @@
+"""
+Schema upgrades (app/migrations.py) on a database shaped like one made by
+an older version.
+"""
+import os
+import subprocess
+import sys
+from typing import Any, List
+
+import pytest
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import Engine
+
+from app import migrations
+
+
+@pytest.fixture
+def legacy(tmp_path: Any) -> Engine:
+    """
+    A database from before answers had a unique key (or schema_steps).
+    """
+    engine = create_engine(f"sqlite:///{tmp_path}/legacy.db")
+    migrations.upgrade(engine)
+    with engine.begin() as conn:
+        conn.execute(text("DROP INDEX uq_questionnaire_answers_key"))
+        conn.execute(text("DROP TABLE schema_steps"))
+        conn.execute(text("INSERT INTO questionnaires (id, user_id, version) VALUES ('q1', 'u1', 0)"))
+    return engine
+
+
+def _answer(conn: Any, row_id: str, key: str, value: str) -> None:
+    conn.execute(
+        text(
+            "INSERT INTO questionnaire_answers (id, questionnaire_id, question_key, answer_json, version) "
+            "VALUES (:id, 'q1', :key, :value, 0)"
+        ),
+        {"id": row_id, "key": key, "value": value},
+    )
+
+
+def test_duplicate_answers_keep_the_last_row_stored(legacy: Engine) -> None:
+    with legacy.begin() as conn:
+        # Stored in this order; the ids sort the other way round
+        _answer(conn, "ffff", "age", "30")
+        _answer(conn, "0000", "age", "31")
+        _answer(conn, "eeee", "income", "50000")
+        _answer(conn, "aaaa", "income", "60000")
+        _answer(conn, "1111", "income", "70000")
+        _answer(conn, "bbbb", "province", '"QC"')
+
+    migrations.upgrade(legacy)
+
+    with legacy.connect() as conn:
+        rows = conn.execute(
+            text("SELECT question_key, answer_json FROM questionnaire_answers ORDER BY question_key")
+        ).all()
+        indexes = conn.execute(text("PRAGMA index_list(questionnaire_answers)")).all()
+    assert rows == [("age", 31), ("income", 70000), ("province", '"QC"')]
+    assert "uq_questionnaire_answers_key" in {index[1] for index in indexes}
+
+
+def test_one_off_steps_run_once(legacy: Engine) -> None:
+    with legacy.begin() as conn:
+        # Text that was never JSON, and no facts row
+        _answer(conn, "a1", "province", "QC")
+        _answer(conn, "a2", "age", "44")
+
+    migrations.upgrade(legacy)
+    with legacy.connect() as conn:
+        assert conn.execute(text("SELECT answer_json FROM questionnaire_answers WHERE id = 'a1'")).scalar() == '"QC"'
+        assert conn.execute(text("SELECT age, province FROM questionnaire_facts")).all() == [(44, "QC")]
+
+    statements: List[str] = []
+    event.listen(legacy, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    migrations.upgrade(legacy)
+    # Neither step reads the answers again (PRAGMAs are the schema checks)
+    assert not [sql for sql in statements if "questionnaire_answers" in sql and not sql.startswith("PRAGMA")]
+
+
+def test_tools_refuse_a_schema_that_is_behind(legacy: Engine) -> None:
+    statements: List[str] = []
+    event.listen(legacy, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    with pytest.raises(SystemExit, match="_answers_unique_key"):
+        migrations.require_current(legacy)
+    # Checked, not changed
+    assert not [sql for sql in statements if not sql.lstrip().upper().startswith(("SELECT", "PRAGMA"))]
+
+    migrations.upgrade(legacy)
+    migrations.require_current(legacy)
+    with legacy.connect() as conn:
+        assert migrations.pending(conn) == []
+
+
+def test_coverage_check_does_not_migrate(tmp_path: Any) -> None:
+    url = f"sqlite:///{tmp_path}/new.db"
+    env = {**os.environ, "DATABASE_URL": url, "DB_MIGRATE_ON_STARTUP": "0"}
+    result = subprocess.run(
+        [sys.executable, "-m", "app.coverage", "check"], env=env, capture_output=True, text=True,
+    )
+    assert result.returncode != 0
+    assert "python -m app.migrations" in result.stderr
+    with create_engine(url).connect() as conn:
+        assert conn.execute(text("SELECT name FROM sqlite_master")).all() == []
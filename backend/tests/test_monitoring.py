@@ -0,0 +1,38 @@
+"""
+Monitoring endpoints: /metrics and /health/llm answer only with
+METRICS_TOKEN (set by conftest.py) as a bearer token.
+"""
+from typing import Any
+
+import pytest
+
+from app import config
+
+
+# No header, a wrong token, no "Bearer", a longer token, non-ASCII bytes
+WRONG = [None, "Bearer wrong", "metrics-token", "Bearer metrics-token-2", "Bearer ✓".encode()]
+
+
+@pytest.mark.parametrize("path", ["/metrics", "/health/llm"])
+@pytest.mark.parametrize("authorization", WRONG)
+def test_refused_without_the_token(client: Any, path: str, authorization: Any) -> None:
+    headers = {"Authorization": authorization} if authorization else {}
+    response = client.get(path, headers=headers)
+    assert response.status_code == 401
+    assert response.headers["www-authenticate"] == "Bearer"
+
+
+def test_metrics_with_the_token(client: Any) -> None:
+    response = client.get("/metrics", headers={"Authorization": f"Bearer {config.METRICS_TOKEN}"})
+    assert response.status_code == 200
+    assert "# TYPE" in response.text
+
+
+def test_llm_health_with_the_token(client: Any) -> None:
+    response = client.get("/health/llm", headers={"Authorization": f"Bearer {config.METRICS_TOKEN}"})
+    assert response.status_code == 200
+    assert "breaker_state" in response.json()
+
+
+def test_plain_health_stays_open(client: Any) -> None:
+    assert client.get("/health").json() == {"status": "ok"}
@@ -0,0 +1,47 @@
+"""
+Password hashing pool (app/password_pool.py): admission, and counting
+every job until it ends, including after run() gave up waiting on it.
+"""
+import asyncio
+import threading
+
+import pytest
+
+from app.password_pool import PasswordPool, PoolSaturated
+
+
+def _fail() -> None:
+    raise ValueError("bad hash")
+
+
+def test_outcomes_are_counted_separately() -> None:
+    pool = PasswordPool(workers=0, max_pending=4, timeout=5)
+    assert asyncio.run(pool.run(sum, [1, 2])) == 3
+    with pytest.raises(ValueError):
+        asyncio.run(pool.run(_fail))
+    stats = pool.stats()
+    assert (stats["completed"], stats["failed"], stats["timed_out"], stats["pending"]) == (1, 1, 0, 0)
+    pool.shutdown()
+
+
+def test_timed_out_job_stays_pending_until_it_ends() -> None:
+    pool = PasswordPool(workers=0, max_pending=1, timeout=0.05)
+    release = threading.Event()
+    ended = threading.Event()
+
+    def stuck() -> None:
+        release.wait(5)
+        ended.set()
+
+    with pytest.raises(PoolSaturated, match="no result"):
+        asyncio.run(pool.run(stuck))
+    # Still running, so still holding the only slot
+    assert pool.stats()["pending"] == 1
+    with pytest.raises(PoolSaturated, match="pending"):
+        asyncio.run(pool.run(sum, [1]))
+
+    release.set()
+    assert ended.wait(5)
+    pool.shutdown()
+    stats = pool.stats()
+    assert (stats["pending"], stats["timed_out"], stats["rejected"], stats["completed"]) == (0, 1, 1, 0)
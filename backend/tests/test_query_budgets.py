@@ -0,0 +1,63 @@
+"""
+Every endpoint once, each checked against its @query_budget by the
+client fixture (conftest.py).
+"""
+from typing import Any, Callable, Dict
+
+from app.main import app
+from app.query_counter import budget_of
+
+# Not API endpoints: docs, liveness and monitoring
+UNBUDGETED = {"/openapi.json", "/docs", "/docs/oauth2-redirect", "/redoc", "/", "/health", "/health/llm", "/metrics"}
+
+
+def test_every_endpoint_declares_a_budget() -> None:
+    missing = [route.path for route in app.routes if route.path not in UNBUDGETED and budget_of(route.endpoint) is None]
+    assert missing == []
+
+
+def test_questionnaire_flow(client: Any, register: Callable[[], Dict[str, str]]) -> None:
+    headers = register()
+    qid = client.post("/questionnaires/", headers=headers).json()["id"]
+    answers = {"age": 40, "income": 90_000, "dependants": 2, "has_vehicle": True, "province": "ON"}
+    client.put(f"/questionnaires/{qid}/answers", headers=headers, json={"answers": answers})
+    saved = client.put(f"/questionnaires/{qid}/answers", headers=headers, json={"answers": answers})
+    patch_headers = {**headers, "If-Match": saved.headers["etag"]}
+    url = f"/questionnaires/{qid}/answers"
+    assert client.patch(url, headers=patch_headers, json={"answers": {"age": 41}}).is_success
+    # Same base version again: a conflict
+    assert client.patch(url, headers=patch_headers, json={"answers": {"age": 42}}).is_error
+    client.get(f"/questionnaires/{qid}", headers=headers)
+    client.get(f"/questionnaires/{qid}/score", headers=headers)
+    client.patch(url, headers=patch_headers, json={"answers": {"income": 120_000}})
+    # Scored again from the one changed answer
+    client.get(f"/questionnaires/{qid}/score", headers=headers)
+    client.get("/questionnaires/", headers=headers)
+
+    client.post(f"/questionnaires/{qid}/complete", headers=headers)
+    client.post(f"/questionnaires/{qid}/complete", headers=headers)
+    keyed = {**headers, "Idempotency-Key": "budget"}
+    client.post(f"/questionnaires/{qid}/complete", headers=keyed)
+    # Replayed
+    client.post(f"/questionnaires/{qid}/complete", headers=keyed)
+    client.get(f"/reports/{qid}", headers=headers)
+    client.get(f"/reports/{qid}/advice", headers=headers)
+    client.get(f"/reports/{qid}/advice/stream", headers=headers)
+    # Answers changed after completion: stored reports (and rollup counts) dropped, then re-scored
+    client.put(f"/questionnaires/{qid}/answers", headers=headers, json={"answers": {"age": 43}})
+    client.post(f"/questionnaires/{qid}/complete", headers={**headers, "Idempotency-Key": "budget-2"})
+
+
+def test_bulk_and_analytics(client: Any) -> None:
+    credentials = {"username": "analytics@example.com", "password": "correct horse battery staple"}
+    client.post("/auth/register", json={"email": credentials["username"], "password": credentials["password"]})
+    token = client.post("/auth/login", data=credentials).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    profiles = "".join(f'{{"answers": {{"age": {age}, "province": "BC"}}}}\n' for age in range(30, 40))
+    ndjson = {**headers, "Content-Type": "application/x-ndjson"}
+    assert client.post("/bulk/questionnaires", headers=ndjson, content=profiles).is_success
+    assert client.post("/bulk/questionnaires?score=true", headers=ndjson, content=profiles).is_success
+    client.get("/bulk/questionnaires", headers=headers)
+    client.get("/bulk/assessments", headers=headers)
+    assert client.get("/analytics/coverage", headers=headers).is_success
@@ -0,0 +1,99 @@
+"""
+python -m app.reassess against the test database: completed questionnaires
+without an assessment under the current rules get the one /complete would
+have stored, and rows /complete stores during the run are skipped.
+"""
+from typing import Any, Callable, Dict, List, Set, Tuple
+
+import pytest
+from sqlalchemy import delete, func, select
+
+from app import reassess
+from app.db import SessionLocal, engine
+from app.models.assessment import Assessment
+from app.models.questionnaire import Questionnaire
+from app.services import coverage
+
+from .test_advice_jobs import ANSWERS, _questionnaire
+
+
+def _completed(client: Any, headers: Dict[str, str], ages: range) -> List[str]:
+    ids = []
+    for age in ages:
+        qid = _questionnaire(client, headers, {**ANSWERS, "age": age})
+        assert client.post(f"/questionnaires/{qid}/complete", headers=headers).status_code == 200
+        ids.append(qid)
+    return ids
+
+
+def _assessments(ids: List[str]) -> Set[Tuple[str, str, str, str]]:
+    with engine.connect() as conn:
+        rows = conn.execute(
+            select(
+                Assessment.questionnaire_id,
+                Assessment.answers_hash,
+                Assessment.rules_version,
+                Assessment.assessment_json,
+            ).where(Assessment.questionnaire_id.in_(ids))
+        ).all()
+    return {tuple(row) for row in rows}
+
+
+def _unscored() -> int:
+    with engine.connect() as conn:
+        return conn.execute(
+            select(func.count())
+            .select_from(Questionnaire)
+            .where(
+                Questionnaire.status == "completed",
+                ~select(Assessment.id).where(Assessment.questionnaire_id == Questionnaire.id).exists(),
+            )
+        ).scalar_one()
+
+
+def test_missing_assessments_are_rescored(
+        client: Any, register: Callable[[], Dict[str, str]], tmp_path: Any,
+) -> None:
+    ids = _completed(client, register(), range(40, 46))
+    stored = _assessments(ids)
+    with engine.begin() as conn:
+        conn.execute(delete(Assessment).where(Assessment.questionnaire_id.in_(ids[::2])))
+
+    # Other tests may have left completed questionnaires unscored too
+    unscored = _unscored()
+    assert unscored >= len(ids[::2])
+
+    checkpoint = tmp_path / "checkpoint.json"
+    written = reassess.reassess(workers=2, chunk_size=2, checkpoint_path=str(checkpoint))
+
+    assert written == unscored
+    assert _unscored() == 0
+    assert _assessments(ids) == stored
+    assert not checkpoint.exists()
+    with engine.connect() as conn:
+        assert coverage.check(conn) == []
+
+
+def test_rows_stored_during_the_run_are_skipped(
+        client: Any, register: Callable[[], Dict[str, str]], monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    ids = _completed(client, register(), range(50, 53))
+    with SessionLocal() as db:
+        contexts = reassess._load_contexts(db, ids)
+    results = reassess._score_chunk(contexts, with_ai=False)
+    with engine.begin() as conn:
+        conn.execute(delete(Assessment).where(Assessment.questionnaire_id == ids[0]))
+
+    # The first look misses what /complete stored for ids[1:] just after
+    existing = reassess._existing
+    looks = []
+
+    def stale(db: Any, ids: List[str]) -> Set[Tuple[str, str]]:
+        looks.append(ids)
+        return set() if len(looks) == 1 else existing(db, ids)
+
+    monkeypatch.setattr(reassess, "_existing", stale)
+    with SessionLocal() as db:
+        assert reassess._write_results(db, results) == 1
+    assert len(looks) == 2
+    assert {row[0] for row in _assessments(ids)} == set(ids)
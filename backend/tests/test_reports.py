@@ -0,0 +1,83 @@
+"""
+GET /reports/{id} serves the stored report with a strong ETag; a matching
+If-None-Match gets a bodiless 304, and changing the answers drops the
+stored report until /complete scores them again.
+"""
+from typing import Any, Callable, Dict
+
+from app.models.assessment import Assessment
+from app.routers.report import _etag_matches
+from app.services import reports
+
+from .test_advice_jobs import ANSWERS, _questionnaire, _wait_for_advice
+
+
+def _completed(client: Any, headers: Dict[str, str], answers: Dict[str, Any]) -> str:
+    # No model (the llm fixture isn't used): the fallback advice is ready at once
+    qid = _questionnaire(client, headers, answers)
+    assert client.post(f"/questionnaires/{qid}/complete", headers=headers).status_code == 200
+    assert _wait_for_advice(client, headers, qid)["ai_status"] == "ready"
+    return qid
+
+
+def test_if_none_match_forms() -> None:
+    etag = '"abc"'
+    assert _etag_matches('"abc"', etag)
+    assert _etag_matches('W/"abc"', etag)
+    assert _etag_matches('"xyz", "abc"', etag)
+    assert _etag_matches("*", etag)
+    assert not _etag_matches('"xyz"', etag)
+    assert not _etag_matches("abc", etag)
+
+
+def test_etag_covers_everything_in_the_report() -> None:
+    stored = {"answers_hash": "h", "rules_version": "r", "ai_status": "pending", "ai_advice_json": None}
+    etag = reports.report_etag(Assessment(**stored), "completed")
+    assert etag == reports.report_etag(Assessment(**stored), "completed")
+    assert reports.report_etag(Assessment(**stored), "in_progress") != etag
+
+    changes = {"answers_hash": "h2", "rules_version": "r2", "ai_status": "ready", "ai_advice_json": "{}"}
+    for field, value in changes.items():
+        assert reports.report_etag(Assessment(**{**stored, field: value}), "completed") != etag, field
+
+
+def test_unchanged_report_is_not_modified(client: Any, register: Callable[[], Dict[str, str]]) -> None:
+    headers = register()
+    qid = _completed(client, headers, {**ANSWERS, "income": 77_000})
+
+    first = client.get(f"/reports/{qid}", headers=headers)
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+    assert first.json()["assessment"]["overall_risk_score"] > 0
+
+    again = client.get(f"/reports/{qid}", headers={**headers, "If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.content == b""
+    assert again.headers["etag"] == etag
+
+    weak = client.get(f"/reports/{qid}", headers={**headers, "If-None-Match": f"W/{etag}"})
+    assert weak.status_code == 304
+
+    other = client.get(f"/reports/{qid}", headers={**headers, "If-None-Match": '"stale"'})
+    assert other.status_code == 200
+    assert other.json() == first.json()
+
+
+def test_changed_answers_invalidate_the_report(client: Any, register: Callable[[], Dict[str, str]]) -> None:
+    headers = register()
+    answers = {**ANSWERS, "income": 78_000}
+    qid = _completed(client, headers, answers)
+    etag = client.get(f"/reports/{qid}", headers=headers).headers["etag"]
+
+    # Saving the same answers again changes nothing
+    client.put(f"/questionnaires/{qid}/answers", headers=headers, json={"answers": answers})
+    assert client.get(f"/reports/{qid}", headers={**headers, "If-None-Match": etag}).status_code == 304
+
+    client.put(f"/questionnaires/{qid}/answers", headers=headers, json={"answers": {"dependants": 3}})
+    assert client.get(f"/reports/{qid}", headers={**headers, "If-None-Match": etag}).status_code == 404
+
+    assert client.post(f"/questionnaires/{qid}/complete", headers=headers).status_code == 200
+    fresh = client.get(f"/reports/{qid}", headers={**headers, "If-None-Match": etag})
+    assert fresh.status_code == 200
+    assert fresh.headers["etag"] != etag
+    assert fresh.json()["context"]["dependants"] == 3
@@ -0,0 +1,70 @@
+"""
+risk_engine against the original hand-written engine
+(bench/legacy_risk_engine.py): the scalar evaluate() and the rule tables
+behind incremental scoring (score_state / rescore) must both give its
+exact output.
+"""
+import json
+from typing import Any, Dict
+
+import pytest
+
+from app.services import risk_engine
+from bench import legacy_risk_engine
+from bench.risk_engine_bench import synthetic_contexts
+
+CONTEXTS = synthetic_contexts(5000, seed=42)
+
+
+def _json(assessment: Dict[str, Any]) -> str:
+    return json.dumps(assessment, ensure_ascii=False)
+
+
+def test_evaluate_matches_the_legacy_engine() -> None:
+    for context in CONTEXTS:
+        assert _json(risk_engine.evaluate(context)) == _json(legacy_risk_engine.evaluate(context)), context
+
+
+def test_rule_tables_match_evaluate() -> None:
+    for context in CONTEXTS:
+        state = risk_engine.score_state(context)
+        expected = risk_engine.evaluate(context)
+        assert _json(risk_engine.assess(state)) == _json(expected), context
+        assert risk_engine.scores(state) == {
+            "overall_risk_score": expected["overall_risk_score"],
+            "categories": {name: c["score"] for name, c in expected["categories"].items()},
+        }
+
+
+def test_rescore_matches_the_legacy_engine() -> None:
+    fields = risk_engine.Facts._fields
+    for i, (before, other) in enumerate(zip(CONTEXTS, CONTEXTS[1:])):
+        state = risk_engine.score_state(before)
+        # One answer changed, as the autosave sends them, then all of them
+        key = fields[i % len(fields)]
+        after = {**before, key: other.get(key)}
+        state = risk_engine.rescore(state, after, (key,))
+        assert _json(risk_engine.assess(state)) == _json(legacy_risk_engine.evaluate(after)), (before, key)
+
+        # Left out is not the same as None (a missing province is "ON")
+        changed = [
+            key for key in after.keys() | other.keys()
+            if key not in after or key not in other or after[key] != other[key]
+        ]
+        state = risk_engine.rescore(state, other, changed)
+        assert _json(risk_engine.assess(state)) == _json(legacy_risk_engine.evaluate(other)), (before, other)
+
+
+@pytest.mark.parametrize("context", [{"age": "abc"}, {"income": "lots"}, {"dependants": [2]}])
+def test_unreadable_answers_raise_like_the_legacy_engine(context: Dict[str, Any]) -> None:
+    with pytest.raises((TypeError, ValueError)) as legacy:
+        legacy_risk_engine.evaluate(context)
+    with pytest.raises(legacy.type):
+        risk_engine.evaluate(context)
+
+
+def test_recommendations_are_not_shared_between_calls() -> None:
+    context = {"has_mortgage": True, "has_vehicle": True, "province": "ON"}
+    first = risk_engine.evaluate(context)
+    first["categories"]["life"]["recommendations"][0]["detail"] = "changed"
+    assert risk_engine.evaluate(context) == legacy_risk_engine.evaluate(context)
@@ -0,0 +1,21 @@
+"""
+Importing the app leaves the heavy optional dependencies (see
+bench/startup_bench.py) to be loaded on first use.
+"""
+import json
+import os
+import subprocess
+import sys
+
+from bench.startup_bench import LAZY
+
+
+def test_import_loads_no_lazy_dependency() -> None:
+    # A new interpreter: this one has loaded them for other tests
+    script = "import json, sys; import app.main; print(json.dumps(sorted(sys.modules)))"
+    result = subprocess.run(
+        [sys.executable, "-c", script], env=os.environ.copy(), capture_output=True, text=True, check=True,
+    )
+    loaded = set(json.loads(result.stdout.splitlines()[-1]))
+    assert "app.main" in loaded
+    assert sorted(name for name in LAZY if name in loaded) == []
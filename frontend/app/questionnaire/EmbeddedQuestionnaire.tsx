@@ -113,6 +113,19 @@ export default function EmbeddedQuestionnaire({
       );
 
       setReport(completed);
+      setLoading(false);
+
+      // The AI summary is generated in the background; poll until it lands
+      let advice = completed;
+      for (let attempt = 0; advice.ai_status === "pending" && attempt < 30; attempt++) {
+        await new Promise((resolve) => setTimeout(resolve, 1000));
+        advice = await apiRequest(`/reports/${q.id}/advice`, {
+          token: protectWithLogin ? token : undefined,
+        });
+      }
+      if (advice !== completed) {
+        setReport((prev: any) => ({ ...prev, ...advice }));
+      }
     } catch (err) {
       console.error(err);
       setError("Something went wrong calling the API.");